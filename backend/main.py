@@ -1,19 +1,70 @@
 from fastapi import FastAPI, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import func  
-from models import get_db, Anime, Genre, anime_genres, Studio, anime_studios
+from models import get_db, get_async_db, run_migrations, Anime, Genre, anime_genres, Studio, anime_studios
+from models.database import SessionLocal
+from services import serialize_anime_list, SEARCH_FIELDS, build_match_expression, text_search_subquery, paginate, SortKey
+from services import cached_total, filter_key, response_cache, ResponseCacheMiddleware, CompressionMiddleware
+from services import build_off_loop
+from services import discover_page, discover_years
+from services import random_pick_pool, DETAIL_FIELDS, RELATION_FIELDS, load_franchise
+from services import load_similar, SIMILAR_K, synopsis_similar
+from services import ANIME_LIST_FIELDS, select_fields, anime_columns
+from services import facet_index, TagFilter, tag_sql_condition, columnar_search, fetch_page, totals_cache
+from services import semantic_index, DEFAULT_NPROBE
+from services import title_suggest_index, SUGGEST_TOP
+from services import fuzzy_title_index, fuzzy_search_subquery
+from schemas import AnimeDetail, AnimePage
 from datetime import date
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Query, Body
 from sqlalchemy import select, or_, and_
-from typing import Optional
+from typing import Optional, List
+from contextlib import asynccontextmanager
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 啟動時套用尚未執行的 migrations（indexes 等）
+    run_migrations()
+    db = SessionLocal()
+    try:
+        # /api/search 使用 NumPy 引擎時，先把 arrays 建好，第一個 request 不用等
+        if columnar_search.enabled:
+            columnar_search.get_arrays(db)
+        # suggest 的 prefix index 也先建好 (之後資料變了只 patch 改到的動漫)
+        title_suggest_index.refresh(db)
+    finally:
+        db.close()
+    yield
 
 app = FastAPI(
     title="Anime Database API",
     description="API for anime database with recommendations",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    # orjson 產生 JSON；有 response_model 的 endpoint 由 pydantic-core 轉換，不經過 jsonable_encoder
+    default_response_class=ORJSONResponse
 )
 
+# 每個使用者拿到的內容都一樣的 read endpoints：快取 response（秒數 = TTL）
+CACHED_ROUTES = {
+    "/api/genres": 3600,
+    "/api/recommendations/genres/list": 3600,
+    "/api/recommendations/studios/list": 3600,
+    "/api/recommendations/popular": 300,
+    "/api/recommendations/top-rated": 300,
+    "/api/recommendations/hidden-gems": 300,
+    "/api/recommendations/latest": 300,
+    "/api/recommendations/trending": 300,
+}
+
+# 先加 cache 再加 CORS，讓 CORS 包在外層（快取命中時也會有 CORS headers）
+app.add_middleware(ResponseCacheMiddleware, cache=response_cache, routes=CACHED_ROUTES)
+# 壓縮包在 cache 外面：快取的 routes 已經帶著壓好的版本出來，其他 response (如 /api/search) 在這裡壓縮
+app.add_middleware(CompressionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -37,6 +88,14 @@ def read_root():
         }
     }
 
+@app.get("/api/cache/stats")
+def get_cache_stats():
+    """Response cache counters (hits, misses, 304s, compressions, evictions)"""
+    return {
+        "success": True,
+        "data": response_cache.stats()
+    }
+
 # =============================================================================
 # Basic CRUD API
 # =============================================================================
@@ -76,29 +135,21 @@ def get_latest_anime(
         "data": result
     }
 
-@app.get("/api/anime")
+@app.get("/api/anime", response_model=AnimePage, response_model_exclude_unset=True)
 def get_anime_list(
     limit: int = 10,
     offset: int = 0,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """Get the list of anime"""
-    animes = db.query(Anime).offset(offset).limit(limit).all()
-    total = db.query(Anime).count()
+    """Get the list of anime (`fields`: comma-separated subset of the item fields, e.g. genres)"""
+    selection = select_fields(fields, ANIME_LIST_FIELDS, relations=())
     
-    result = []
-    for anime in animes:
-        result.append({
-            "id": anime.id,
-            "mal_id": anime.mal_id,
-            "title": anime.title,
-            "title_english": anime.title_english,
-            "type": anime.type,
-            "episodes": anime.episodes,
-            "score": anime.score,
-            "year": anime.year,
-            "image_url": anime.image_url
-        })
+    # 依 id 排序：只讀部分欄位時 SQLite 可能改走別的 covering index，不排序的話同一個 offset 會拿到不同的 rows
+    animes = db.query(anime_columns(selection.columns)).order_by(Anime.id).offset(offset).limit(limit).all()
+    total = cached_total(db, filter_key("anime"), db.query(Anime))
+    
+    result = serialize_anime_list(db, animes, selection.columns, selection.relations)
     
     return {
         "total": total,
@@ -108,55 +159,91 @@ def get_anime_list(
     }
 
 @app.get("/api/anime/random")
-def get_random_anime(db: Session = Depends(get_db)):
-    """Get a random anime recommendation"""
-    import random
+def get_random_anime(
+    count: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """Get a random anime recommendation (or `count` distinct ones)"""
     
-    anime_ids = db.query(Anime.id).filter(
-        Anime.score >= 7.0,
-        Anime.members >= 50000,
-        Anime.image_url != None
-    ).all()
+    if count is not None and (count < 1 or count > 50):
+        raise HTTPException(status_code=400, detail="count must be between 1 and 50")
     
-    if not anime_ids:
+    # 從預先建立的 id pool 抽，資料版本變了才會重建
+    random_ids = random_pick_pool.sample(db, count or 1)
+    
+    if not random_ids:
         raise HTTPException(status_code=404, detail="No anime found")
     
-    random_id = random.choice([id[0] for id in anime_ids])
-    anime = db.query(Anime).filter(Anime.id == random_id).first()
+    # 一次讀出抽到的動漫，再依抽到的順序排回來
+    animes_by_id = {
+        anime.id: anime
+        for anime in db.query(Anime).filter(Anime.id.in_(random_ids)).all()
+    }
+    animes = [animes_by_id[anime_id] for anime_id in random_ids if anime_id in animes_by_id]
     
-    if not anime:
+    if not animes:
         raise HTTPException(status_code=404, detail="Anime not found")
     
-    genres = [{"id": g.id, "name": g.name} for g in anime.genres]
-    studios = [{"id": s.id, "name": s.name} for s in anime.studios]
+    results = serialize_anime_list(db, animes, DETAIL_FIELDS)
+    
+    if count is None:
+        return {
+            "success": True,
+            "data": results[0],
+            "message": "Random anime retrieved successfully"
+        }
     
     return {
         "success": True,
-        "data": {
-            "id": anime.id,
-            "mal_id": anime.mal_id,
-            "title": anime.title,
-            "title_english": anime.title_english,
-            "type": anime.type,
-            "episodes": anime.episodes,
-            "score": anime.score,
-            "rank": anime.rank,
-            "popularity": anime.popularity,
-            "members": anime.members,
-            "favorites": anime.favorites,
-            "year": anime.year,
-            "season": anime.season,
-            "image_url": anime.image_url,
-            "synopsis": anime.synopsis,
-            "aired_from": anime.aired_from,
-            "aired_to": anime.aired_to,
-            "demographic": anime.demographic,
-            "genres": genres,
-            "studios": studios
-        },
-        "message": "Random anime retrieved successfully"
+        "total": len(results),
+        "data": results,
+        "message": f"Retrieved {len(results)} random anime"
+    }
+
+# 一次最多查幾個 mal_id
+MAX_MAL_IDS = 500
+
+def lookup_anime_by_mal_ids(db: Session, mal_ids):
+    """Resolve many MAL ids with one IN query; ids not in the database are reported as missing"""
+    
+    mal_ids = list(dict.fromkeys(mal_ids))  # 去除重複，保留順序
+    
+    if len(mal_ids) > MAX_MAL_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_MAL_IDS} ids per request")
+    
+    found = {}
+    if mal_ids:
+        for anime in db.query(Anime).filter(Anime.mal_id.in_(mal_ids)).all():
+            found[anime.mal_id] = {field: getattr(anime, field) for field in RELATION_FIELDS}
+    
+    return {
+        "success": True,
+        "total": len(found),
+        "data": {str(mal_id): found[mal_id] for mal_id in mal_ids if mal_id in found},
+        "missing": [mal_id for mal_id in mal_ids if mal_id not in found]
     }
 
+@app.get("/api/anime/mal")
+def get_anime_by_mal_ids(
+    ids: str = Query(..., description="Comma-separated MyAnimeList IDs"),
+    db: Session = Depends(get_db)
+):
+    """Get many anime by MyAnimeList ID in one request - for Relations feature"""
+    try:
+        mal_ids = [int(mal_id) for mal_id in ids.split(",") if mal_id.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    
+    return lookup_anime_by_mal_ids(db, mal_ids)
+
+@app.post("/api/anime/mal")
+def post_anime_by_mal_ids(
+    ids: List[int] = Body(..., embed=True),
+    db: Session = Depends(get_db)
+):
+    """Same as GET /api/anime/mal, with the ids in a JSON body for long lists"""
+    return lookup_anime_by_mal_ids(db, ids)
+
 @app.get("/api/anime/mal/{mal_id}")
 def get_anime_by_mal_id(
     mal_id: int,
@@ -179,41 +266,115 @@ def get_anime_by_mal_id(
         "image_url": anime.image_url
     }
 
-@app.get("/api/anime/{anime_id}")
-def get_anime_by_id(
+@app.get("/api/anime/{anime_id}", response_model=AnimeDetail, response_model_exclude_unset=True)
+async def get_anime_by_id(
     anime_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get detailed information of a single anime"""
-    anime = db.query(Anime).filter(Anime.id == anime_id).first()
+    anime = await db.get(Anime, anime_id)
     
     if not anime:
         raise HTTPException(status_code=404, detail="Anime not found")
     
-    genres = [{"id": g.id, "name": g.name} for g in anime.genres]
-    studios = [{"id": s.id, "name": s.name} for s in anime.studios]
+    # genres / studios 不能在 async 裡 lazy load，用批次讀取的 serializer
+    results = await db.run_sync(serialize_anime_list, [anime], DETAIL_FIELDS)
+    
+    return results[0]
+
+@app.get("/api/anime/{anime_id}/franchise")
+def get_anime_franchise(
+    anime_id: int,
+    db: Session = Depends(get_db)
+):
+    """Get every anime in the same franchise, in chronological order"""
+    
+    # franchise_members 是 fetch_and_save.py 收集 relations 後預先算好的
+    members = load_franchise(db, anime_id)
+    
+    if not members:
+        if not db.query(Anime.id).filter(Anime.id == anime_id).first():
+            raise HTTPException(status_code=404, detail="Anime not found")
+        
+        # 還沒有建立 franchise (relations 尚未收集)
+        return {
+            "success": True,
+            "franchise_id": None,
+            "total": 0,
+            "data": []
+        }
+    
+    results = []
+    for franchise_id, position, mal_id, title, anime in members:
+        if anime is not None:
+            item = {field: getattr(anime, field) for field in RELATION_FIELDS}
+            item["in_database"] = True
+        else:
+            item = {
+                "id": None,
+                "mal_id": mal_id,
+                "title": title,
+                "in_database": False
+            }
+        item["position"] = position
+        item["is_current"] = anime is not None and anime.id == anime_id
+        results.append(item)
     
     return {
-        "id": anime.id,
-        "mal_id": anime.mal_id,
-        "title": anime.title,
-        "title_english": anime.title_english,
-        "type": anime.type,
-        "episodes": anime.episodes,
-        "score": anime.score,
-        "rank": anime.rank,
-        "popularity": anime.popularity,
-        "members": anime.members,
-        "favorites": anime.favorites,
-        "year": anime.year,
-        "season": anime.season,
-        "image_url": anime.image_url,
-        "synopsis": anime.synopsis,
-        "aired_from": anime.aired_from,
-        "aired_to": anime.aired_to,
-        "demographic": anime.demographic,
-        "genres": genres,
-        "studios": studios
+        "success": True,
+        "franchise_id": franchise_id,
+        "total": len(results),
+        "data": results
+    }
+
+@app.get("/api/anime/{anime_id}/similar")
+async def get_similar_anime(
+    anime_id: int,
+    limit: int = 12,
+    by: str = Query(default="tags", regex="^(tags|story)$"),
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Anime similar to this one, most similar first
+    - by: "tags" (default; genres, studios, demographic, type and era) or "story" (synopsis TF-IDF)
+    - similarity: cosine similarity of the vectors (0-1)
+    """
+    
+    if limit < 1 or limit > SIMILAR_K:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {SIMILAR_K}")
+    
+    selection = select_fields(fields, RELATION_FIELDS, relations=(), extras=("similarity",))
+    
+    # similar_anime / synopsis_similar 是 fetch_and_save.py 之後預先算好的
+    # (services/similar.py、services/story_similar.py)，只讀 index
+    neighbors = synopsis_similar if by == "story" else None
+    rows = await db.run_sync(load_similar, anime_id, selection.columns, limit, neighbors)
+    
+    if not rows:
+        if not await db.get(Anime, anime_id):
+            raise HTTPException(status_code=404, detail="Anime not found")
+        
+        # 還沒有建立 similar_anime / synopsis_similar (或沒有 synopsis)
+        return {
+            "success": True,
+            "anime_id": anime_id,
+            "total": 0,
+            "data": []
+        }
+    
+    results = await db.run_sync(
+        serialize_anime_list, [anime for anime, _ in rows], selection.columns, selection.relations
+    )
+    if "similarity" in selection.extras:
+        for result, (_, score) in zip(results, rows):
+            result["similarity"] = score
+    
+    return {
+        "success": True,
+        "anime_id": anime_id,
+        "total": len(results),
+        "data": results
     }
 
 @app.get("/api/genres")
@@ -229,160 +390,377 @@ def get_all_genres(db: Session = Depends(get_db)):
         "data": [{"id": g.id, "name": g.name} for g in genres]
     }
 
-@app.get("/api/search")
-def search_anime(
+@app.get("/api/search", response_model=AnimePage, response_model_exclude_unset=True)
+async def search_anime(
     q: Optional[str] = None,
     genres: Optional[str] = None,
+    genre_mode: str = Query(default="any", regex="^(any|all)$"),
+    exclude_genres: Optional[str] = None,
+    studios: Optional[str] = None,
+    studio_mode: str = Query(default="any", regex="^(any|all)$"),
+    exclude_studios: Optional[str] = None,
     types: Optional[str] = None,
     years: Optional[str] = None,
     min_score: Optional[float] = None,
     max_score: Optional[float] = None,
-    sort_by: str = Query(default="score", regex="^(score|members|year|title)$"),
+    fuzzy: bool = False,
+    sort_by: Optional[str] = Query(default=None, regex="^(relevance|score|members|year|title)$"),
     order: str = Query(default="desc", regex="^(asc|desc)$"),
     limit: int = 24,
     offset: int = 0,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Search anime with multiple filters support
     - genres: comma-separated list (e.g., "Action,Comedy,Drama")
+    - genre_mode: "any" (default, at least one of the genres) or "all" (every genre)
+    - exclude_genres: comma-separated list of genres the anime must not have
+    - studios / studio_mode / exclude_studios: the same for studios
     - types: comma-separated list (e.g., "TV,Movie")
     - years: comma-separated list (e.g., "2024,2023,2022")
+    - q: full-text search over title, title_english and synopsis (prefix match)
+    - fuzzy: match q against titles allowing typos ("Shingeki no Kyojn"), closest first
+    - sort_by: defaults to "relevance" (bm25, or edit distance with fuzzy) when q is given, otherwise "score"
+    - cursor: next_cursor from the previous page (keyset pagination, offset is ignored)
+    - include_total: false skips the COUNT, use has_more to know if there is a next page
+    - fields: comma-separated item fields (e.g. "title,score,image_url"); columns that
+      are not asked for (synopsis, genres, studios, ...) are not read from SQLite at all
     """
     
-    # 建立基礎 query
-    query = db.query(Anime)
-    
-    # 1. Search by title
-    if q:
-        query = query.filter(Anime.title.ilike(f"%{q}%"))
-    
-    # 2. Filter by multiple genres (OR logic) - 使用 JOIN 提升效能
-    if genres:
-        genre_list = [g.strip() for g in genres.split(',') if g.strip()]
-        if genre_list:
-            # 使用 JOIN 來過濾 genres
-            query = query.join(Anime.genres).filter(
-                Genre.name.in_(genre_list)
-            ).distinct()  # 加上 distinct() 避免重複
-    
-    # 3. Filter by multiple types (OR logic)
-    if types:
-        type_list = [t.strip() for t in types.split(',') if t.strip()]
+    if limit < 1 or limit > 100:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
+
+    selection = select_fields(fields, SEARCH_FIELDS)
+    
+    genre_filter = TagFilter(
+        [g.strip() for g in genres.split(',') if g.strip()] if genres else [],
+        genre_mode,
+        [g.strip() for g in exclude_genres.split(',') if g.strip()] if exclude_genres else []
+    )
+    studio_filter = TagFilter(
+        [s.strip() for s in studios.split(',') if s.strip()] if studios else [],
+        studio_mode,
+        [s.strip() for s in exclude_studios.split(',') if s.strip()] if exclude_studios else []
+    )
+    has_tag_filters = any((genre_filter.include, genre_filter.exclude, studio_filter.include, studio_filter.exclude))
+    
+    # 查詢是同步的 ORM 程式碼，run_sync 在 event loop 的 thread 上執行：只有 SQLite 呼叫交給 aiosqlite，
+    # 編譯 SQL、處理 rows 和記憶體 index 的運算都會佔住 event loop，所以這裡不能建 index (見 build_off_loop)
+    def run_search(db: Session, sort_by):
+        if columnar_search.enabled:
+            return run_columnar_search(db, sort_by)
+    
+        # 先記下 index 的版本再用：背景重建換上新的之後，舊 build 算出來的總數不會被當成新的
+        facet_version = facet_index.version
+        fuzzy_version = fuzzy_title_index.version
+    
+        # 建立基礎 query (只讀 fields 需要的欄位)
+        query = db.query(anime_columns(selection.columns))
+    
+        # 1. Full-text search (FTS5) over title / title_english / synopsis
+        text_search = None
+        if q and fuzzy:
+            # 拼錯的 title：trigram index 找候選，再依 edit distance 排 (services/fuzzy_titles.py)
+            text_search = fuzzy_search_subquery(fuzzy_title_index.search(db, q))
+            query = query.join(text_search, text_search.c.anime_id == Anime.id)
+        elif q:
+            match_expression = build_match_expression(q)
+            if match_expression:
+                text_search = text_search_subquery(match_expression)
+                query = query.join(text_search, text_search.c.anime_id == Anime.id)
+            else:
+                # 沒有可搜尋的字（例如只有符號），退回原本的 title 比對
+                query = query.filter(Anime.title.ilike(f"%{q}%"))
+    
+        # 2. Filter by genres / studios (any: OR, all: AND, exclude: NOT)
+        #    AND / OR / NOT 在記憶體的 bitmaps 上算好 (services/facets.py)，SQL 只拿到符合的 ids；
+        #    寫入之後 bitmaps 還沒重建前改在 SQL 裡篩，新寫入的 rows 才不會漏掉 exclude_genres
+        bitmaps = facet_index.current(db) if has_tag_filters else None
+        use_bitmaps = bitmaps is not None
+        if use_bitmaps:
+            tag_condition = bitmaps.id_condition(genre_filter, studio_filter)
+        else:
+            tag_condition = tag_sql_condition(genre_filter, studio_filter)
+        if tag_condition is not None:
+            query = query.filter(tag_condition)
+    
+        # 3. Filter by multiple types (OR logic)
+        type_list = [t.strip() for t in types.split(',') if t.strip()] if types else []
         if type_list:
             query = query.filter(Anime.type.in_(type_list))
     
-    # 4. Filter by multiple years (OR logic)
-    if years:
-        year_list = [int(y.strip()) for y in years.split(',') if y.strip().isdigit()]
+        # 4. Filter by multiple years (OR logic)
+        year_list = [int(y.strip()) for y in years.split(',') if y.strip().isdigit()] if years else []
         if year_list:
             query = query.filter(Anime.year.in_(year_list))
     
-    # 5. Filter by score range
-    if min_score is not None:
-        query = query.filter(Anime.score >= min_score)
-    if max_score is not None:
-        query = query.filter(Anime.score <= max_score)
-    
-    # 6. Get total count before pagination
-    total = query.count()
-    
-    # 7. Apply sorting
-    if sort_by == "score":
-        sort_column = Anime.score
-    elif sort_by == "members":
-        sort_column = Anime.members
-    elif sort_by == "year":
-        sort_column = Anime.year
-    else:  # title
-        sort_column = Anime.title
-    
-    if order == "desc":
-        query = query.order_by(sort_column.desc())
-    else:
-        query = query.order_by(sort_column.asc())
-    
-    # 8. Apply pagination
-    query = query.limit(limit).offset(offset)
-    
-    # 9. Execute query and format results
-    results = query.all()
-    
-    # 10. Format the response
-    formatted_results = []
-    for anime in results:
-        formatted_results.append({
-            "id": anime.id,
-            "mal_id": anime.mal_id,
-            "title": anime.title,
-            "title_english": anime.title_english,
-            "type": anime.type,
-            "episodes": anime.episodes,
-            "score": anime.score,
-            "year": anime.year,
-            "season": anime.season,
-            "members": anime.members,
-            "image_url": anime.image_url,
-            "synopsis": anime.synopsis,
-            "genres": [{"id": g.id, "name": g.name} for g in anime.genres],
-            "studios": [{"id": s.id, "name": s.name} for s in anime.studios]
-        })
+        # 5. Filter by score range
+        if min_score is not None:
+            query = query.filter(Anime.score >= min_score)
+        if max_score is not None:
+            query = query.filter(Anime.score <= max_score)
+    
+        # 6. Get total count before pagination (cached per filter set until the data changes)
+        total = None
+        if include_total:
+            key = filter_key(
+                "search",
+                q=match_expression if text_search is not None and not fuzzy else q,
+                fuzzy=fuzzy or None,
+                genres=genre_filter.include,
+                genre_mode=genre_filter.mode if genre_filter.include else None,
+                exclude_genres=genre_filter.exclude,
+                studios=studio_filter.include,
+                studio_mode=studio_filter.mode if studio_filter.include else None,
+                exclude_studios=studio_filter.exclude,
+                types=type_list,
+                years=year_list,
+                min_score=min_score,
+                max_score=max_score,
+                facet_version=facet_version if use_bitmaps else None,
+                fuzzy_version=fuzzy_version if q and fuzzy else None
+            )
+            if use_bitmaps:
+                # 有 genres / studios 條件時 COUNT 要比對整個 id 清單，直接用 bitmaps 算
+                total = totals_cache.get_total(db, key, lambda: facet_index.match_count(
+                    db, q, genre_filter, type_list, year_list, min_score, max_score, studio_filter, fuzzy
+                ))
+            else:
+                total = cached_total(db, key, query)
+    
+        # 7. Apply sorting (id 當 tiebreaker，讓分頁順序穩定)
+        if sort_by is None:
+            sort_by = "relevance" if text_search is not None else "score"
+    
+        descending = order == "desc"
+        if sort_by == "relevance" and text_search is not None:
+            # bm25 / fuzzy 的 rank 越小越相關，所以 desc（最相關在前）對應 rank asc
+            sort_keys = [
+                SortKey(text_search.c.rank, not descending),
+                SortKey(Anime.id, not descending)
+            ]
+        else:
+            if sort_by == "members":
+                sort_column = Anime.members
+            elif sort_by == "year":
+                sort_column = Anime.year
+            elif sort_by == "title":
+                sort_column = Anime.title
+            else:  # score (relevance 但沒有 q 時也用 score)
+                sort_column = Anime.score
+            sort_keys = [
+                SortKey(sort_column, descending, nullable=True),
+                SortKey(Anime.id, descending)
+            ]
+    
+        # 8. Apply pagination (cursor 優先，否則用 offset) and execute query
+        results, next_cursor = paginate(
+            query, sort_keys, limit, offset, cursor,
+            cursor_key=f"search:{sort_by}:{order}"
+        )
+    
+        # 9. Format the response
+        formatted_results = serialize_anime_list(db, results, selection.columns, selection.relations)
+    
+        return {
+            "success": True,
+            "total": total,
+            "limit": limit,
+            "offset": offset,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None,
+            "data": formatted_results
+        }
+    
+    # ANIME_SEARCH_ENGINE=columnar：篩選、排序、分頁都在記憶體的 arrays 上做，
+    # SQLite 只讀這一頁的顯示欄位 (結果和上面的 SQL 完全相同)
+    def run_columnar_search(db: Session, sort_by):
+        page = columnar_search.search(
+            db, q,
+            genres=genre_filter,
+            studios=studio_filter,
+            types=[t.strip() for t in types.split(',') if t.strip()] if types else [],
+            years=[int(y.strip()) for y in years.split(',') if y.strip().isdigit()] if years else [],
+            min_score=min_score, max_score=max_score,
+            sort_by=sort_by, order=order, limit=limit, offset=offset, cursor=cursor,
+            include_total=include_total, fuzzy=fuzzy
+        )
+        results = fetch_page(db, page.ids, selection.columns)
+    
+        return {
+            "success": True,
+            "total": page.total,
+            "limit": limit,
+            "offset": offset,
+            "next_cursor": page.next_cursor,
+            "has_more": page.next_cursor is not None,
+            "data": serialize_anime_list(db, results, selection.columns, selection.relations)
+        }
+    
+    # 第一次用到的 index 在 threadpool 建好 (在 run_sync 裡建會佔住 event loop)
+    await build_off_loop(*[
+        index for index, used in (
+            (columnar_search, columnar_search.enabled),
+            # SQL 的路徑只有 genres / studios 條件用到 bitmaps
+            (facet_index, not columnar_search.enabled and has_tag_filters),
+            (fuzzy_title_index, bool(q and fuzzy)),
+        ) if used
+    ])
+    return await db.run_sync(run_search, sort_by)
+
+@app.get("/api/search/suggest")
+def suggest_titles(
+    prefix: str,
+    limit: int = SUGGEST_TOP,
+    db: Session = Depends(get_db)
+):
+    """
+    Typeahead suggestions: anime whose title or English title starts with `prefix`,
+    most members first (id, title and image_url only)
+    """
+    
+    if limit < 1 or limit > SUGGEST_TOP:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {SUGGEST_TOP}")
+    
+    # 記憶體裡排好的 titles 上 bisect (services/title_suggest.py)，不用 ilike / count / join
+    suggestions = title_suggest_index.suggest(db, prefix, limit)
+    
+    return {
+        "success": True,
+        "prefix": prefix,
+        "data": [
+            {"id": anime_id, "title": title, "image_url": image_url}
+            for anime_id, title, image_url in suggestions
+        ]
+    }
+
+@app.get("/api/search/semantic")
+async def semantic_search(
+    text: str,
+    limit: int = 24,
+    nprobe: int = DEFAULT_NPROBE,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Anime whose synopsis best matches a free-text description, best match first
+    - text: what you are looking for ("a detective solving murders in a small village")
+    - nprobe: index lists scanned (more = closer to exact, slower)
+    - similarity: cosine similarity of the synopsis vectors
+    """
+    
+    if limit < 1 or limit > 100:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
+    if nprobe < 1:
+        raise HTTPException(status_code=400, detail="nprobe must be at least 1")
+    
+    selection = select_fields(fields, SEARCH_FIELDS, extras=("similarity",))
+    
+    # IVF index 在磁碟上 (memory-mapped，services/semantic_index.py)，
+    # 只掃描最近的 nprobe 個 lists；SQLite 只讀這一頁的顯示欄位
+    def run_semantic_search(db: Session):
+        matches = semantic_index.search(text, limit, nprobe)
+        if matches is None:
+            return None
+        
+        results = serialize_anime_list(
+            db, fetch_page(db, [anime_id for anime_id, _ in matches], selection.columns),
+            selection.columns, selection.relations
+        )
+        if "similarity" in selection.extras:
+            scores = dict(matches)
+            for result in results:
+                result["similarity"] = round(scores[result["id"]], 4)
+        return results
+    
+    results = await db.run_sync(run_semantic_search)
+    if results is None:
+        raise HTTPException(status_code=503, detail="Semantic search index has not been built")
+    
+    return {
+        "success": True,
+        "text": text,
+        "total": len(results),
+        "data": results
+    }
+
+@app.get("/api/search/facets")
+async def get_search_facets(
+    q: Optional[str] = None,
+    genres: Optional[str] = None,
+    genre_mode: str = Query(default="any", regex="^(any|all)$"),
+    exclude_genres: Optional[str] = None,
+    studios: Optional[str] = None,
+    studio_mode: str = Query(default="any", regex="^(any|all)$"),
+    exclude_studios: Optional[str] = None,
+    types: Optional[str] = None,
+    years: Optional[str] = None,
+    min_score: Optional[float] = None,
+    max_score: Optional[float] = None,
+    fuzzy: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Result counts per genre, type, year and score bucket for a /api/search filter set
+    (same parameters as /api/search). Each facet ignores its own filter, so the counts
+    show what selecting another option of that dropdown would match.
+    """
+    genre_filter = TagFilter(
+        [g.strip() for g in genres.split(',') if g.strip()] if genres else [],
+        genre_mode,
+        [g.strip() for g in exclude_genres.split(',') if g.strip()] if exclude_genres else []
+    )
+    studio_filter = TagFilter(
+        [s.strip() for s in studios.split(',') if s.strip()] if studios else [],
+        studio_mode,
+        [s.strip() for s in exclude_studios.split(',') if s.strip()] if exclude_studios else []
+    )
+    type_list = [t.strip() for t in types.split(',') if t.strip()] if types else []
+    year_list = [int(y.strip()) for y in years.split(',') if y.strip().isdigit()] if years else []
+    
+    # 預先建立的 bitmaps：每個選項只是一次 AND + bit count，不用每個選項各查一次 COUNT
+    await build_off_loop(facet_index, *([fuzzy_title_index] if q and fuzzy else []))
+    total, facets = await db.run_sync(
+        facet_index.facet_counts, q, genre_filter, type_list, year_list, min_score, max_score, studio_filter, fuzzy
+    )
     
     return {
         "success": True,
         "total": total,
-        "limit": limit,
-        "offset": offset,
-        "data": formatted_results
+        "facets": facets
     }
 
 # =============================================================================
 # Discover Page Recommendations APIs
 # =============================================================================
 
-@app.get("/api/recommendations/popular")
-def get_popular_recommendations(
+@app.get("/api/recommendations/popular", response_model=AnimePage, response_model_exclude_unset=True)
+async def get_popular_recommendations(
     limit: int = 20,
     offset: int = 0,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get popular anime based on member count"""
     
     if limit < 1 or limit > 100:
         raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
     
-    # First, get total count with same filters
-    total_query = db.query(Anime).filter(
-        Anime.members != None,
-        Anime.score != None,
-        Anime.score >= 6.0
-    )
-    total = total_query.count()
+    selection = select_fields(fields)
     
-    # Then get paginated results
-    popular_anime = total_query.order_by(
-        Anime.members.desc()
-    ).offset(offset).limit(limit).all()
+    # 預先計算的排行 (ranked_lists)；還沒建立時直接查 anime
+    popular_anime, next_cursor, total = await db.run_sync(
+        discover_page, "popular", limit, offset, cursor, include_total, selection.columns
+    )
     
-    results = []
-    for anime in popular_anime:
-        results.append({
-            "id": anime.id,
-            "mal_id": anime.mal_id,
-            "title": anime.title,
-            "title_english": anime.title_english,
-            "type": anime.type,
-            "episodes": anime.episodes,
-            "score": anime.score,
-            "year": anime.year,
-            "season": anime.season,
-            "members": anime.members,
-            "favorites": anime.favorites,
-            "image_url": anime.image_url,
-            "synopsis": anime.synopsis,
-            "genres": [{"id": g.id, "name": g.name} for g in anime.genres],
-            "studios": [{"id": s.id, "name": s.name} for s in anime.studios]
-        })
+    results = await db.run_sync(
+        serialize_anime_list, popular_anime, selection.columns, selection.relations
+    )
     
     return {
         "success": True,
@@ -390,53 +768,35 @@ def get_popular_recommendations(
         "total": total,  # This is the total count in database
         "limit": limit,
         "offset": offset,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None,
         "data": results,
         "message": f"Retrieved {len(results)} popular anime"
     }
 
-@app.get("/api/recommendations/top-rated")
-def get_top_rated_recommendations(
+@app.get("/api/recommendations/top-rated", response_model=AnimePage, response_model_exclude_unset=True)
+async def get_top_rated_recommendations(
     limit: int = 20,
     offset: int = 0,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get top rated anime"""
     
     if limit < 1 or limit > 100:
         raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
     
-    # First, get total count with same filters
-    total_query = db.query(Anime).filter(
-        Anime.score >= 8.0,
-        Anime.members >= 50000
+    selection = select_fields(fields)
+    
+    top_rated, next_cursor, total = await db.run_sync(
+        discover_page, "top-rated", limit, offset, cursor, include_total, selection.columns
     )
-    total = total_query.count()
-
-    # Then get paginated results
-    top_rated = total_query.order_by(
-        Anime.score.desc(),
-        Anime.members.desc()
-    ).offset(offset).limit(limit).all()
     
-    results = []
-    for anime in top_rated:
-        results.append({
-            "id": anime.id,
-            "mal_id": anime.mal_id,
-            "title": anime.title,
-            "title_english": anime.title_english,
-            "type": anime.type,
-            "episodes": anime.episodes,
-            "score": anime.score,
-            "year": anime.year,
-            "season": anime.season,
-            "members": anime.members,
-            "favorites": anime.favorites,
-            "image_url": anime.image_url,
-            "synopsis": anime.synopsis,
-            "genres": [{"id": g.id, "name": g.name} for g in anime.genres],
-            "studios": [{"id": s.id, "name": s.name} for s in anime.studios]
-        })
+    results = await db.run_sync(
+        serialize_anime_list, top_rated, selection.columns, selection.relations
+    )
     
     return {
         "success": True,
@@ -448,69 +808,41 @@ def get_top_rated_recommendations(
         "total": total,
         "limit": limit,
         "offset": offset,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None,
         "data": results,
         "message": f"Retrieved {len(results)} top rated anime"
     }
 
-@app.get("/api/recommendations/hidden-gems")
-def get_hidden_gems_recommendations(
+@app.get("/api/recommendations/hidden-gems", response_model=AnimePage, response_model_exclude_unset=True)
+async def get_hidden_gems_recommendations(
     limit: int = 20,
     offset: int = 0,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get hidden gem anime"""
     
     if limit < 1 or limit > 100:
         raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
     
-    # Get all matching anime first
-    hidden_gems = db.query(Anime).filter(
-        Anime.score >= 7.5,
-        Anime.members >= 10000,
-        Anime.members <= 100000,
-        Anime.favorites != None
-    ).all()
-    
-    # Calculate favorite ratios
-    gems_with_ratio = []
-    for anime in hidden_gems:
-        if anime.members > 0:
-            fav_ratio = anime.favorites / anime.members
-            gems_with_ratio.append({
-                "anime": anime,
-                "fav_ratio": fav_ratio
-            })
-    
-    # Sort by favorite ratio
-    gems_with_ratio.sort(key=lambda x: x["fav_ratio"], reverse=True)
-    
-    # Get total count
-    total = len(gems_with_ratio)
-    
-    # Apply pagination
-    paginated_gems = gems_with_ratio[offset:offset + limit]
+    selection = select_fields(fields, extras=("favorites_ratio",))
+    with_ratio = "favorites_ratio" in selection.extras
+    columns = selection.columns + ("favorites", "members") if with_ratio else selection.columns
     
-    results = []
-    for item in gems_with_ratio[:limit]:
-        anime = item["anime"]
-        results.append({
-            "id": anime.id,
-            "mal_id": anime.mal_id,
-            "title": anime.title,
-            "title_english": anime.title_english,
-            "type": anime.type,
-            "episodes": anime.episodes,
-            "score": anime.score,
-            "year": anime.year,
-            "season": anime.season,
-            "members": anime.members,
-            "favorites": anime.favorites,
-            "image_url": anime.image_url,
-            "synopsis": anime.synopsis,
-            "genres": [{"id": g.id, "name": g.name} for g in anime.genres],
-            "studios": [{"id": s.id, "name": s.name} for s in anime.studios],
-            "favorites_ratio": round(item["fav_ratio"] * 100, 2)
-        })
+    # favorites / members 的排序在 SQL 裡做 (partial index)，只讀這一頁
+    hidden_gems, next_cursor, total = await db.run_sync(
+        discover_page, "hidden-gems", limit, offset, cursor, include_total, columns
+    )
+    
+    results = await db.run_sync(
+        serialize_anime_list, hidden_gems, selection.columns, selection.relations
+    )
+    if with_ratio:
+        for result, anime in zip(results, hidden_gems):
+            result["favorites_ratio"] = round(anime.favorites / anime.members * 100, 2)
     
     return {
         "success": True,
@@ -523,55 +855,37 @@ def get_hidden_gems_recommendations(
         "total": total,
         "limit": limit,
         "offset": offset,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None,
         "data": results,
         "message": f"Retrieved {len(results)} hidden gem anime"
     }
 
-@app.get("/api/recommendations/latest")
-def get_latest_recommendations(
+@app.get("/api/recommendations/latest", response_model=AnimePage, response_model_exclude_unset=True)
+async def get_latest_recommendations(
     limit: int = 20,
     offset: int = 0,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get latest anime"""
     
     if limit < 1 or limit > 100:
         raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
     
-    current_year = date.today().year
-    years = [current_year, current_year - 1]
+    selection = select_fields(fields)
     
-    # Count total first
-    total_query = db.query(Anime).filter(
-        Anime.year.in_(years),
-        Anime.score >= 6.5
+    years = discover_years()
+    
+    latest, next_cursor, total = await db.run_sync(
+        discover_page, "latest", limit, offset, cursor, include_total, selection.columns
     )
-    total = total_query.count()
-
-    latest = total_query.order_by(
-        Anime.year.desc(),
-        Anime.members.desc()
-    ).offset(offset).limit(limit).all()
     
-    results = []
-    for anime in latest:
-        results.append({
-            "id": anime.id,
-            "mal_id": anime.mal_id,
-            "title": anime.title,
-            "title_english": anime.title_english,
-            "type": anime.type,
-            "episodes": anime.episodes,
-            "score": anime.score,
-            "year": anime.year,
-            "season": anime.season,
-            "members": anime.members,
-            "favorites": anime.favorites,
-            "image_url": anime.image_url,
-            "synopsis": anime.synopsis,
-            "genres": [{"id": g.id, "name": g.name} for g in anime.genres],
-            "studios": [{"id": s.id, "name": s.name} for s in anime.studios]
-        })
+    results = await db.run_sync(
+        serialize_anime_list, latest, selection.columns, selection.relations
+    )
     
     return {
         "success": True,
@@ -583,56 +897,37 @@ def get_latest_recommendations(
         "total": total,
         "limit": limit,
         "offset": offset,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None,
         "data": results,
         "message": f"Retrieved {len(results)} latest anime"
     }
 
-@app.get("/api/recommendations/trending")
-def get_trending_recommendations(
+@app.get("/api/recommendations/trending", response_model=AnimePage, response_model_exclude_unset=True)
+async def get_trending_recommendations(
     limit: int = 20,
     offset: int = 0,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get trending anime"""
     
     if limit < 1 or limit > 100:
         raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
     
-    current_year = date.today().year
-    years = [current_year, current_year - 1]
+    selection = select_fields(fields)
     
-    # Count total first
-    total_query = db.query(Anime).filter(
-        Anime.year.in_(years),
-        Anime.score >= 7.0,
-        Anime.members >= 50000
+    years = discover_years()
+    
+    trending, next_cursor, total = await db.run_sync(
+        discover_page, "trending", limit, offset, cursor, include_total, selection.columns
     )
-    total = total_query.count()
-
-    # Get paginated results
-    trending = total_query.order_by(
-        Anime.members.desc()
-    ).offset(offset).limit(limit).all()
     
-    results = []
-    for anime in trending:
-        results.append({
-            "id": anime.id,
-            "mal_id": anime.mal_id,
-            "title": anime.title,
-            "title_english": anime.title_english,
-            "type": anime.type,
-            "episodes": anime.episodes,
-            "score": anime.score,
-            "year": anime.year,
-            "season": anime.season,
-            "members": anime.members,
-            "favorites": anime.favorites,
-            "image_url": anime.image_url,
-            "synopsis": anime.synopsis,
-            "genres": [{"id": g.id, "name": g.name} for g in anime.genres],
-            "studios": [{"id": s.id, "name": s.name} for s in anime.studios]
-        })
+    results = await db.run_sync(
+        serialize_anime_list, trending, selection.columns, selection.relations
+    )
     
     return {
         "success": True,
@@ -645,63 +940,59 @@ def get_trending_recommendations(
         "total": total,
         "limit": limit,
         "offset": offset,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None,
         "data": results,
         "message": f"Retrieved {len(results)} trending anime"
     }
 
-@app.get("/api/recommendations/genre/{genre_name}")
-def get_genre_recommendations(
+@app.get("/api/recommendations/genre/{genre_name}", response_model=AnimePage, response_model_exclude_unset=True)
+async def get_genre_recommendations(
     genre_name: str,
     limit: int = 20,
-    offset: int = 0, 
-    db: Session = Depends(get_db)
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get anime by genre"""
     
     if limit < 1 or limit > 100:
         raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
     
-    genre = db.query(Genre).filter(
+    selection = select_fields(fields)
+    
+    genre = await db.scalar(select(Genre).where(
         func.lower(Genre.name) == func.lower(genre_name)
-    ).first()
+    ).limit(1))
     
     if not genre:
         raise HTTPException(status_code=404, detail=f"Genre '{genre_name}' not found")
     
-    # Count total first
-    total_query = db.query(Anime).join(
-        anime_genres, Anime.id == anime_genres.c.anime_id
-    ).filter(
-        anime_genres.c.genre_id == genre.id,
-        Anime.score >= 6.5
-    )
-    total = total_query.count()
-    
-    # Get paginated results
-    genre_anime = total_query.order_by(
-        Anime.score.desc(),
-        Anime.members.desc()
-    ).offset(offset).limit(limit).all()
-    
-    results = []
-    for anime in genre_anime:
-        results.append({
-            "id": anime.id,
-            "mal_id": anime.mal_id,
-            "title": anime.title,
-            "title_english": anime.title_english,
-            "type": anime.type,
-            "episodes": anime.episodes,
-            "score": anime.score,
-            "year": anime.year,
-            "season": anime.season,
-            "members": anime.members,
-            "favorites": anime.favorites,
-            "image_url": anime.image_url,
-            "synopsis": anime.synopsis,
-            "genres": [{"id": g.id, "name": g.name} for g in anime.genres],
-            "studios": [{"id": s.id, "name": s.name} for s in anime.studios]
-        })
+    # 查詢是同步的 ORM 程式碼，run_sync 在 event loop 的 thread 上執行 (只有 SQLite 呼叫交給 aiosqlite)
+    def load_page(db: Session):
+        # Count total first
+        total_query = db.query(anime_columns(selection.columns)).join(
+            anime_genres, Anime.id == anime_genres.c.anime_id
+        ).filter(
+            anime_genres.c.genre_id == genre.id,
+            Anime.score >= 6.5
+        )
+        total = cached_total(db, filter_key("genre", genre_id=genre.id), total_query) if include_total else None
+    
+        # Get paginated results
+        genre_anime, next_cursor = paginate(
+            total_query,
+            [SortKey(Anime.score), SortKey(Anime.members), SortKey(Anime.id)],
+            limit, offset, cursor, cursor_key=f"genre:{genre.id}"
+        )
+    
+        results = serialize_anime_list(db, genre_anime, selection.columns, selection.relations)
+        
+        return results, next_cursor, total
+    
+    results, next_cursor, total = await db.run_sync(load_page)
     
     return {
         "success": True,
@@ -710,6 +1001,8 @@ def get_genre_recommendations(
         "total": total,
         "limit": limit,
         "offset": offset,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None,
         "data": results,
         "message": f"Retrieved {len(results)} anime in {genre.name} genre"
     }
@@ -728,59 +1021,53 @@ def get_genres_list(db: Session = Depends(get_db)):
         "data": [{"id": g.id, "name": g.name} for g in genres]
     }
 
-@app.get("/api/recommendations/studio/{studio_name}")
-def get_studio_recommendations(
+@app.get("/api/recommendations/studio/{studio_name}", response_model=AnimePage, response_model_exclude_unset=True)
+async def get_studio_recommendations(
     studio_name: str,
     limit: int = 20,
     offset: int = 0,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get anime by studio"""
     
     if limit < 1 or limit > 100:
         raise HTTPException(status_code=400, detail="limit must be between 1 and 100")
     
-    studio = db.query(Studio).filter(
+    selection = select_fields(fields)
+    
+    studio = await db.scalar(select(Studio).where(
         func.lower(Studio.name) == func.lower(studio_name)
-    ).first()
+    ).limit(1))
     
     if not studio:
         raise HTTPException(status_code=404, detail=f"Studio '{studio_name}' not found")
     
-    # Count total first
-    total_query = db.query(Anime).join(
-        anime_studios, Anime.id == anime_studios.c.anime_id
-    ).filter(
-        anime_studios.c.studio_id == studio.id,
-        Anime.score >= 6.0
-    )
-    total = total_query.count()
-    
-    # Get paginated results
-    studio_anime = total_query.order_by(
-        Anime.score.desc(),
-        Anime.members.desc()
-    ).offset(offset).limit(limit).all()
-    
-    results = []
-    for anime in studio_anime:
-        results.append({
-            "id": anime.id,
-            "mal_id": anime.mal_id,
-            "title": anime.title,
-            "title_english": anime.title_english,
-            "type": anime.type,
-            "episodes": anime.episodes,
-            "score": anime.score,
-            "year": anime.year,
-            "season": anime.season,
-            "members": anime.members,
-            "favorites": anime.favorites,
-            "image_url": anime.image_url,
-            "synopsis": anime.synopsis,
-            "genres": [{"id": g.id, "name": g.name} for g in anime.genres],
-            "studios": [{"id": s.id, "name": s.name} for s in anime.studios]
-        })
+    # 查詢是同步的 ORM 程式碼，run_sync 在 event loop 的 thread 上執行 (只有 SQLite 呼叫交給 aiosqlite)
+    def load_page(db: Session):
+        # Count total first
+        total_query = db.query(anime_columns(selection.columns)).join(
+            anime_studios, Anime.id == anime_studios.c.anime_id
+        ).filter(
+            anime_studios.c.studio_id == studio.id,
+            Anime.score >= 6.0
+        )
+        total = cached_total(db, filter_key("studio", studio_id=studio.id), total_query) if include_total else None
+    
+        # Get paginated results
+        studio_anime, next_cursor = paginate(
+            total_query,
+            [SortKey(Anime.score), SortKey(Anime.members), SortKey(Anime.id)],
+            limit, offset, cursor, cursor_key=f"studio:{studio.id}"
+        )
+    
+        results = serialize_anime_list(db, studio_anime, selection.columns, selection.relations)
+        
+        return results, next_cursor, total
+    
+    results, next_cursor, total = await db.run_sync(load_page)
     
     return {
         "success": True,
@@ -789,6 +1076,8 @@ def get_studio_recommendations(
         "total": total,
         "limit": limit,
         "offset": offset,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor is not None,
         "data": results,
         "message": f"Retrieved {len(results)} anime from {studio.name}"
     }
@@ -800,14 +1089,15 @@ def get_studios_list(
 ):
     """Get list of featured studios"""
     
+    # 以 anime_studios 分組，走 (studio_id, anime_id) covering index
     studios_with_count = db.query(
         Studio.id,
         Studio.name,
         func.count(anime_studios.c.anime_id).label('anime_count')
-    ).join(
-        anime_studios, Studio.id == anime_studios.c.studio_id
+    ).select_from(anime_studios).join(
+        Studio, Studio.id == anime_studios.c.studio_id
     ).group_by(
-        Studio.id, Studio.name
+        anime_studios.c.studio_id
     ).having(
         func.count(anime_studios.c.anime_id) >= 5
     ).order_by(
@@ -1,17 +1,21 @@
 from .database import (
     get_db,      # 資料庫 session 的 dependency
+    get_async_db,  # async endpoints 用的 AsyncSession dependency
     Anime,       # Anime 模型
     Genre,       # Genre 模型
     Studio,      # Studio 模型
     anime_genres,  # 多對多關聯表
     anime_studios  # 多對多關聯表
 )
+from .migrations import run_migrations  # 套用 schema migrations
 
 __all__ = [
     "get_db",
+    "get_async_db",
     "Anime",
     "Genre",
     "Studio",
     "anime_genres",
-    "anime_studios"
+    "anime_studios",
+    "run_migrations"
 ]
\ No newline at end of file
@@ -1,5 +1,6 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, Text, DateTime, Table, ForeignKey
+from sqlalchemy import create_engine, event, Column, Integer, String, Float, Text, DateTime, Table, ForeignKey
 from sqlalchemy.orm import declarative_base, relationship, sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 import os
 
 Base = declarative_base()
@@ -71,13 +72,58 @@ class Studio(Base):
 
 # 找到 anime.db 的路徑
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DATABASE_PATH = os.path.join(BASE_DIR, 'anime.db')
+# 可以用環境變數 ANIME_DB_PATH 指定其他資料庫（例如 scripts/ 產生的測試資料庫）
+DATABASE_PATH = os.environ.get('ANIME_DB_PATH', os.path.join(BASE_DIR, 'anime.db'))
 
-# Create engine（連接資料庫）
-engine = create_engine(f'sqlite:///{DATABASE_PATH}')
+# SQLite 連線設定：每個新連線建立時套用（都可以用環境變數調整）
+SQLITE_PROFILE = {
+    # 先設定 busy_timeout，切換 journal_mode 遇到 lock 時才會等待而不是直接失敗
+    "busy_timeout": int(os.environ.get('ANIME_DB_BUSY_TIMEOUT_MS', 5000)),
+    # WAL：寫入 (update_anime_stats.py) 進行中，讀取也不會被 lock 擋住
+    "journal_mode": os.environ.get('ANIME_DB_JOURNAL_MODE', 'wal'),
+    # WAL 模式下 normal 不會損壞資料庫，只是斷電時可能少最後幾筆 commit
+    "synchronous": "normal",
+    "mmap_size": int(os.environ.get('ANIME_DB_MMAP_MB', 256)) * 1024 * 1024,
+    # 負數的單位是 KiB
+    "cache_size": -int(os.environ.get('ANIME_DB_CACHE_MB', 32)) * 1024,
+    "temp_store": "memory",
+}
+
+# API 讀取用的 connection 數量，對應同時處理 request 的 worker 數（Starlette threadpool 預設 40）
+READER_POOL_SIZE = int(os.environ.get('ANIME_DB_READERS', 40))
+
+
+def apply_sqlite_profile(engine, query_only=False):
+    """Run SQLITE_PROFILE pragmas (plus query_only for API readers) on every new connection"""
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PROFILE.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        if query_only:
+            cursor.execute("PRAGMA query_only = 1")
+        cursor.close()
+
+    return engine
+
+
+# Create engine（連接資料庫）：migrations、排行重建等會寫入的工作用這個
+engine = apply_sqlite_profile(create_engine(f'sqlite:///{DATABASE_PATH}'))
+
+# API 讀取專用 engine：query_only，connection 數量固定為 READER_POOL_SIZE，
+# 不會因為 overflow 的 connection 用完就關掉而每次都從冷的 page cache 開始
+read_engine = apply_sqlite_profile(
+    create_engine(
+        f'sqlite:///{DATABASE_PATH}',
+        pool_size=READER_POOL_SIZE,
+        max_overflow=0,
+    ),
+    query_only=True,
+)
 
 # Create session factory（建立 session 工廠）
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 # Dependency function（FastAPI 用來取得 database session）
 def get_db():
@@ -85,4 +131,19 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Async engine（aiosqlite）：async endpoints 用，等待 SQLite 時不會佔住 threadpool 的 thread
+async_engine = create_async_engine(
+    f'sqlite+aiosqlite:///{DATABASE_PATH}',
+    pool_size=READER_POOL_SIZE,
+    max_overflow=0,
+)
+apply_sqlite_profile(async_engine.sync_engine, query_only=True)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Async dependency function（async endpoints 用）
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
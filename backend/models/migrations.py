@@ -0,0 +1,244 @@
+"""
+Versioned schema migrations for anime.db.
+
+The applied version is stored in SQLite's `PRAGMA user_version`, so each step
+runs once per database. Steps are plain SQL strings or callables that take a
+connection; every statement is written to be safe to re-run.
+
+Usage (from backend/):
+    python -m models.migrations
+"""
+from sqlalchemy import text
+
+from .database import engine
+
+# 這些 table 有任何寫入時 data_version 就 +1（快取用來判斷資料是否更新）
+DATA_VERSION_TABLES = ["anime", "genres", "studios", "anime_genres", "anime_studios"]
+
+
+def _data_version_triggers():
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS data_version_{table}_{event.lower()} "
+        f"AFTER {event} ON {table} BEGIN "
+        "UPDATE data_version SET version = version + 1 WHERE id = 1; "
+        "END"
+        for table in DATA_VERSION_TABLES
+        for event in ("INSERT", "UPDATE", "DELETE")
+    ]
+
+
+MIGRATIONS = [
+    (
+        1,
+        "Indexes for /api/search and /api/recommendations/* filters and sorts",
+        [
+            # score 排序 / top-rated / hidden-gems / random
+            "CREATE INDEX IF NOT EXISTS ix_anime_score_members ON anime (score, members)",
+            # popular (members 排序) / hidden-gems (members 範圍)
+            "CREATE INDEX IF NOT EXISTS ix_anime_members_score ON anime (members, score)",
+            # latest / trending / years 篩選 / year 排序
+            "CREATE INDEX IF NOT EXISTS ix_anime_year_members ON anime (year, members)",
+            # types 篩選
+            "CREATE INDEX IF NOT EXISTS ix_anime_type_score ON anime (type, score)",
+            # title 排序
+            "CREATE INDEX IF NOT EXISTS ix_anime_title ON anime (title)",
+            # 多對多關聯表：兩個方向都是 covering index
+            "CREATE INDEX IF NOT EXISTS ix_anime_genres_anime_genre ON anime_genres (anime_id, genre_id)",
+            "CREATE INDEX IF NOT EXISTS ix_anime_genres_genre_anime ON anime_genres (genre_id, anime_id)",
+            "CREATE INDEX IF NOT EXISTS ix_anime_studios_anime_studio ON anime_studios (anime_id, studio_id)",
+            "CREATE INDEX IF NOT EXISTS ix_anime_studios_studio_anime ON anime_studios (studio_id, anime_id)",
+            # genre / studio 名稱查詢 (func.lower(name) == func.lower(...)) 與排序
+            "CREATE INDEX IF NOT EXISTS ix_genres_name ON genres (name)",
+            "CREATE INDEX IF NOT EXISTS ix_genres_lower_name ON genres (lower(name))",
+            "CREATE INDEX IF NOT EXISTS ix_studios_lower_name ON studios (lower(name))",
+        ],
+    ),
+    (
+        2,
+        "FTS5 full-text index over title, title_english and synopsis",
+        [
+            # external content table：文字只存在 anime 裡，FTS 只存索引
+            "CREATE VIRTUAL TABLE IF NOT EXISTS anime_fts USING fts5("
+            "title, title_english, synopsis, "
+            "content='anime', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+            # triggers：fetch_and_save / update_anime_stats 寫入時自動同步
+            "CREATE TRIGGER IF NOT EXISTS anime_fts_insert AFTER INSERT ON anime BEGIN "
+            "INSERT INTO anime_fts (rowid, title, title_english, synopsis) "
+            "VALUES (new.id, new.title, new.title_english, new.synopsis); "
+            "END",
+            "CREATE TRIGGER IF NOT EXISTS anime_fts_delete AFTER DELETE ON anime BEGIN "
+            "INSERT INTO anime_fts (anime_fts, rowid, title, title_english, synopsis) "
+            "VALUES ('delete', old.id, old.title, old.title_english, old.synopsis); "
+            "END",
+            "CREATE TRIGGER IF NOT EXISTS anime_fts_update "
+            "AFTER UPDATE OF title, title_english, synopsis ON anime BEGIN "
+            "INSERT INTO anime_fts (anime_fts, rowid, title, title_english, synopsis) "
+            "VALUES ('delete', old.id, old.title, old.title_english, old.synopsis); "
+            "INSERT INTO anime_fts (rowid, title, title_english, synopsis) "
+            "VALUES (new.id, new.title, new.title_english, new.synopsis); "
+            "END",
+            # 既有資料一次建立索引
+            "INSERT INTO anime_fts (anime_fts) VALUES ('rebuild')",
+        ],
+    ),
+    (
+        3,
+        "data_version counter bumped by triggers on every data write",
+        [
+            "CREATE TABLE IF NOT EXISTS data_version ("
+            "id INTEGER PRIMARY KEY CHECK (id = 1), "
+            "version INTEGER NOT NULL)",
+            "INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)",
+            *_data_version_triggers(),
+        ],
+    ),
+    (
+        4,
+        "ranked_lists for the precomputed Discover categories",
+        [
+            # (category, generation, rank) 是 primary key：每一頁都是一段 range read
+            "CREATE TABLE IF NOT EXISTS ranked_lists ("
+            "category TEXT NOT NULL, "
+            "generation INTEGER NOT NULL, "
+            "rank INTEGER NOT NULL, "
+            "anime_id INTEGER NOT NULL, "
+            "PRIMARY KEY (category, generation, rank)) WITHOUT ROWID",
+            # 每個 category 目前使用中的 generation（swap 就是改這一列）
+            "CREATE TABLE IF NOT EXISTS ranked_list_meta ("
+            "category TEXT PRIMARY KEY, "
+            "generation INTEGER NOT NULL, "
+            "total INTEGER NOT NULL, "
+            "params TEXT NOT NULL, "
+            "data_version INTEGER, "
+            "built_at TEXT NOT NULL)",
+        ],
+    ),
+    (
+        5,
+        "Partial expression index for hidden-gems ordered by favorites ratio",
+        [
+            # 只包含 hidden-gems 條件內的 anime，依 favorites / members 排好
+            # (expression 必須和 services/ranked_lists.py 的 FAVORITES_RATIO 一字不差)
+            "CREATE INDEX IF NOT EXISTS ix_anime_hidden_gems_ratio "
+            "ON anime (CAST(favorites AS FLOAT) / members, id) "
+            "WHERE score >= 7.5 AND members >= 10000 AND members <= 100000 "
+            "AND favorites IS NOT NULL",
+        ],
+    ),
+    (
+        6,
+        "anime_relations from Jikan and the precomputed franchise_members",
+        [
+            # 用 mal_id 存：related 那一部不一定在資料庫裡
+            "CREATE TABLE IF NOT EXISTS anime_relations ("
+            "anime_mal_id INTEGER NOT NULL, "
+            "related_mal_id INTEGER NOT NULL, "
+            "relation TEXT NOT NULL, "
+            "related_title TEXT, "
+            "PRIMARY KEY (anime_mal_id, related_mal_id, relation)) WITHOUT ROWID",
+            # 哪些動漫已經抓過 relations（沒有 relation 的也要記，才能續抓）
+            "CREATE TABLE IF NOT EXISTS relations_fetched ("
+            "anime_mal_id INTEGER PRIMARY KEY, "
+            "fetched_at TEXT NOT NULL)",
+            # 同一個 franchise 依播出順序排好；不在資料庫裡的作品 anime_id 是 NULL
+            "CREATE TABLE IF NOT EXISTS franchise_members ("
+            "franchise_id INTEGER NOT NULL, "
+            "position INTEGER NOT NULL, "
+            "mal_id INTEGER NOT NULL, "
+            "anime_id INTEGER, "
+            "title TEXT, "
+            "PRIMARY KEY (franchise_id, position)) WITHOUT ROWID",
+            "CREATE INDEX IF NOT EXISTS ix_franchise_members_anime ON franchise_members (anime_id)",
+        ],
+    ),
+    (
+        7,
+        "Precomputed similar_anime neighbours (services/similar.py)",
+        [
+            # 每部動漫的前 K 個相似作品，依 rank 排好
+            "CREATE TABLE IF NOT EXISTS similar_anime ("
+            "anime_id INTEGER NOT NULL, "
+            "rank INTEGER NOT NULL, "
+            "neighbor_id INTEGER NOT NULL, "
+            "score REAL NOT NULL, "
+            "PRIMARY KEY (anime_id, rank)) WITHOUT ROWID",
+        ],
+    ),
+    (
+        8,
+        "Precomputed synopsis_similar neighbours (services/story_similar.py)",
+        [
+            # 和 similar_anime 同樣的欄位，依 synopsis 的 TF-IDF 相似度
+            "CREATE TABLE IF NOT EXISTS synopsis_similar ("
+            "anime_id INTEGER NOT NULL, "
+            "rank INTEGER NOT NULL, "
+            "neighbor_id INTEGER NOT NULL, "
+            "score REAL NOT NULL, "
+            "PRIMARY KEY (anime_id, rank)) WITHOUT ROWID",
+        ],
+    ),
+    (
+        9,
+        "title_suggest_changes for incremental /api/search/suggest updates",
+        [
+            # 每部動漫最後一次改動時的 data_version (services/title_suggest.py 只 patch 這些)
+            "CREATE TABLE IF NOT EXISTS title_suggest_changes ("
+            "anime_id INTEGER PRIMARY KEY, "
+            "version INTEGER NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS ix_title_suggest_changes_version ON title_suggest_changes (version)",
+            *[
+                f"CREATE TRIGGER IF NOT EXISTS title_suggest_{name} AFTER {event} ON anime BEGIN "
+                "INSERT OR REPLACE INTO title_suggest_changes (anime_id, version) "
+                f"VALUES ({row}.id, (SELECT version FROM data_version WHERE id = 1)); "
+                "END"
+                for name, event, row in (
+                    ("insert", "INSERT", "new"),
+                    ("update", "UPDATE OF title, title_english, members, image_url", "new"),
+                    ("delete", "DELETE", "old"),
+                )
+            ],
+        ],
+    ),
+]
+
+
+def get_schema_version(conn):
+    """Return the migration version recorded in the database"""
+    return conn.execute(text("PRAGMA user_version")).scalar()
+
+
+def run_migrations(bind=engine):
+    """Apply pending migrations and refresh planner statistics"""
+    applied = []
+
+    with bind.begin() as conn:
+        current_version = get_schema_version(conn)
+
+        for version, description, steps in MIGRATIONS:
+            if version <= current_version:
+                continue
+
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.exec_driver_sql(step)
+
+            conn.exec_driver_sql(f"PRAGMA user_version = {int(version)}")
+            applied.append((version, description))
+
+        if applied:
+            conn.exec_driver_sql("ANALYZE")
+
+    return applied
+
+
+if __name__ == "__main__":
+    applied = run_migrations()
+
+    if applied:
+        for version, description in applied:
+            print(f"✅ Migration {version}: {description}")
+    else:
+        print("ℹ️  Database is already up to date")
@@ -0,0 +1,13 @@
+from .anime import (
+    NamedRef,      # genre / studio
+    AnimeSummary,  # 列表頁面的一筆
+    AnimeDetail,   # 單部動漫的完整資料
+    AnimePage      # 分頁 response (search / recommendations)
+)
+
+__all__ = [
+    "NamedRef",
+    "AnimeSummary",
+    "AnimeDetail",
+    "AnimePage"
+]
@@ -0,0 +1,81 @@
+"""
+Response models for the anime list / detail endpoints.
+
+Endpoints return plain dicts; FastAPI validates them against these models in
+pydantic-core and ORJSONResponse renders the result, instead of walking every
+value with `jsonable_encoder`. Routes use `response_model_exclude_unset=True`,
+so keys an endpoint does not set (e.g. `favorites` on /api/search, `criteria`
+on popular) are left out and the JSON keeps its existing shape. Field order is
+the JSON key order.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+
+class NamedRef(BaseModel):
+    """A genre or studio"""
+    id: int
+    name: Optional[str] = None
+
+
+class AnimeSummary(BaseModel):
+    """One item of /api/search and /api/recommendations/* (SEARCH_FIELDS / RECOMMENDATION_FIELDS)"""
+    id: int
+    mal_id: Optional[int] = None
+    title: Optional[str] = None
+    title_english: Optional[str] = None
+    type: Optional[str] = None
+    episodes: Optional[int] = None
+    score: Optional[float] = None
+    year: Optional[int] = None
+    season: Optional[str] = None
+    members: Optional[int] = None
+    favorites: Optional[int] = None
+    image_url: Optional[str] = None
+    synopsis: Optional[str] = None
+    genres: List[NamedRef] = []
+    studios: List[NamedRef] = []
+    # 只有 hidden-gems 有
+    favorites_ratio: Optional[float] = None
+
+
+class AnimeDetail(BaseModel):
+    """/api/anime/{id} (DETAIL_FIELDS)"""
+    id: int
+    mal_id: Optional[int] = None
+    title: Optional[str] = None
+    title_english: Optional[str] = None
+    type: Optional[str] = None
+    episodes: Optional[int] = None
+    score: Optional[float] = None
+    rank: Optional[int] = None
+    popularity: Optional[int] = None
+    members: Optional[int] = None
+    favorites: Optional[int] = None
+    year: Optional[int] = None
+    season: Optional[str] = None
+    image_url: Optional[str] = None
+    synopsis: Optional[str] = None
+    aired_from: Optional[datetime] = None
+    aired_to: Optional[datetime] = None
+    demographic: Optional[str] = None
+    genres: List[NamedRef] = []
+    studios: List[NamedRef] = []
+
+
+class AnimePage(BaseModel):
+    """Paginated envelope of /api/search and /api/recommendations/*"""
+    success: bool = True
+    category: Optional[str] = None
+    criteria: Optional[Dict[str, Any]] = None
+    genre: Optional[str] = None
+    studio: Optional[str] = None
+    total: Optional[int] = None
+    limit: int
+    offset: int
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+    data: List[AnimeSummary]
+    message: Optional[str] = None
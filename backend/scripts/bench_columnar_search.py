@@ -0,0 +1,126 @@
+"""
+Benchmark /api/search: SQL vs. the NumPy columnar engine (services/columnar.py).
+
+Runs the same searches through search_anime() with the engine off and on.
+Every page must be identical (data, total, next_cursor), and the next two
+pages reached through the cursor and through offset must match too. Reports
+the median latency of the first page; the arrays are built before timing
+(once per data version, like at startup).
+
+Usage (from backend/):
+    python scripts/bench_columnar_search.py --rows 16000
+    python scripts/bench_columnar_search.py --rows 100000
+    python scripts/bench_columnar_search.py --rows 1000000 --runs 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "scripts"))
+
+parser = argparse.ArgumentParser(description="Benchmark SQL vs. columnar /api/search")
+parser.add_argument("--rows", type=int, default=100000)
+parser.add_argument("--db", default=None)
+parser.add_argument("--runs", type=int, default=20)
+args = parser.parse_args()
+
+DB_PATH = args.db or f"/tmp/anime_bench_{args.rows}.db"
+# 必須在 import models 之前設定，engine 會在 import 時建立
+os.environ["ANIME_DB_PATH"] = DB_PATH
+
+from synthetic_db import build_synthetic_db  # noqa: E402
+
+if not os.path.exists(DB_PATH):
+    print(f"📦 Building synthetic database with {args.rows:,} rows...")
+    build_synthetic_db(DB_PATH, rows=args.rows)
+
+from models import run_migrations  # noqa: E402
+from models.database import AsyncSessionLocal, SessionLocal  # noqa: E402
+from services import columnar_search, totals_cache  # noqa: E402
+from main import search_anime  # noqa: E402
+
+run_migrations()
+
+# endpoints 是 async，每次都在同一個 event loop 上執行
+run = asyncio.new_event_loop().run_until_complete
+
+SEARCHES = [
+    ("score (default)", {}),
+    ("members asc", {"sort_by": "members", "order": "asc"}),
+    ("title", {"sort_by": "title"}),
+    ("year asc", {"sort_by": "year", "order": "asc"}),
+    ("Action,Comedy", {"genres": "Action,Comedy"}),
+    ("Action+Comedy-Drama", {"genres": "Action,Comedy", "genre_mode": "all", "exclude_genres": "Drama"}),
+    ("not Comedy,Drama", {"exclude_genres": "Comedy,Drama", "sort_by": "members"}),
+    ("studio any", {"studios": "Studio Zunu,Studio Yowa Rutsu", "sort_by": "year"}),
+    ("TV 2020-2023 7+", {"types": "TV", "years": "2020,2021,2022,2023", "min_score": 7.0}),
+    ("score 6-8 members", {"min_score": 6.0, "max_score": 8.0, "sort_by": "members"}),
+    ("q=ka (relevance)", {"q": "ka"}),
+    ("q=ka by year", {"q": "ka", "sort_by": "year"}),
+    ("q=!! (ilike)", {"q": "!!"}),
+]
+
+
+def search(enabled, **params):
+    columnar_search.enabled = enabled
+    defaults = dict(
+        q=None, genres=None, genre_mode="any", exclude_genres=None, studios=None,
+        studio_mode="any", exclude_studios=None, types=None, years=None, min_score=None, max_score=None,
+        sort_by=None, order="desc", limit=24, offset=0, cursor=None, include_total=True,
+        fields=None
+    )
+    db = AsyncSessionLocal()
+    try:
+        return run(search_anime(**{**defaults, **params}, db=db))
+    finally:
+        run(db.close())
+
+
+def check(name, params):
+    """Page 1, then pages 2-3 by cursor and by offset: both engines must agree"""
+    for pages in ("cursor", "offset"):
+        cursor = None
+        for page in range(3):
+            paging = {"cursor": cursor} if pages == "cursor" else {"offset": page * 24}
+            expected = search(False, **params, **paging)
+            actual = search(True, **params, **paging)
+            assert actual == expected, f"{name}: page {page + 1} ({pages}) differs"
+            cursor = expected["next_cursor"]
+            if cursor is None:
+                break
+
+
+def timed(enabled, params):
+    timings = []
+    for _ in range(args.runs):
+        # totals 快取會讓 SQL 的 COUNT 只跑一次，清掉才是每個新篩選條件的成本
+        totals_cache.clear()
+        started = time.perf_counter()
+        search(enabled, **params)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    db = SessionLocal()
+    started = time.perf_counter()
+    columnar_search.get_arrays(db)
+    db.close()
+    print(f"🧱 Arrays built in {(time.perf_counter() - started) * 1000:.0f} ms ({DB_PATH})")
+
+    print(f"\n{'search':20s} {'sql ms':>8s} {'numpy ms':>9s} {'speedup':>8s}")
+    print("-" * 48)
+    for name, params in SEARCHES:
+        check(name, params)
+        sql_ms = timed(False, params)
+        numpy_ms = timed(True, params)
+        print(f"{name:20s} {sql_ms:8.1f} {numpy_ms:9.1f} {sql_ms / numpy_ms:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
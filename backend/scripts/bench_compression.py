@@ -0,0 +1,138 @@
+"""
+Report bytes on the wire per endpoint with and without response compression.
+
+Requests every endpoint through the full app (TestClient, so the response cache
+and CompressionMiddleware run) once with Accept-Encoding: identity and once per
+supported coding, and prints the Content-Length of each. Then times the request
+for a compressed uncached page (/api/search, compressed on every request) and a
+cached one (compressed once, later hits reuse the bytes), and sweeps the gzip
+levels / brotli qualities over the biggest page.
+
+Usage (from backend/, needs `pip install httpx` for TestClient):
+    python scripts/bench_compression.py --rows 16000
+    python scripts/bench_compression.py --rows 100000 --runs 200
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "scripts"))
+
+parser = argparse.ArgumentParser(description="Report response sizes with and without compression")
+parser.add_argument("--rows", type=int, default=16000)
+parser.add_argument("--db", default=None)
+parser.add_argument("--runs", type=int, default=100)
+args = parser.parse_args()
+
+SOURCE_PATH = args.db or f"/tmp/anime_bench_{args.rows}.db"
+WORK_DIR = tempfile.mkdtemp()
+DB_PATH = os.path.join(WORK_DIR, "anime_compression.db")
+# 必須在 import models 之前設定，engine 會在 import 時建立
+os.environ["ANIME_DB_PATH"] = DB_PATH
+
+from synthetic_db import build_synthetic_db  # noqa: E402
+
+if not os.path.exists(SOURCE_PATH):
+    print(f"📦 Building synthetic database with {args.rows:,} rows...")
+    build_synthetic_db(SOURCE_PATH, rows=args.rows)
+shutil.copy(SOURCE_PATH, DB_PATH)
+
+import gzip  # noqa: E402
+
+from fastapi.testclient import TestClient  # noqa: E402
+from main import app  # noqa: E402
+from services import response_cache  # noqa: E402
+from services.compression import ENCODINGS, brotli  # noqa: E402
+
+ENDPOINTS = [
+    "/api/search?limit=24",
+    "/api/search?limit=100",
+    "/api/search?q=ka&limit=100",
+    "/api/search?genres=Action&sort_by=score&limit=100",
+    "/api/recommendations/popular?limit=100",
+    "/api/recommendations/top-rated?limit=100",
+    "/api/recommendations/hidden-gems?limit=100",
+    "/api/recommendations/latest?limit=100",
+    "/api/recommendations/trending?limit=100",
+    "/api/recommendations/genre/Action?limit=100",
+    "/api/anime/1",
+    "/api/genres",
+]
+
+
+def wire_bytes(client, url, encoding):
+    response = client.get(url, headers={"accept-encoding": encoding})
+    assert response.status_code == 200, f"{url}: HTTP {response.status_code}"
+    return int(response.headers["content-length"]), response.headers.get("content-encoding")
+
+
+def request_times(client, url, encoding):
+    timings = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        client.get(url, headers={"accept-encoding": encoding})
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    encodings = ["identity", *reversed(ENCODINGS)]
+    if brotli is None:
+        print("ℹ️  brotli is not installed: only gzip is offered (pip install brotli to add br)")
+
+    with TestClient(app) as client:
+        print(f"\n{'endpoint':48s} " + " ".join(f"{encoding:>16s}" for encoding in encodings))
+        totals = dict.fromkeys(encodings, 0)
+        for url in ENDPOINTS:
+            cells = []
+            identity = None
+            for encoding in encodings:
+                size, applied = wire_bytes(client, url, encoding)
+                totals[encoding] += size
+                if identity is None:
+                    identity = size
+                    cells.append(f"{size:>10,d} B     ")
+                else:
+                    # 太小沒有壓縮的 response 標成 "-"
+                    saved = f"{identity / size:4.1f}x" if applied else "    -"
+                    cells.append(f"{size:>10,d} B {saved}")
+            print(f"{url:48s} " + " ".join(cells))
+        print(f"{'total':48s} " + " ".join(
+            f"{totals[encoding]:>10,d} B {totals['identity'] / totals[encoding]:4.1f}x" for encoding in encodings
+        ))
+
+        # 沒有快取的 /api/search 每次都壓縮；快取的 routes 只壓一次
+        print(f"\n{'median request time':48s} " + " ".join(f"{encoding:>16s}" for encoding in encodings))
+        for url in ("/api/search?limit=100", "/api/recommendations/popular?limit=100"):
+            print(f"{url:48s} " + " ".join(
+                f"{request_times(client, url, encoding):13.2f} ms" for encoding in encodings
+            ))
+        print(f"\nresponse cache: {response_cache.stats()}")
+
+        body = client.get("/api/search?limit=100", headers={"accept-encoding": "identity"}).content
+
+    print(f"\nlevel sweep over one /api/search?limit=100 page ({len(body):,} B)")
+    settings = [("gzip", level, lambda data, level=level: gzip.compress(data, compresslevel=level, mtime=0))
+                for level in (1, 4, 6, 9)]
+    if brotli is not None:
+        settings += [("br", quality, lambda data, quality=quality: brotli.compress(data, quality=quality))
+                     for quality in (1, 4, 5, 6, 9, 11)]
+    for name, level, compress in settings:
+        timings = []
+        for _ in range(20):
+            started = time.perf_counter()
+            size = len(compress(body))
+            timings.append((time.perf_counter() - started) * 1000)
+        print(f"  {name:4s} {level:>2d}: {size:>9,d} B ({len(body) / size:4.1f}x), {statistics.median(timings):7.2f} ms")
+
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
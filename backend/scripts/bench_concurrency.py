@@ -0,0 +1,168 @@
+"""
+Benchmark throughput of the async endpoints against the threadpool model.
+
+Starts uvicorn in a subprocess with the real app plus sync `def` twins of the
+measured endpoints (same services, `get_db` session, run on Starlette's
+threadpool), then drives both with 50 / 200 / 1000 concurrent clients. The
+response cache is disabled so every request reaches SQLite.
+
+Usage (from backend/, needs `pip install httpx uvicorn`):
+    python scripts/bench_concurrency.py --rows 100000
+    python scripts/bench_concurrency.py --db /tmp/anime_bench_1000000.db --clients 50 200
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "scripts"))
+
+parser = argparse.ArgumentParser(description="Benchmark async vs. threadpool endpoints")
+parser.add_argument("--rows", type=int, default=100000)
+parser.add_argument("--db", default=None)
+parser.add_argument("--clients", type=int, nargs="+", default=[50, 200, 1000])
+parser.add_argument("--requests", type=int, default=3000, help="requests per model and level")
+parser.add_argument("--port", type=int, default=8765)
+parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+args = parser.parse_args()
+
+DB_PATH = args.db or f"/tmp/anime_bench_{args.rows}.db"
+# 必須在 import models 之前設定，engine 會在 import 時建立
+os.environ["ANIME_DB_PATH"] = DB_PATH
+
+# endpoint 名稱 -> (async 版本路徑, sync 分身路徑)
+ENDPOINTS = {
+    "detail": ("/api/anime/{id}", "/sync/anime/{id}"),
+    "popular": ("/api/recommendations/popular?offset={offset}", "/sync/recommendations/popular?offset={offset}"),
+}
+
+
+def serve():
+    import uvicorn
+    from fastapi import Depends, HTTPException
+    from sqlalchemy.orm import Session
+
+    import main
+    from models import Anime, get_db
+    from services import DETAIL_FIELDS, discover_page, serialize_anime_list
+
+    # 不走 response cache，每個 request 都要查 SQLite
+    main.CACHED_ROUTES.clear()
+
+    # 原本的 threadpool 寫法：sync def + get_db，邏輯跟 async 版本相同
+    @main.app.get("/sync/anime/{anime_id}")
+    def get_anime_by_id_sync(anime_id: int, db: Session = Depends(get_db)):
+        anime = db.get(Anime, anime_id)
+        if not anime:
+            raise HTTPException(status_code=404, detail="Anime not found")
+        return {"success": True, "data": serialize_anime_list(db, [anime], DETAIL_FIELDS)[0]}
+
+    @main.app.get("/sync/recommendations/popular")
+    def get_popular_recommendations_sync(
+        limit: int = 20, offset: int = 0, db: Session = Depends(get_db)
+    ):
+        rows, next_cursor, total = discover_page(db, "popular", limit, offset)
+        return {"success": True, "total": total, "data": serialize_anime_list(db, rows)}
+
+    uvicorn.run(main.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+async def wait_until_ready(client, server):
+    for _ in range(300):
+        if server.poll() is not None:
+            sys.exit(f"❌ server exited with code {server.returncode}")
+        try:
+            await client.get("/")
+            return
+        except Exception:
+            await asyncio.sleep(0.1)
+    sys.exit("❌ server did not start")
+
+
+async def run_level(client, template, clients, total, max_id):
+    """Fire `total` requests from `clients` workers; returns (req/s, p50 ms, p95 ms, errors)"""
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            url = template.format(id=random.randint(1, max_id), offset=random.randint(0, 2000))
+            started = time.perf_counter()
+            try:
+                response = await client.get(url)
+                if response.status_code != 200:
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return (
+        total / elapsed,
+        statistics.median(latencies),
+        latencies[int(len(latencies) * 0.95) - 1],
+        errors,
+    )
+
+
+async def drive(max_id):
+    import httpx
+
+    limits = httpx.Limits(max_connections=max(args.clients), max_keepalive_connections=max(args.clients))
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=120
+    ) as client:
+        await wait_until_ready(client, SERVER)
+
+        print(f"\n{'endpoint':8s} {'clients':>7s} {'model':>10s} {'req/s':>8s} "
+              f"{'p50 ms':>8s} {'p95 ms':>8s} {'errors':>6s}")
+        print("-" * 62)
+        for name, (async_url, sync_url) in ENDPOINTS.items():
+            for clients in args.clients:
+                for model, template in (("async", async_url), ("threadpool", sync_url)):
+                    # 暖身：建立連線、載入 page cache
+                    await run_level(client, template, clients, clients, max_id)
+                    rps, p50, p95, errors = await run_level(
+                        client, template, clients, args.requests, max_id
+                    )
+                    print(f"{name:8s} {clients:7d} {model:>10s} {rps:8.0f} "
+                          f"{p50:8.1f} {p95:8.1f} {errors:6d}")
+
+
+if __name__ == "__main__":
+    if args.serve:
+        serve()
+        sys.exit(0)
+
+    from synthetic_db import build_synthetic_db
+
+    if not os.path.exists(DB_PATH):
+        print(f"📦 Building synthetic database with {args.rows:,} rows...")
+        build_synthetic_db(DB_PATH, rows=args.rows)
+
+    from sqlalchemy import func
+    from models import Anime, run_migrations
+    from models.database import SessionLocal
+
+    run_migrations()
+    db = SessionLocal()
+    max_id = db.query(func.max(Anime.id)).scalar()
+    db.close()
+
+    SERVER = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", *sys.argv[1:]])
+    try:
+        asyncio.run(drive(max_id))
+    finally:
+        SERVER.terminate()
+        SERVER.wait()
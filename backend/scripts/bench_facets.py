@@ -0,0 +1,131 @@
+"""
+Benchmark /api/search/facets: bitmaps vs. one COUNT query per option.
+
+"count" is what the dropdowns would need without the index: for every genre,
+type, year and score bucket, a COUNT over the search_anime-style query with
+that option added (and the facet's own filter dropped). "bitmap" is
+facet_index.facet_counts() with the bitmaps already built. Both must return
+the same numbers.
+
+Usage (from backend/):
+    python scripts/bench_facets.py --rows 100000
+    python scripts/bench_facets.py --db /tmp/anime_bench_1000000.db --runs 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "scripts"))
+
+parser = argparse.ArgumentParser(description="Benchmark bitmap facet counts vs. COUNT per option")
+parser.add_argument("--rows", type=int, default=100000)
+parser.add_argument("--db", default=None)
+parser.add_argument("--runs", type=int, default=10)
+args = parser.parse_args()
+
+DB_PATH = args.db or f"/tmp/anime_bench_{args.rows}.db"
+# 必須在 import models 之前設定，engine 會在 import 時建立
+os.environ["ANIME_DB_PATH"] = DB_PATH
+
+from synthetic_db import build_synthetic_db  # noqa: E402
+
+if not os.path.exists(DB_PATH):
+    print(f"📦 Building synthetic database with {args.rows:,} rows...")
+    build_synthetic_db(DB_PATH, rows=args.rows)
+
+from sqlalchemy import func  # noqa: E402
+from models import Anime, Genre, run_migrations  # noqa: E402
+from models.database import SessionLocal  # noqa: E402
+from services import SCORE_BUCKETS, TagFilter, facet_index  # noqa: E402
+from services.facets import HIDDEN_GENRES  # noqa: E402
+
+run_migrations()
+
+# (名稱, genres, types, years, min_score, max_score)
+FILTER_SETS = [
+    ("no filters", [], [], [], None, None),
+    ("Action", ["Action"], [], [], None, None),
+    ("Action+TV+7.5", ["Action"], ["TV"], [], 7.5, None),
+    ("2 years, 6-8", [], [], [2019, 2020], 6.0, 8.0),
+]
+
+
+def filtered(db, genres, types, years, min_score, max_score, without):
+    query = db.query(func.count(func.distinct(Anime.id)))
+    if genres and without != "genres":
+        query = query.filter(Anime.genres.any(Genre.name.in_(genres)))
+    if types and without != "types":
+        query = query.filter(Anime.type.in_(types))
+    if years and without != "years":
+        query = query.filter(Anime.year.in_(years))
+    if without != "score":
+        if min_score is not None:
+            query = query.filter(Anime.score >= min_score)
+        if max_score is not None:
+            query = query.filter(Anime.score <= max_score)
+    return query
+
+
+def count_per_option(db, genres, types, years, min_score, max_score):
+    """One COUNT query per dropdown option"""
+    options = lambda column: [value for value, in db.query(column).distinct() if value is not None]
+    result = {"genres": {}, "types": {}, "years": {}, "score": {}}
+    for name in options(Genre.name):
+        if name not in HIDDEN_GENRES:
+            result["genres"][name] = filtered(db, genres, types, years, min_score, max_score, "genres") \
+                .filter(Anime.genres.any(Genre.name == name)).scalar()
+    for value in options(Anime.type):
+        result["types"][value] = filtered(db, genres, types, years, min_score, max_score, "types") \
+            .filter(Anime.type == value).scalar()
+    for value in options(Anime.year):
+        result["years"][value] = filtered(db, genres, types, years, min_score, max_score, "years") \
+            .filter(Anime.year == value).scalar()
+    for bucket in SCORE_BUCKETS:
+        query = filtered(db, genres, types, years, min_score, max_score, "score").filter(Anime.score != None)
+        if bucket.min is not None:
+            query = query.filter(Anime.score >= bucket.min)
+        if bucket.max is not None:
+            query = query.filter(Anime.score < bucket.max)
+        result["score"][bucket.label] = query.scalar()
+    return result
+
+
+def with_bitmaps(db, genres, types, years, min_score, max_score):
+    _, facets = facet_index.facet_counts(db, None, TagFilter(genres), types, years, min_score, max_score)
+    return {name: {facet["value"]: facet["count"] for facet in values} for name, values in facets.items()}
+
+
+def timed(fn, db, filters, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = fn(db, *filters)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+
+def main():
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        facet_index.get_bitmaps(db)
+        print(f"🧱 Bitmaps built in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+        print(f"\n{'filters':16s} {'count ms':>9s} {'bitmap ms':>10s} {'speedup':>8s}")
+        print("-" * 46)
+        for name, *filters in FILTER_SETS:
+            count_ms, expected = timed(count_per_option, db, filters, 1)
+            bitmap_ms, actual = timed(with_bitmaps, db, filters, args.runs)
+            # 兩種算法的數字必須完全相同
+            assert actual == expected, f"{name}: counts differ"
+            print(f"{name:16s} {count_ms:9.0f} {bitmap_ms:10.1f} {count_ms / bitmap_ms:7.0f}x")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
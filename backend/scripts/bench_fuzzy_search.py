@@ -0,0 +1,158 @@
+"""
+Benchmark typo-tolerant title search (services/fuzzy_titles.py) and /api/search?fuzzy=true.
+
+Takes random titles, misspells them (1-2 dropped, swapped or replaced
+letters, like "Shingeki no Kyojn") and reports how often the anime is found
+in the first 10 results with and without fuzzy=true. It also checks how many
+of the exact matches (every title scored with the same edit distance) the
+bounded candidate retrieval finds, and times one to three letter queries, whose
+trigrams are the most common ones.
+
+Usage (from backend/):
+    python scripts/bench_fuzzy_search.py --rows 16000
+    python scripts/bench_fuzzy_search.py --rows 1000000 --queries 100
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "scripts"))
+
+parser = argparse.ArgumentParser(description="Benchmark fuzzy title search")
+parser.add_argument("--rows", type=int, default=16000)
+parser.add_argument("--db", default=None)
+parser.add_argument("--queries", type=int, default=200)
+args = parser.parse_args()
+
+SOURCE_PATH = args.db or f"/tmp/anime_bench_{args.rows}.db"
+WORK_DIR = tempfile.mkdtemp()
+DB_PATH = os.path.join(WORK_DIR, "anime_fuzzy.db")
+# 必須在 import models 之前設定，engine 會在 import 時建立
+os.environ["ANIME_DB_PATH"] = DB_PATH
+
+from synthetic_db import build_synthetic_db  # noqa: E402
+
+if not os.path.exists(SOURCE_PATH):
+    print(f"📦 Building synthetic database with {args.rows:,} rows...")
+    build_synthetic_db(SOURCE_PATH, rows=args.rows)
+shutil.copy(SOURCE_PATH, DB_PATH)
+
+import numpy as np  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+from models import Anime, run_migrations  # noqa: E402
+from models.database import AsyncSessionLocal, SessionLocal  # noqa: E402
+from services.fuzzy_titles import MAX_PATTERN, fuzzy_title_index, substring_distances  # noqa: E402
+from services.title_suggest import normalize_title  # noqa: E402
+from main import search_anime  # noqa: E402
+
+SHORT_QUERIES = ["a", "s", "ka", "no", "ma", "the", "shi", "ion", "season"]
+
+# endpoints 是 async，每次都在同一個 event loop 上執行
+run = asyncio.new_event_loop().run_until_complete
+
+
+def percentile(values, fraction):
+    return sorted(values)[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def misspell(rng, title):
+    """1-2 typos: drop, swap with the next, or replace a letter"""
+    letters = list(title)
+    for _ in range(rng.randint(1, 2)):
+        positions = [i for i, letter in enumerate(letters[:-1]) if letter.isalpha()]
+        if not positions:
+            break
+        i = rng.choice(positions)
+        edit = rng.choice(["drop", "swap", "replace"])
+        if edit == "drop":
+            del letters[i]
+        elif edit == "swap":
+            letters[i], letters[i + 1] = letters[i + 1], letters[i]
+        else:
+            letters[i] = rng.choice("aeioukstnmr")
+    return "".join(letters)
+
+
+def exact_matches(trigrams, q):
+    """Every anime within the same edit distance, scoring all titles (no candidate retrieval)"""
+    key = normalize_title(q)
+    max_distance = min(len(key), MAX_PATTERN) // 4
+    found = set()
+    for start in range(0, len(trigrams.keys), 20000):
+        distances = substring_distances(key, trigrams.keys[start:start + 20000])
+        found.update(trigrams.key_ids[start + i] for i in np.flatnonzero(distances <= max_distance).tolist())
+    return found
+
+
+def main():
+    run_migrations()
+    rng = random.Random(0)
+    db = SessionLocal()
+
+    started = time.perf_counter()
+    trigrams = fuzzy_title_index.get_trigrams(db)
+    print(f"🔡 Built the trigram index: {len(trigrams.keys):,} titles, {len(trigrams.trigrams):,} trigrams, "
+          f"{len(trigrams.postings):,} postings, {time.perf_counter() - started:.2f} s, "
+          f"peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+    max_id = db.execute(select(func.max(Anime.id))).scalar()
+    queries = []
+    while len(queries) < args.queries:
+        anime_id = rng.randint(1, max_id)
+        title = db.execute(select(Anime.title).where(Anime.id == anime_id)).scalar()
+        if title and len(title) >= 8:
+            queries.append((anime_id, misspell(rng, title)))
+
+    defaults = dict(
+        genres=None, genre_mode="any", exclude_genres=None, studios=None, studio_mode="any",
+        exclude_studios=None, types=None, years=None, min_score=None, max_score=None,
+        sort_by=None, order="desc", limit=10, offset=0, cursor=None, include_total=True, fields="id"
+    )
+    async_db = AsyncSessionLocal()
+    for fuzzy in (False, True):
+        timings, found = [], 0
+        for anime_id, q in queries:
+            started = time.perf_counter()
+            page = run(search_anime(q=q, fuzzy=fuzzy, **defaults, db=async_db))
+            timings.append((time.perf_counter() - started) * 1000)
+            found += anime_id in {item["id"] for item in page["data"]}
+        print(f"\n/api/search?q=<misspelled title>{'&fuzzy=true' if fuzzy else '':12s} "
+              f"found in top 10: {found / len(queries):6.1%}   "
+              f"median {statistics.median(timings):7.2f} ms, p99 {percentile(timings, 0.99):7.2f} ms")
+
+    timings, recalls = [], []
+    for _, q in queries[:50]:
+        started = time.perf_counter()
+        matches = {anime_id for anime_id, _ in trigrams.search(q)}
+        timings.append((time.perf_counter() - started) * 1000)
+        exact = exact_matches(trigrams, q)
+        if exact:
+            recalls.append(len(matches & exact) / len(exact))
+    print(f"\nFuzzyTrigrams.search: median {statistics.median(timings):.2f} ms, p99 {percentile(timings, 0.99):.2f} ms, "
+          f"finds {statistics.mean(recalls):.1%} of the matches a scan of every title finds")
+
+    print(f"\n{'short query':>12s} {'matches':>8s} {'time':>10s}")
+    for q in SHORT_QUERIES:
+        timings = []
+        for _ in range(5):
+            started = time.perf_counter()
+            matches = trigrams.search(q)
+            timings.append((time.perf_counter() - started) * 1000)
+        print(f"{q:>12s} {len(matches):>8,d} {min(timings):>7.2f} ms")
+
+    run(async_db.close())
+    db.close()
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
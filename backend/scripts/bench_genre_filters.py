@@ -0,0 +1,142 @@
+"""
+Benchmark genre / studio AND-OR-NOT filters: bitmaps vs. SQL.
+
+"sql" is how the filters look without the bitmaps: GROUP BY ... HAVING
+COUNT(DISTINCT genre) = n for genre_mode=all, NOT IN for exclude_genres.
+"bitmap" is /api/search (services/facets.py computes the ids, SQLite sorts
+and pages them). Both must return the same total and the same first page
+(score desc, id desc). The bitmaps are built before timing.
+
+Usage (from backend/):
+    python scripts/bench_genre_filters.py --rows 100000
+    python scripts/bench_genre_filters.py --db /tmp/anime_bench_1000000.db --runs 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "scripts"))
+
+parser = argparse.ArgumentParser(description="Benchmark bitmap vs. SQL genre/studio filters")
+parser.add_argument("--rows", type=int, default=100000)
+parser.add_argument("--db", default=None)
+parser.add_argument("--runs", type=int, default=10)
+args = parser.parse_args()
+
+DB_PATH = args.db or f"/tmp/anime_bench_{args.rows}.db"
+# 必須在 import models 之前設定，engine 會在 import 時建立
+os.environ["ANIME_DB_PATH"] = DB_PATH
+
+from synthetic_db import build_synthetic_db  # noqa: E402
+
+if not os.path.exists(DB_PATH):
+    print(f"📦 Building synthetic database with {args.rows:,} rows...")
+    build_synthetic_db(DB_PATH, rows=args.rows)
+
+from sqlalchemy import func, select  # noqa: E402
+from models import Anime, Genre, Studio, anime_genres, anime_studios, run_migrations  # noqa: E402
+from models.database import AsyncSessionLocal, SessionLocal  # noqa: E402
+from services import facet_index, totals_cache  # noqa: E402
+from main import search_anime  # noqa: E402
+
+run_migrations()
+
+# endpoints 是 async，每次都在同一個 event loop 上執行
+run = asyncio.new_event_loop().run_until_complete
+
+LIMIT = 24
+
+
+def split(value):
+    return [name for name in (value or "").split(",") if name]
+
+
+def tagged(association, tag_id, tag, names, mode):
+    """anime ids with any / all of the tags (GROUP BY ... HAVING for all)"""
+    query = select(association.c.anime_id).join(tag, tag.id == tag_id).where(tag.name.in_(names))
+    if mode == "all":
+        query = query.group_by(association.c.anime_id).having(
+            func.count(func.distinct(tag.id)) == len(set(names))
+        )
+    return query
+
+
+def sql_search(db, genres=None, genre_mode="any", exclude_genres=None,
+               studios=None, studio_mode="any", exclude_studios=None):
+    query = db.query(Anime.id)
+    for association, tag_id, tag, include, mode, exclude in (
+        (anime_genres, anime_genres.c.genre_id, Genre, split(genres), genre_mode, split(exclude_genres)),
+        (anime_studios, anime_studios.c.studio_id, Studio, split(studios), studio_mode, split(exclude_studios)),
+    ):
+        if include:
+            query = query.filter(Anime.id.in_(tagged(association, tag_id, tag, include, mode)))
+        if exclude:
+            query = query.filter(Anime.id.notin_(tagged(association, tag_id, tag, exclude, "any")))
+    total = query.count()
+    page = [anime_id for anime_id, in query.order_by(
+        Anime.score.desc(), Anime.id.desc()
+    ).limit(LIMIT)]
+    return total, page
+
+
+def bitmap_search(db, **params):
+    defaults = dict(
+        q=None, genres=None, genre_mode="any", exclude_genres=None,
+        studios=None, studio_mode="any", exclude_studios=None, types=None, years=None,
+        min_score=None, max_score=None, sort_by="score", order="desc", limit=LIMIT,
+        offset=0, cursor=None, include_total=True, fields="id"
+    )
+    result = run(search_anime(**{**defaults, **params}, db=db))
+    return result["total"], [item["id"] for item in result["data"]]
+
+
+def timed(fn, db, params):
+    timings = []
+    for _ in range(args.runs):
+        totals_cache.clear()
+        started = time.perf_counter()
+        result = fn(db, **params)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+
+def main():
+    db = SessionLocal()
+    async_db = AsyncSessionLocal()
+    try:
+        started = time.perf_counter()
+        facet_index.get_bitmaps(db)
+        print(f"🧱 Bitmaps built in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+        genres = [name for name, in db.query(Genre.name).order_by(Genre.name).limit(4)]
+        studio = db.query(Studio.name).order_by(Studio.id).limit(1).scalar()
+        searches = [
+            ("any of 2", {"genres": ",".join(genres[:2])}),
+            ("all of 2", {"genres": ",".join(genres[:2]), "genre_mode": "all"}),
+            ("all of 3", {"genres": ",".join(genres[:3]), "genre_mode": "all"}),
+            ("1 not 1", {"genres": genres[0], "exclude_genres": genres[1]}),
+            ("all 2 not 1", {"genres": ",".join(genres[:2]), "genre_mode": "all",
+                             "exclude_genres": genres[3]}),
+            ("not 2", {"exclude_genres": ",".join(genres[2:4])}),
+            ("studio + genre", {"studios": studio, "genres": genres[0]}),
+        ]
+
+        print(f"\n{'filters':16s} {'total':>8s} {'sql ms':>8s} {'bitmap ms':>10s} {'speedup':>8s}")
+        print("-" * 55)
+        for name, params in searches:
+            sql_ms, expected = timed(sql_search, db, params)
+            bitmap_ms, actual = timed(bitmap_search, async_db, params)
+            assert actual == expected, f"{name}: results differ"
+            print(f"{name:16s} {expected[0]:8,d} {sql_ms:8.1f} {bitmap_ms:10.1f} {sql_ms / bitmap_ms:7.1f}x")
+    finally:
+        db.close()
+        run(async_db.close())
+
+
+if __name__ == "__main__":
+    main()
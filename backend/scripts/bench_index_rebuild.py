@@ -0,0 +1,118 @@
+"""
+Benchmark search latency right after a write (in-memory indexes going stale).
+
+Every write bumps the data version, which makes the facet bitmaps, the columnar
+arrays and the fuzzy trigrams out of date. Those are rebuilt in the background
+(services/data_version.VersionedBuild), so the request right after a write
+should cost the same as any other. For each endpoint this times requests with
+no writes in between and requests each right after one
+`UPDATE anime SET members = ...`, like update_anime_stats does per anime, and
+finally checks that a new genre link is counted once the background rebuild
+has run.
+
+Usage (from backend/, needs `pip install httpx` for TestClient):
+    python scripts/bench_index_rebuild.py --rows 16000
+    python scripts/bench_index_rebuild.py --rows 16000 --engine columnar
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "scripts"))
+
+parser = argparse.ArgumentParser(description="Benchmark search latency right after a write")
+parser.add_argument("--rows", type=int, default=16000)
+parser.add_argument("--db", default=None)
+parser.add_argument("--runs", type=int, default=20)
+parser.add_argument("--engine", choices=["sql", "columnar"], default="sql")
+parser.add_argument("--interval", type=float, default=1.0, help="ANIME_INDEX_REBUILD_SECONDS")
+args = parser.parse_args()
+
+SOURCE_PATH = args.db or f"/tmp/anime_bench_{args.rows}.db"
+WORK_DIR = tempfile.mkdtemp()
+DB_PATH = os.path.join(WORK_DIR, "anime_rebuild.db")
+# 必須在 import models 之前設定，engine 會在 import 時建立
+os.environ["ANIME_DB_PATH"] = DB_PATH
+os.environ["ANIME_SEARCH_ENGINE"] = args.engine
+os.environ["ANIME_INDEX_REBUILD_SECONDS"] = str(args.interval)
+
+from synthetic_db import build_synthetic_db  # noqa: E402
+
+if not os.path.exists(SOURCE_PATH):
+    print(f"📦 Building synthetic database with {args.rows:,} rows...")
+    build_synthetic_db(SOURCE_PATH, rows=args.rows)
+shutil.copy(SOURCE_PATH, DB_PATH)
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+from main import app  # noqa: E402
+from models.database import engine  # noqa: E402
+
+ENDPOINTS = [
+    "/api/search",
+    "/api/search?genres=Action&sort_by=members",
+    "/api/search?exclude_genres=Comedy",
+    "/api/search?q=gime+zute&fuzzy=true",
+    "/api/search/facets?genres=Action",
+]
+
+
+def write(anime_id, members):
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE anime SET members = :members WHERE id = :id"), {"members": members, "id": anime_id})
+
+
+def timed(client, url, before=None):
+    timings = []
+    for run in range(args.runs):
+        if before:
+            before(run)
+        started = time.perf_counter()
+        response = client.get(url)
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, f"{url}: HTTP {response.status_code}"
+    return statistics.median(timings), max(timings)
+
+
+def main():
+    with TestClient(app) as client:
+        # 第一次建立 (warm-up)，之後量的是資料變了以後的 requests
+        for url in ENDPOINTS:
+            client.get(url)
+
+        print(f"{'endpoint':44s} {'no writes':>20s} {'after each write':>22s}")
+        for url in ENDPOINTS:
+            quiet = timed(client, url)
+            written = timed(client, url, before=lambda run: write(1 + run, 1_000_000 + run))
+            print(f"{url:44s} {quiet[0]:7.1f} ms (max {quiet[1]:5.1f}) {written[0]:7.1f} ms (max {written[1]:5.1f})")
+
+        # 背景重建之後要看得到寫入：多一部 Action，genres=Action 的總數 +1
+        url = "/api/search?genres=Action&limit=1"
+        expected = client.get(url).json()["total"] + 1
+        with engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO anime_genres (anime_id, genre_id) "
+                "SELECT anime.id, genres.id FROM anime, genres WHERE genres.name = 'Action' "
+                "AND anime.id NOT IN (SELECT anime_id FROM anime_genres WHERE genre_id = genres.id) LIMIT 1"
+            ))
+        started = time.perf_counter()
+        total = client.get(url).json()["total"]
+        while total != expected and time.perf_counter() - started < 120:
+            time.sleep(0.1)
+            total = client.get(url).json()["total"]
+        print(f"\n{'✅' if total == expected else '❌'} a new Action anime is counted "
+              f"{time.perf_counter() - started:.1f} s after the write (rebuild interval {args.interval:g} s)")
+
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+    if total != expected:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
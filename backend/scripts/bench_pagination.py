@@ -0,0 +1,100 @@
+"""
+Benchmark deep pages: offset vs. cursor (keyset) pagination.
+
+Usage (from backend/):
+    python scripts/bench_pagination.py --rows 1000000
+    python scripts/bench_pagination.py --db /tmp/anime_bench_1000000.db
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "scripts"))
+
+parser = argparse.ArgumentParser(description="Benchmark offset vs. cursor pagination")
+parser.add_argument("--rows", type=int, default=1000000)
+parser.add_argument("--db", default=None)
+parser.add_argument("--runs", type=int, default=5)
+args = parser.parse_args()
+
+DB_PATH = args.db or f"/tmp/anime_bench_{args.rows}.db"
+# 必須在 import models 之前設定，engine 會在 import 時建立
+os.environ["ANIME_DB_PATH"] = DB_PATH
+
+from synthetic_db import build_synthetic_db  # noqa: E402
+
+if not os.path.exists(DB_PATH):
+    print(f"📦 Building synthetic database with {args.rows:,} rows...")
+    build_synthetic_db(DB_PATH, rows=args.rows)
+
+from models import Anime, run_migrations  # noqa: E402
+from models.database import AsyncSessionLocal, SessionLocal  # noqa: E402
+from services import encode_cursor  # noqa: E402
+from main import get_popular_recommendations, search_anime  # noqa: E402
+
+run_migrations()
+
+LIMIT = 20
+
+# endpoints 是 async，每次都在同一個 event loop 上執行
+run = asyncio.new_event_loop().run_until_complete
+
+
+def popular(db, offset=0, cursor=None):
+    return run(get_popular_recommendations(
+        limit=LIMIT, offset=offset, cursor=cursor, include_total=True, db=db
+    ))
+
+
+def search(db, offset=0, cursor=None):
+    return run(search_anime(
+        q=None, genres=None, types=None, years=None, min_score=None, max_score=None,
+        sort_by="score", order="desc", limit=LIMIT, offset=offset, cursor=cursor,
+        include_total=True, db=db
+    ))
+
+
+def cursor_at(db, endpoint, depth):
+    """Cursor pointing at the row just before `depth` (as if the client had paged there)"""
+    if endpoint is popular:
+        row = db.query(Anime.members, Anime.id).filter(
+            Anime.members != None, Anime.score != None, Anime.score >= 6.0
+        ).order_by(Anime.members.desc(), Anime.id.desc()).offset(depth - 1).first()
+        return encode_cursor("popular", list(row))
+    row = db.query(Anime.score, Anime.id).order_by(
+        Anime.score.desc(), Anime.id.desc()
+    ).offset(depth - 1).first()
+    return encode_cursor("search:score:desc", list(row))
+
+
+def timed(fn, db, **kwargs):
+    timings = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        fn(db, **kwargs)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    db = SessionLocal()
+    async_db = AsyncSessionLocal()
+    print(f"\n{'endpoint':10s} {'depth':>8s} {'offset ms':>10s} {'cursor ms':>10s}")
+    print("-" * 42)
+    for name, fn in (("popular", popular), ("search", search)):
+        for depth in (LIMIT, 1000, 10000, 100000, 500000):
+            cursor = cursor_at(db, fn, depth)
+            offset_ms = timed(fn, async_db, offset=depth)
+            cursor_ms = timed(fn, async_db, cursor=cursor)
+            print(f"{name:10s} {depth:8,d} {offset_ms:10.2f} {cursor_ms:10.2f}")
+    run(async_db.close())
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark one list page read as ORM instances vs. anime_columns() rows.
+
+Both variants run the same filter, sort and pagination (services.paginate) and
+the same serialize_anime_list() call; only the selected entity differs:
+`db.query(Anime)` (identity map, instrumented instances) or
+`db.query(anime_columns(...))` (plain rows). Each page uses a fresh session,
+like a request does. Reports median CPU time and peak traced memory per page.
+
+Usage (from backend/):
+    python scripts/bench_read_path.py --rows 100000
+    python scripts/bench_read_path.py --db /tmp/anime_bench_1000000.db --limit 100
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "scripts"))
+
+parser = argparse.ArgumentParser(description="Benchmark ORM instances vs. row tuples per page")
+parser.add_argument("--rows", type=int, default=100000)
+parser.add_argument("--db", default=None)
+parser.add_argument("--runs", type=int, default=50)
+parser.add_argument("--limit", type=int, default=100)
+args = parser.parse_args()
+
+DB_PATH = args.db or f"/tmp/anime_bench_{args.rows}.db"
+# 必須在 import models 之前設定，engine 會在 import 時建立
+os.environ["ANIME_DB_PATH"] = DB_PATH
+
+from synthetic_db import build_synthetic_db  # noqa: E402
+
+if not os.path.exists(DB_PATH):
+    print(f"📦 Building synthetic database with {args.rows:,} rows...")
+    build_synthetic_db(DB_PATH, rows=args.rows)
+
+from models import Anime, run_migrations  # noqa: E402
+from models.database import SessionLocal  # noqa: E402
+from services import (  # noqa: E402
+    RECOMMENDATION_FIELDS, SEARCH_FIELDS, SortKey, anime_columns, paginate, serialize_anime_list,
+)
+
+run_migrations()
+
+# (名稱, 欄位, filters, sort keys)
+PAGES = [
+    ("popular", RECOMMENDATION_FIELDS,
+     [Anime.members != None, Anime.score != None, Anime.score >= 6.0],
+     [SortKey(Anime.members), SortKey(Anime.id)]),
+    ("search by score", SEARCH_FIELDS,
+     [],
+     [SortKey(Anime.score, nullable=True), SortKey(Anime.id)]),
+]
+
+
+def read_page(entity, fields, filters, sort_keys):
+    db = SessionLocal()
+    try:
+        rows, _ = paginate(db.query(entity).filter(*filters), sort_keys, args.limit)
+        return serialize_anime_list(db, rows, fields)
+    finally:
+        db.close()
+
+
+def measure(entity, fields, filters, sort_keys):
+    timings = []
+    for _ in range(args.runs):
+        started = time.process_time()
+        read_page(entity, fields, filters, sort_keys)
+        timings.append((time.process_time() - started) * 1000)
+
+    tracemalloc.start()
+    read_page(entity, fields, filters, sort_keys)
+    tracemalloc.reset_peak()
+    result = read_page(entity, fields, filters, sort_keys)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(timings), peak, result
+
+
+def main():
+    print(f"\n{'page':16s} {'orm ms':>8s} {'rows ms':>8s} {'orm KB':>8s} {'rows KB':>8s}")
+    print("-" * 52)
+    for name, fields, filters, sort_keys in PAGES:
+        orm_ms, orm_peak, orm_result = measure(Anime, fields, filters, sort_keys)
+        row_ms, row_peak, row_result = measure(anime_columns(fields), fields, filters, sort_keys)
+        assert orm_result == row_result, f"{name}: results differ"
+        print(f"{name:16s} {orm_ms:8.2f} {row_ms:8.2f} {orm_peak / 1024:8.0f} {row_peak / 1024:8.0f}")
+
+
+if __name__ == "__main__":
+    main()
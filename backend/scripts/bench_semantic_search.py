@@ -0,0 +1,173 @@
+"""
+Benchmark the semantic search index (services/semantic_index.py) and /api/search/semantic.
+
+Builds the IVF index for a copy of the database, then runs queries made of a
+random 8-word window of random synopses ("describe what you want") and
+compares recall@k and latency for several nprobe values against a brute-force
+scan over every vector ("source" is how often the anime the words came from
+is in the top k). Finally appends new anime the way
+fetch_and_save.save_anime() does and checks they can be found without a
+rebuild.
+
+Usage (from backend/):
+    python scripts/bench_semantic_search.py --rows 16000
+    python scripts/bench_semantic_search.py --rows 1000000 --queries 100
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "scripts"))
+
+parser = argparse.ArgumentParser(description="Benchmark the semantic search index")
+parser.add_argument("--rows", type=int, default=16000)
+parser.add_argument("--db", default=None)
+parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+parser.add_argument("--queries", type=int, default=200)
+parser.add_argument("--limit", type=int, default=10)
+parser.add_argument("--inserts", type=int, default=200, help="anime appended after the build")
+args = parser.parse_args()
+
+SOURCE_PATH = args.db or f"/tmp/anime_bench_{args.rows}.db"
+WORK_DIR = tempfile.mkdtemp()
+DB_PATH = os.path.join(WORK_DIR, "anime_semantic.db")
+# 必須在 import models 之前設定，engine 會在 import 時建立
+os.environ["ANIME_DB_PATH"] = DB_PATH
+os.environ["ANIME_SEMANTIC_INDEX_DIR"] = os.path.join(WORK_DIR, "semantic_index")
+
+from synthetic_db import _synopsis, build_synthetic_db  # noqa: E402
+
+if not os.path.exists(SOURCE_PATH):
+    print(f"📦 Building synthetic database with {args.rows:,} rows...")
+    build_synthetic_db(SOURCE_PATH, rows=args.rows)
+shutil.copy(SOURCE_PATH, DB_PATH)
+
+import numpy as np  # noqa: E402
+from sqlalchemy import func, insert, select  # noqa: E402
+from models import Anime  # noqa: E402
+from models.database import AsyncSessionLocal, engine  # noqa: E402
+from services.semantic_index import (  # noqa: E402
+    add_to_semantic_index, build_semantic_index, index_directory, semantic_index,
+)
+from main import semantic_search  # noqa: E402
+
+NPROBES = [1, 2, 4, 8, 16, 32, 64]
+
+# endpoints 是 async，每次都在同一個 event loop 上執行
+run = asyncio.new_event_loop().run_until_complete
+
+
+def percentile(values, fraction):
+    return sorted(values)[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def brute_force(build, query, limit):
+    """Exact top `limit` by scanning every vector (same embedding as the index)"""
+    scores = np.concatenate([
+        build.vectors[start:start + 65536] @ query for start in range(0, build.anime, 65536)
+    ])
+    top = np.argpartition(-scores, limit - 1)[:limit]
+    return set(build.ids[top].tolist())
+
+
+def main():
+    rng = random.Random(0)
+    print(f"🔎 Building the semantic index ({args.workers} workers)")
+    started = time.perf_counter()
+    anime, lists = build_semantic_index(engine, workers=args.workers)
+    print(f"  {anime:,} anime in {lists:,} lists: {time.perf_counter() - started:.2f} s, "
+          f"{directory_size(index_directory()) / 1024 / 1024:.0f} MB on disk, "
+          f"peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB "
+          f"(largest worker {resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024:.0f} MB)")
+
+    # 查詢：隨機幾部動漫 synopsis 裡的一段 8 個字
+    with engine.connect() as conn:
+        max_id = conn.execute(select(func.max(Anime.id))).scalar()
+        texts, sources = [], []
+        while len(texts) < args.queries:
+            source = rng.randint(1, max_id)
+            synopsis = conn.execute(select(Anime.synopsis).where(Anime.id == source)).scalar()
+            if synopsis:
+                words = synopsis.split()
+                start = rng.randrange(max(1, len(words) - 8))
+                texts.append(" ".join(words[start:start + 8]))
+                sources.append(source)
+
+    build = semantic_index.get_build()
+    queries = [build.embed(text) for text in texts]
+    brute_times, expected = [], []
+    for query in queries:
+        started = time.perf_counter()
+        expected.append(brute_force(build, query, args.limit))
+        brute_times.append((time.perf_counter() - started) * 1000)
+
+    print(f"\n{'nprobe':>11s} {'scanned':>9s} {'recall@' + str(args.limit):>10s} {'source':>8s} "
+          f"{'median':>9s} {'p99':>9s}")
+    list_sizes = np.diff(build.offsets)
+    for nprobe in NPROBES:
+        if nprobe > lists:
+            break
+        timings, recalls, found = [], [], 0
+        for text, source, exact in zip(texts, sources, expected):
+            started = time.perf_counter()
+            matches = {anime_id for anime_id, _ in build.search(text, args.limit, nprobe)}
+            timings.append((time.perf_counter() - started) * 1000)
+            recalls.append(len(exact & matches) / args.limit)
+            found += source in matches
+        scanned = np.sort(list_sizes)[::-1][:nprobe].sum() / max(anime, 1)
+        print(f"{nprobe:>11d} {'<' + format(scanned, '.1%'):>9s} {statistics.mean(recalls):>10.1%} "
+              f"{found / len(texts):>8.1%} {statistics.median(timings):>7.2f} ms {percentile(timings, 0.99):>6.2f} ms")
+    found = sum(source in exact for source, exact in zip(sources, expected))
+    print(f"{'brute force':>11s} {'100%':>9s} {'100.0%':>10s} {found / len(texts):>8.1%} "
+          f"{statistics.median(brute_times):>7.2f} ms {percentile(brute_times, 0.99):>6.2f} ms")
+
+    # 和 fetch_and_save.save_anime 一樣：新增後直接 append 到 delta
+    new_rng = random.Random(1)
+    new_anime = []
+    insert_times = []
+    for offset in range(1, args.inserts + 1):
+        anime_id = max_id + offset
+        synopsis = _synopsis(new_rng) or "A brand new story."
+        with engine.begin() as conn:
+            conn.execute(insert(Anime).values(
+                id=anime_id, mal_id=10_000_000 + anime_id, title=f"New {anime_id}", synopsis=synopsis
+            ))
+        started = time.perf_counter()
+        add_to_semantic_index(anime_id, synopsis, engine)
+        insert_times.append((time.perf_counter() - started) * 1000)
+        new_anime.append((anime_id, synopsis))
+
+    found = sum(
+        anime_id in {match_id for match_id, _ in semantic_index.search(synopsis, args.limit)}
+        for anime_id, synopsis in new_anime
+    )
+    print(f"\n➕ {len(new_anime)} appended anime: {statistics.median(insert_times):.2f} ms per insert, "
+          f"{found}/{len(new_anime)} found by their own synopsis without a rebuild")
+
+    db = AsyncSessionLocal()
+    timings = []
+    for text in texts:
+        started = time.perf_counter()
+        run(semantic_search(text=text, limit=24, nprobe=16, fields=None, db=db))
+        timings.append((time.perf_counter() - started) * 1000)
+    run(db.close())
+    print(f"\n/api/search/semantic (limit 24, nprobe 16): median {statistics.median(timings):.2f} ms, "
+          f"p99 {percentile(timings, 0.99):.2f} ms")
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
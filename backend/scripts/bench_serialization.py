@@ -0,0 +1,108 @@
+"""
+Benchmark response serialization per page: dict + jsonable_encoder vs. response model + orjson.
+
+The page payloads come from the real endpoints (synopses included). "dict" is
+the old path (jsonable_encoder, then JSONResponse renders with json.dumps);
+"model" is what the routes do now (pydantic-core validation/serialization of
+the route's response_model, then ORJSONResponse).
+
+Usage (from backend/):
+    python scripts/bench_serialization.py --rows 100000
+    python scripts/bench_serialization.py --db /tmp/anime_bench_1000000.db --runs 500
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "scripts"))
+
+parser = argparse.ArgumentParser(description="Benchmark dict vs. response model serialization")
+parser.add_argument("--rows", type=int, default=100000)
+parser.add_argument("--db", default=None)
+parser.add_argument("--runs", type=int, default=200)
+args = parser.parse_args()
+
+DB_PATH = args.db or f"/tmp/anime_bench_{args.rows}.db"
+# 必須在 import models 之前設定，engine 會在 import 時建立
+os.environ["ANIME_DB_PATH"] = DB_PATH
+
+from synthetic_db import build_synthetic_db  # noqa: E402
+
+if not os.path.exists(DB_PATH):
+    print(f"📦 Building synthetic database with {args.rows:,} rows...")
+    build_synthetic_db(DB_PATH, rows=args.rows)
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from models import run_migrations  # noqa: E402
+from models.database import AsyncSessionLocal  # noqa: E402
+from main import app, get_anime_by_id, get_popular_recommendations, search_anime  # noqa: E402
+
+run_migrations()
+
+# endpoints 是 async，每次都在同一個 event loop 上執行
+run = asyncio.new_event_loop().run_until_complete
+
+
+def response_field(path):
+    return next(route.response_field for route in app.routes if getattr(route, "path", None) == path)
+
+
+def load_payloads(db):
+    payloads = []
+    for limit in (20, 100):
+        payloads.append((f"search limit={limit}", "/api/search", run(search_anime(
+            q=None, genres=None, types=None, years=None, min_score=None, max_score=None,
+            sort_by="score", order="desc", limit=limit, offset=0, cursor=None,
+            include_total=True, db=db
+        ))))
+        payloads.append((f"popular limit={limit}", "/api/recommendations/popular", run(
+            get_popular_recommendations(limit=limit, offset=0, cursor=None, include_total=True, db=db)
+        )))
+    payloads.append(("detail", "/api/anime/{anime_id}", run(get_anime_by_id(anime_id=1, db=db))))
+    return payloads
+
+
+def dict_path(field, payload):
+    return JSONResponse(jsonable_encoder(payload)).body
+
+
+def model_path(field, payload):
+    content = run(serialize_response(field=field, response_content=payload, exclude_unset=True))
+    return ORJSONResponse(content).body
+
+
+def timed(fn, field, payload):
+    timings = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        fn(field, payload)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    db = AsyncSessionLocal()
+    payloads = load_payloads(db)
+    run(db.close())
+
+    print(f"\n{'page':20s} {'bytes':>8s} {'dict ms':>8s} {'model ms':>9s} {'speedup':>8s}")
+    print("-" * 57)
+    for name, path, payload in payloads:
+        field = response_field(path)
+        body = model_path(field, payload)
+        # 兩條路徑產生的 JSON 必須完全相同
+        assert body == dict_path(field, payload), f"{name}: JSON differs"
+        dict_ms = timed(dict_path, field, payload)
+        model_ms = timed(model_path, field, payload)
+        print(f"{name:20s} {len(body):8,d} {dict_ms:8.3f} {model_ms:9.3f} {dict_ms / model_ms:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
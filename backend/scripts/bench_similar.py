@@ -0,0 +1,134 @@
+"""
+Benchmark the similar_anime build (services/similar.py) and /api/anime/{id}/similar.
+
+Builds the neighbours on a copy of the database and reports each stage
+(read features, encode, top-K, write) plus peak RSS. A sample of anime is
+checked against a brute-force cosine over the full (dense + studio) matrix.
+Then times the endpoint (one indexed read) against computing one anime's
+neighbours live from the encoded vectors.
+
+Usage (from backend/):
+    python scripts/bench_similar.py --rows 16000
+    python scripts/bench_similar.py --rows 100000 --check 50
+"""
+import argparse
+import asyncio
+import os
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "scripts"))
+
+parser = argparse.ArgumentParser(description="Benchmark the similar_anime build and endpoint")
+parser.add_argument("--rows", type=int, default=16000)
+parser.add_argument("--db", default=None)
+parser.add_argument("--check", type=int, default=200, help="anime checked against brute force")
+parser.add_argument("--runs", type=int, default=200)
+args = parser.parse_args()
+
+SOURCE_PATH = args.db or f"/tmp/anime_bench_{args.rows}.db"
+DB_PATH = os.path.join(tempfile.mkdtemp(), "anime_similar.db")
+# 必須在 import models 之前設定，engine 會在 import 時建立
+os.environ["ANIME_DB_PATH"] = DB_PATH
+
+from synthetic_db import build_synthetic_db  # noqa: E402
+
+if not os.path.exists(SOURCE_PATH):
+    print(f"📦 Building synthetic database with {args.rows:,} rows...")
+    build_synthetic_db(SOURCE_PATH, rows=args.rows)
+shutil.copy(SOURCE_PATH, DB_PATH)
+
+import numpy as np  # noqa: E402
+from models import run_migrations  # noqa: E402
+from models.database import AsyncSessionLocal, engine  # noqa: E402
+from services.similar import (  # noqa: E402
+    SIMILAR_K, _feature_rows, encode_features, neighbor_dicts, similar_anime, similar_rows,
+    top_neighbors,
+)
+from main import get_similar_anime  # noqa: E402
+
+run_migrations()
+
+# endpoints 是 async，每次都在同一個 event loop 上執行
+run = asyncio.new_event_loop().run_until_complete
+
+
+def stage(name, fn, *fn_args):
+    started = time.perf_counter()
+    result = fn(*fn_args)
+    print(f"  {name:16s} {time.perf_counter() - started:8.2f} s")
+    return result
+
+
+def write(batches):
+    total = 0
+    with engine.begin() as conn:
+        conn.execute(similar_anime.delete())
+        for batch in batches:
+            rows = neighbor_dicts(*batch)
+            conn.execute(similar_anime.insert(), rows)
+            total += len(rows)
+    return total
+
+
+def full_matrix(dense, studio_rows):
+    """dense block + one-hot studio columns (brute-force reference)"""
+    row_indptr, row_studios, row_values = studio_rows
+    matrix = np.zeros((dense.shape[0], dense.shape[1] + int(row_studios.max(initial=-1)) + 1), dtype=np.float32)
+    matrix[:, :dense.shape[1]] = dense
+    matrix[np.repeat(np.arange(dense.shape[0]), np.diff(row_indptr)), dense.shape[1] + row_studios] = row_values
+    return matrix
+
+
+def main():
+    print(f"🧭 Building similar_anime ({DB_PATH})")
+    started = time.perf_counter()
+    ids, features = stage("read features", _feature_rows, engine)
+    dense, studio_postings, studio_rows = stage("encode", encode_features, ids, features)
+    batches = stage("top-K", lambda: list(similar_rows(ids, dense, studio_postings, studio_rows)))
+    rows = stage("write", write, batches)
+    print(f"  {'total':16s} {time.perf_counter() - started:8.2f} s, "
+          f"{rows:,} rows, peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+    # 抽樣和 brute-force 比對 (同分的順序可能不同，比較分數)
+    matrix = full_matrix(dense, studio_rows)
+    neighbors = {}
+    for anime_ids, neighbor_ids, scores, _ in batches:
+        for anime_id, neighbor_id, score in zip(anime_ids.tolist(), neighbor_ids.tolist(), scores.tolist()):
+            neighbors.setdefault(anime_id, []).append(score)
+    sample = np.random.default_rng(0).choice(len(ids), min(args.check, len(ids)), replace=False)
+    for position in sample:
+        scores = matrix @ matrix[position]
+        scores[position] = 0
+        expected = np.sort(scores[scores > 0])[::-1][:SIMILAR_K]
+        assert np.allclose(neighbors.get(int(ids[position]), []), expected, atol=1e-5), \
+            f"anime {ids[position]}: neighbours differ from brute force"
+    print(f"✅ {len(sample)} anime match brute force")
+
+    # endpoint (一次 index 讀取) vs. 即時計算一部動漫的相似作品
+    db = AsyncSessionLocal()
+    timings, live = [], []
+    for position in sample[:args.runs]:
+        anime_id = int(ids[position])
+        started = time.perf_counter()
+        run(get_similar_anime(anime_id=anime_id, limit=12, fields=None, db=db))
+        timings.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        scores = matrix[position:position + 1] @ matrix.T
+        scores[0, position] = 0
+        top_neighbors(scores, 12)
+        live.append((time.perf_counter() - started) * 1000)
+    run(db.close())
+    print(f"\n/api/anime/{{id}}/similar: {statistics.median(timings):.2f} ms "
+          f"(live from vectors: {statistics.median(live):.2f} ms, not counting the encode)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark grid-view pages with `fields=` against the full list items.
+
+Requests each list endpoint through the app (response cache cleared, so every
+request reaches SQLite) once with the default fields and once with the fields
+AnimeCard renders, and reports payload size and median latency.
+
+Usage (from backend/, needs `pip install httpx` for TestClient):
+    python scripts/bench_sparse_fields.py --rows 100000
+    python scripts/bench_sparse_fields.py --db /tmp/anime_bench_1000000.db --runs 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "scripts"))
+
+parser = argparse.ArgumentParser(description="Benchmark fields= (sparse fieldsets) on list endpoints")
+parser.add_argument("--rows", type=int, default=100000)
+parser.add_argument("--db", default=None)
+parser.add_argument("--runs", type=int, default=20)
+parser.add_argument("--limit", type=int, default=100)
+args = parser.parse_args()
+
+DB_PATH = args.db or f"/tmp/anime_bench_{args.rows}.db"
+# 必須在 import models 之前設定，engine 會在 import 時建立
+os.environ["ANIME_DB_PATH"] = DB_PATH
+
+from synthetic_db import build_synthetic_db  # noqa: E402
+
+if not os.path.exists(DB_PATH):
+    print(f"📦 Building synthetic database with {args.rows:,} rows...")
+    build_synthetic_db(DB_PATH, rows=args.rows)
+
+from fastapi.testclient import TestClient  # noqa: E402
+from main import app  # noqa: E402
+from services import response_cache  # noqa: E402
+
+# frontend/src/services/api.js 的 CARD_FIELDS
+CARD_FIELDS = "id,mal_id,title,title_english,type,episodes,score,year,image_url"
+
+ENDPOINTS = [
+    "/api/search?sort_by=score",
+    "/api/search?q=ka",
+    "/api/recommendations/popular",
+    "/api/recommendations/hidden-gems",
+    "/api/recommendations/genre/Action",
+]
+
+
+def measure(client, url):
+    timings = []
+    for _ in range(args.runs):
+        response_cache.clear()
+        started = time.perf_counter()
+        response = client.get(url)
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, f"{url}: HTTP {response.status_code}"
+    return len(response.content), statistics.median(timings)
+
+
+def main():
+    print(f"\n{'endpoint':36s} {'full KB':>8s} {'grid KB':>8s} {'full ms':>8s} {'grid ms':>8s}")
+    print("-" * 72)
+    with TestClient(app) as client:
+        for endpoint in ENDPOINTS:
+            url = f"{endpoint}{'&' if '?' in endpoint else '?'}limit={args.limit}"
+            client.get(url)  # 暖身 (totals 快取、page cache)
+            full_bytes, full_ms = measure(client, url)
+            grid_bytes, grid_ms = measure(client, f"{url}&fields={CARD_FIELDS}")
+            print(f"{endpoint:36s} {full_bytes / 1024:8.1f} {grid_bytes / 1024:8.1f} "
+                  f"{full_ms:8.1f} {grid_ms:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
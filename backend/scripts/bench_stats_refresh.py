@@ -0,0 +1,192 @@
+"""
+Benchmark API read latency while a stats refresh is writing.
+
+update_anime_stats.py commits once per anime. This script runs the same write
+pattern (one UPDATE + commit per anime) in a writer thread while reader threads
+serve the hot API reads (anime detail + a Discover page), and compares two
+connection profiles on separate copies of the database:
+
+  default  plain create_engine(), rollback journal, no pragmas (the old setup)
+  profile  SQLITE_PROFILE from models.database (WAL, mmap, cache_size, ...),
+           query_only readers in a READER_POOL_SIZE pool
+
+Each profile is measured idle and during the refresh; "errors" are reads that
+failed with `database is locked`.
+
+Usage (from backend/):
+    python scripts/bench_stats_refresh.py --rows 100000
+    python scripts/bench_stats_refresh.py --db /tmp/anime_bench_1000000.db --readers 16
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "scripts"))
+
+parser = argparse.ArgumentParser(description="Benchmark reads during a concurrent stats refresh")
+parser.add_argument("--rows", type=int, default=100000)
+parser.add_argument("--db", default=None)
+parser.add_argument("--readers", type=int, default=8)
+parser.add_argument("--seconds", type=float, default=10)
+parser.add_argument("--write-interval-ms", type=float, default=0,
+                    help="pause between commits (0 = back-to-back, the worst case)")
+args = parser.parse_args()
+
+DB_PATH = args.db or f"/tmp/anime_bench_{args.rows}.db"
+# 必須在 import models 之前設定，engine 會在 import 時建立
+os.environ["ANIME_DB_PATH"] = DB_PATH
+
+from synthetic_db import build_synthetic_db  # noqa: E402
+
+if not os.path.exists(DB_PATH):
+    print(f"📦 Building synthetic database with {args.rows:,} rows...")
+    build_synthetic_db(DB_PATH, rows=args.rows)
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from models import Anime, run_migrations  # noqa: E402
+from models.database import READER_POOL_SIZE, apply_sqlite_profile  # noqa: E402
+from services import DETAIL_FIELDS, discover_page, serialize_anime_list  # noqa: E402
+
+run_migrations()
+
+
+def default_engines(path):
+    url = f"sqlite:///{path}"
+    return create_engine(url), create_engine(url)
+
+
+def profile_engines(path):
+    url = f"sqlite:///{path}"
+    writer = apply_sqlite_profile(create_engine(url))
+    reader = apply_sqlite_profile(
+        create_engine(url, pool_size=READER_POOL_SIZE, max_overflow=0), query_only=True
+    )
+    return writer, reader
+
+
+def copy_database(journal_mode):
+    path = os.path.join(tempfile.mkdtemp(), "anime.db")
+    shutil.copy(DB_PATH, path)
+    conn = sqlite3.connect(path)
+    conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+    conn.close()
+    return path
+
+
+def read_once(Session, max_id):
+    db = Session()
+    try:
+        anime = db.get(Anime, random.randint(1, max_id))
+        if anime:
+            serialize_anime_list(db, [anime], DETAIL_FIELDS)
+        rows, _, _ = discover_page(db, "popular", 20, random.randint(0, 2000), include_total=False)
+        serialize_anime_list(db, rows)
+    finally:
+        db.close()
+
+
+def run_phase(Session, max_id, writer_engine=None):
+    """Reads for args.seconds (optionally with the writer running); returns (latencies, errors, commits)"""
+    stop = threading.Event()
+    latencies = []
+    errors = [0]
+    commits = [0]
+    lock = threading.Lock()
+
+    def reader():
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                read_once(Session, max_id)
+            except OperationalError:
+                with lock:
+                    errors[0] += 1
+                continue
+            with lock:
+                latencies.append((time.perf_counter() - started) * 1000)
+
+    def writer():
+        # 跟 update_anime_stats.py 一樣：一部動漫 UPDATE 一次、commit 一次
+        db = sessionmaker(bind=writer_engine)()
+        while not stop.is_set():
+            anime = db.get(Anime, random.randint(1, max_id))
+            if anime:
+                anime.score = round(random.uniform(5, 9.5), 2)
+                anime.members = (anime.members or 0) + random.randint(1, 500)
+                anime.favorites = (anime.favorites or 0) + random.randint(0, 20)
+                anime.popularity = random.randint(1, max_id)
+                try:
+                    db.commit()
+                    commits[0] += 1
+                except OperationalError:
+                    db.rollback()
+            if args.write_interval_ms:
+                time.sleep(args.write_interval_ms / 1000)
+        db.close()
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    if writer_engine is not None:
+        threads.append(threading.Thread(target=writer))
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0], commits[0]
+
+
+def percentile(values, fraction):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    with sqlite3.connect(DB_PATH) as conn:
+        max_id = conn.execute("SELECT max(id) FROM anime").fetchone()[0]
+
+    print(f"\n{args.readers} readers, {args.seconds:.0f}s per phase, "
+          f"write interval {args.write_interval_ms:g} ms")
+    print(f"\n{'profile':8s} {'phase':8s} {'reads/s':>8s} {'p50 ms':>8s} {'p95 ms':>8s} "
+          f"{'p99 ms':>8s} {'max ms':>8s} {'errors':>6s} {'commits/s':>9s}")
+    print("-" * 80)
+    for name, journal_mode, make_engines in (
+        ("default", "delete", default_engines),
+        ("profile", "wal", profile_engines),
+    ):
+        path = copy_database(journal_mode)
+        writer_engine, reader_engine = make_engines(path)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=reader_engine)
+
+        # 暖身：載入 page cache
+        for _ in range(50):
+            read_once(Session, max_id)
+
+        for phase, writer in (("idle", None), ("refresh", writer_engine)):
+            latencies, errors, commits = run_phase(Session, max_id, writer)
+            print(f"{name:8s} {phase:8s} {len(latencies) / args.seconds:8.0f} "
+                  f"{statistics.median(latencies) if latencies else float('nan'):8.1f} "
+                  f"{percentile(latencies, 0.95):8.1f} {percentile(latencies, 0.99):8.1f} "
+                  f"{max(latencies, default=float('nan')):8.1f} {errors:6d} "
+                  f"{commits / args.seconds:9.0f}")
+
+        writer_engine.dispose()
+        reader_engine.dispose()
+        shutil.rmtree(os.path.dirname(path))
+
+
+if __name__ == "__main__":
+    main()
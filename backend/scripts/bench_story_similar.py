@@ -0,0 +1,176 @@
+"""
+Benchmark the synopsis_similar build (services/story_similar.py) and /api/anime/{id}/similar?by=story.
+
+Builds the neighbours on a copy of the database and reports each pass
+(document frequency, pruned vectors, posting lists, top-K + write) plus peak
+RSS of the main process and of the largest worker. A sample of anime is
+checked against the exact cosine over the full (unpruned) TF-IDF vectors:
+recall@K is the share of the exact top-K that the pruned build also found.
+
+Usage (from backend/):
+    python scripts/bench_story_similar.py --rows 16000
+    python scripts/bench_story_similar.py --rows 1000000 --workers 4 --check 0
+"""
+import argparse
+import asyncio
+import os
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from multiprocessing import get_context
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "scripts"))
+
+parser = argparse.ArgumentParser(description="Benchmark the synopsis_similar build and endpoint")
+parser.add_argument("--rows", type=int, default=16000)
+parser.add_argument("--db", default=None)
+parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+parser.add_argument("--check", type=int, default=200, help="anime checked against the exact cosine (0 = skip)")
+parser.add_argument("--runs", type=int, default=200)
+args = parser.parse_args()
+
+SOURCE_PATH = args.db or f"/tmp/anime_bench_{args.rows}.db"
+DB_PATH = os.path.join(tempfile.mkdtemp(), "anime_synopsis_similar.db")
+# 必須在 import models 之前設定，engine 會在 import 時建立
+os.environ["ANIME_DB_PATH"] = DB_PATH
+
+from synthetic_db import build_synthetic_db  # noqa: E402
+
+if not os.path.exists(SOURCE_PATH):
+    print(f"📦 Building synthetic database with {args.rows:,} rows...")
+    build_synthetic_db(SOURCE_PATH, rows=args.rows)
+shutil.copy(SOURCE_PATH, DB_PATH)
+
+import numpy as np  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+from models import Anime, run_migrations  # noqa: E402
+from models.database import AsyncSessionLocal, engine  # noqa: E402
+from services.similar import SIMILAR_K  # noqa: E402
+from services.story_similar import (  # noqa: E402
+    document_frequencies, hashed_terms, id_ranges, inverse_document_frequency, pruned_vectors,
+    save_postings, synopsis_neighbors, synopsis_similar,
+)
+from main import get_similar_anime  # noqa: E402
+
+run_migrations()
+
+# endpoints 是 async，每次都在同一個 event loop 上執行
+run = asyncio.new_event_loop().run_until_complete
+
+
+def stage(name, fn, *fn_args):
+    started = time.perf_counter()
+    result = fn(*fn_args)
+    print(f"  {name:16s} {time.perf_counter() - started:8.2f} s")
+    return result
+
+
+def write(pool, directory, ids, blocks):
+    neighbors = {}
+    total = 0
+    with engine.begin() as conn:
+        conn.execute(synopsis_similar.delete())
+        for rows, positions, scores, ranks in synopsis_neighbors(pool, directory, blocks):
+            anime_ids, neighbor_ids = ids[rows], ids[positions]
+            conn.execute(synopsis_similar.insert(), [
+                {"anime_id": anime_id, "rank": rank, "neighbor_id": neighbor_id, "score": score}
+                for anime_id, rank, neighbor_id, score in zip(
+                    anime_ids.tolist(), ranks.tolist(), neighbor_ids.tolist(), scores.tolist()
+                )
+            ])
+            total += len(rows)
+            if args.check:
+                for anime_id, neighbor_id in zip(anime_ids.tolist(), neighbor_ids.tolist()):
+                    neighbors.setdefault(anime_id, []).append(neighbor_id)
+    return total, neighbors
+
+
+def peak_rss():
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    workers = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return f"peak RSS {own:.0f} MB (largest worker {workers:.0f} MB)"
+
+
+def exact_recall(idf, neighbors, sample_ids):
+    """Average share of the exact top-K (full TF-IDF cosine) found by the build"""
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(Anime.id, Anime.synopsis).where(Anime.synopsis.isnot(None)).order_by(Anime.id)
+        ).all()
+
+    ids, entry_rows, features, weights = [], [], [], []
+    for anime_id, synopsis in rows:
+        counts = hashed_terms(synopsis)
+        if not counts:
+            continue
+        row_features = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        row_weights = (1 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))) \
+            * idf[row_features]
+        entry_rows.append(np.full(len(counts), len(ids)))
+        ids.append(anime_id)
+        features.append(row_features)
+        weights.append(row_weights / np.linalg.norm(row_weights))
+    ids = np.array(ids)
+    entry_rows, features, weights = map(np.concatenate, (entry_rows, features, weights))
+
+    # 全部的 posting lists (不裁切)
+    order = np.argsort(features, kind="stable")
+    posting_features, posting_rows, posting_weights = features[order], entry_rows[order], weights[order]
+    positions = {anime_id: position for position, anime_id in enumerate(ids.tolist())}
+
+    recalls = []
+    for anime_id in sample_ids:
+        mask = entry_rows == positions[anime_id]
+        scores = np.zeros(len(ids))
+        for feature, weight in zip(features[mask], weights[mask]):
+            start, stop = np.searchsorted(posting_features, [feature, feature + 1])
+            scores[posting_rows[start:stop]] += weight * posting_weights[start:stop]
+        scores[positions[anime_id]] = 0
+        expected = set(ids[np.argsort(-scores, kind="stable")[:SIMILAR_K]].tolist())
+        recalls.append(len(expected & set(neighbors.get(anime_id, []))) / SIMILAR_K)
+    return statistics.mean(recalls)
+
+
+def main():
+    url = engine.url.render_as_string(hide_password=False)
+    print(f"📖 Building synopsis_similar ({DB_PATH}, {args.workers} workers)")
+    started = time.perf_counter()
+    directory = tempfile.mkdtemp(prefix="synopsis_similar_")
+    pool = get_context().Pool(args.workers) if args.workers > 1 else None
+
+    ranges = id_ranges(engine)
+    documents, document_frequency = stage("document freq", document_frequencies, pool, url, ranges)
+    ids, indptr, terms, weights = stage(
+        "pruned vectors", pruned_vectors, pool, url, directory, ranges, documents, document_frequency
+    )
+    blocks = stage("posting lists", save_postings, directory, indptr, terms, weights)
+    rows, neighbors = stage("top-K + write", write, pool, directory, ids, blocks)
+    if pool:
+        pool.close()
+        pool.join()
+    print(f"  {'total':16s} {time.perf_counter() - started:8.2f} s, {documents:,} synopses, "
+          f"{len(terms):,} kept terms, {len(blocks):,} blocks, {rows:,} rows, {peak_rss()}")
+    shutil.rmtree(directory)
+
+    sample = np.random.default_rng(0).choice(ids, min(max(args.check, 1), len(ids)), replace=False).tolist()
+    if args.check:
+        recall = exact_recall(inverse_document_frequency(document_frequency, documents), neighbors, sample)
+        print(f"🎯 recall@{SIMILAR_K} vs the exact cosine over {len(sample)} anime: {recall:.1%}")
+
+    db = AsyncSessionLocal()
+    timings = []
+    for anime_id in (sample * args.runs)[:args.runs]:
+        started = time.perf_counter()
+        run(get_similar_anime(anime_id=anime_id, limit=12, by="story", fields=None, db=db))
+        timings.append((time.perf_counter() - started) * 1000)
+    run(db.close())
+    print(f"\n/api/anime/{{id}}/similar?by=story: {statistics.median(timings):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
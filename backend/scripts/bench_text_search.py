@@ -0,0 +1,98 @@
+"""
+Benchmark /api/search text queries: FTS5 (bm25, prefix) vs. the old ilike scan.
+
+Usage (from backend/):
+    python scripts/bench_text_search.py --rows 1000000
+    python scripts/bench_text_search.py --db /tmp/anime_bench_1m.db   # 重複使用已建立的資料庫
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "scripts"))
+
+parser = argparse.ArgumentParser(description="Benchmark full-text search")
+parser.add_argument("--rows", type=int, default=1000000)
+parser.add_argument("--db", default=None)
+parser.add_argument("--runs", type=int, default=50)
+args = parser.parse_args()
+
+DB_PATH = args.db or f"/tmp/anime_bench_{args.rows}.db"
+# 必須在 import models 之前設定，engine 會在 import 時建立
+os.environ["ANIME_DB_PATH"] = DB_PATH
+
+from synthetic_db import build_synthetic_db  # noqa: E402
+
+if not os.path.exists(DB_PATH):
+    print(f"📦 Building synthetic database with {args.rows:,} rows...")
+    build_synthetic_db(DB_PATH, rows=args.rows)
+
+from models import Anime, run_migrations  # noqa: E402
+from models.database import AsyncSessionLocal, SessionLocal  # noqa: E402
+from main import search_anime  # noqa: E402
+
+started = time.perf_counter()
+run_migrations()
+print(f"🔧 Migrations applied in {time.perf_counter() - started:.1f}s")
+
+
+# search_anime 是 async endpoint，每次都在同一個 event loop 上執行
+run = asyncio.new_event_loop().run_until_complete
+
+
+def search(db, q):
+    return run(search_anime(
+        q=q, genres=None, types=None, years=None, min_score=None, max_score=None,
+        sort_by=None, order="desc", limit=24, offset=0, cursor=None, include_total=True, db=db
+    ))
+
+
+def ilike_search(db, q):
+    query = db.query(Anime).filter(Anime.title.ilike(f"%{q}%"))
+    total = query.count()
+    rows = query.order_by(Anime.score.desc()).limit(24).all()
+    return {"total": total, "data": rows}
+
+
+def timed(fn, db, q):
+    started = time.perf_counter()
+    result = fn(db, q)
+    return (time.perf_counter() - started) * 1000, result["total"]
+
+
+def main():
+    db = SessionLocal()
+    async_db = AsyncSessionLocal()
+    rng = random.Random(1)
+    max_id = db.query(Anime.id).order_by(Anime.id.desc()).first()[0]
+    samples = [db.get(Anime, rng.randint(1, max_id)) for _ in range(args.runs)]
+
+    cases = {
+        "full title": [a.title for a in samples],
+        "first word": [a.title.split()[0] for a in samples],
+        "4-char prefix": [a.title.split()[0][:4] for a in samples],
+        "two words": [" ".join(a.title.split()[:2]) for a in samples],
+    }
+
+    print(f"\n{'case':16s} {'engine':7s} {'p50 ms':>8s} {'p95 ms':>8s} {'avg hits':>10s}")
+    print("-" * 54)
+    for case, queries in cases.items():
+        for engine_name, fn, session in (("fts5", search, async_db), ("ilike", ilike_search, db)):
+            # ilike 很慢，只跑前 5 筆
+            subset = queries if engine_name == "fts5" else queries[:5]
+            timings, hits = zip(*(timed(fn, session, q) for q in subset))
+            p95 = sorted(timings)[max(0, int(len(timings) * 0.95) - 1)]
+            print(f"{case:16s} {engine_name:7s} {statistics.median(timings):8.2f} "
+                  f"{p95:8.2f} {statistics.mean(hits):10.1f}")
+    run(async_db.close())
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
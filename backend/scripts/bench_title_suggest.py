@@ -0,0 +1,192 @@
+"""
+Benchmark the typeahead prefix index (services/title_suggest.py) and /api/search/suggest.
+
+Times the full build, then looks up prefixes of 1-8 characters taken from
+random titles (what a user types one keystroke at a time) and checks every
+answer against a brute-force scan of all titles. Then writes to the database
+the way data-collection does (new anime, members updates, deletes), times the
+incremental patch and checks it against a fresh rebuild. A batch too large to
+patch (every members count) must not hold up the request: it keeps the old index
+until the background rebuild swaps in one equal to a fresh build. For comparison
+it also times the /api/search?q= request the SearchBar used to need per keystroke.
+
+Usage (from backend/):
+    python scripts/bench_title_suggest.py --rows 16000
+    python scripts/bench_title_suggest.py --rows 1000000
+"""
+import argparse
+import asyncio
+import heapq
+import os
+import random
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "scripts"))
+
+parser = argparse.ArgumentParser(description="Benchmark the typeahead prefix index")
+parser.add_argument("--rows", type=int, default=16000)
+parser.add_argument("--db", default=None)
+parser.add_argument("--queries", type=int, default=2000)
+parser.add_argument("--writes", type=int, default=300, help="anime inserted / updated / deleted before the patch")
+args = parser.parse_args()
+
+SOURCE_PATH = args.db or f"/tmp/anime_bench_{args.rows}.db"
+WORK_DIR = tempfile.mkdtemp()
+DB_PATH = os.path.join(WORK_DIR, "anime_suggest.db")
+# 必須在 import models 之前設定，engine 會在 import 時建立
+os.environ["ANIME_DB_PATH"] = DB_PATH
+os.environ["ANIME_INDEX_REBUILD_SECONDS"] = "1"
+
+from synthetic_db import _title, build_synthetic_db  # noqa: E402
+
+if not os.path.exists(SOURCE_PATH):
+    print(f"📦 Building synthetic database with {args.rows:,} rows...")
+    build_synthetic_db(SOURCE_PATH, rows=args.rows)
+shutil.copy(SOURCE_PATH, DB_PATH)
+
+from sqlalchemy import delete, func, insert, select, update  # noqa: E402
+from models import Anime, run_migrations  # noqa: E402
+from models.database import AsyncSessionLocal, SessionLocal, engine  # noqa: E402
+from services.title_suggest import SUGGEST_TOP, TitlePrefixes, normalize_title, title_suggest_index  # noqa: E402
+from main import search_anime, suggest_titles  # noqa: E402
+
+# endpoints 是 async，每次都在同一個 event loop 上執行
+run = asyncio.new_event_loop().run_until_complete
+
+
+def percentile(values, fraction):
+    return sorted(values)[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def brute_force(db, prefixes):
+    """Expected top ids of every prefix from one scan of all titles"""
+    heaps = {prefix: [] for prefix in prefixes}
+    for anime_id, title, title_english, members in db.execute(
+        select(Anime.id, Anime.title, Anime.title_english, Anime.members)
+    ):
+        keys = {normalize_title(title), normalize_title(title_english)}
+        item = ((members or 0, -anime_id), anime_id)
+        for prefix in {key[:length] for key in keys for length in range(1, len(key) + 1)} & heaps.keys():
+            heap = heaps[prefix]
+            if len(heap) < SUGGEST_TOP:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+    return {prefix: [anime_id for _, anime_id in sorted(heap, reverse=True)] for prefix, heap in heaps.items()}
+
+
+def index_state(prefixes):
+    return prefixes._keys, prefixes._key_ids, prefixes._anime, prefixes._top
+
+
+def main():
+    run_migrations()
+    rng = random.Random(0)
+    db = SessionLocal()
+
+    # endpoint 用的就是這個 index
+    index = title_suggest_index
+    started = time.perf_counter()
+    prefixes = index.refresh(db)
+    print(f"🔤 Built the prefix index: {len(prefixes._keys):,} keys for {len(prefixes._anime):,} anime, "
+          f"{len(prefixes._top):,} heavy prefixes, {time.perf_counter() - started:.2f} s, "
+          f"peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+    # 查詢：隨機 title 的前 1-8 個字元 (一個一個字打出來的樣子)
+    max_id = db.execute(select(func.max(Anime.id))).scalar()
+    prefixes = []
+    while len(prefixes) < args.queries:
+        title = db.execute(select(Anime.title).where(Anime.id == rng.randint(1, max_id))).scalar()
+        if title:
+            prefixes.append(title[:rng.randint(1, 8)])
+
+    timings = []
+    for prefix in prefixes:
+        started = time.perf_counter()
+        index.suggest(db, prefix)
+        timings.append((time.perf_counter() - started) * 1000)
+    print(f"\nsuggest() over {len(prefixes)} prefixes: median {statistics.median(timings) * 1000:.0f} µs, "
+          f"p99 {percentile(timings, 0.99) * 1000:.0f} µs, max {max(timings) * 1000:.0f} µs")
+
+    checked = sorted({normalize_title(prefix) for prefix in prefixes[:300]})
+    expected = brute_force(db, checked)
+    wrong = [prefix for prefix in checked if [anime_id for anime_id, *_ in index.suggest(db, prefix)] != expected[prefix]]
+    print(f"  {len(checked) - len(wrong)}/{len(checked)} prefixes match a brute-force scan")
+
+    timings = []
+    for prefix in prefixes:
+        started = time.perf_counter()
+        suggest_titles(prefix=prefix, limit=SUGGEST_TOP, db=db)
+        timings.append((time.perf_counter() - started) * 1000)
+    print(f"/api/search/suggest: median {statistics.median(timings):.3f} ms, p99 {percentile(timings, 0.99):.3f} ms")
+
+    async_db = AsyncSessionLocal()
+    defaults = dict(
+        genres=None, genre_mode="any", exclude_genres=None, studios=None, studio_mode="any",
+        exclude_studios=None, types=None, years=None, min_score=None, max_score=None,
+        sort_by=None, order="desc", limit=24, offset=0, cursor=None, include_total=True, fields=None
+    )
+    timings = []
+    for prefix in prefixes[:200]:
+        started = time.perf_counter()
+        run(search_anime(q=prefix, **defaults, db=async_db))
+        timings.append((time.perf_counter() - started) * 1000)
+    run(async_db.close())
+    print(f"/api/search?q= (what the SearchBar needed before): median {statistics.median(timings):.2f} ms, "
+          f"p99 {percentile(timings, 0.99):.2f} ms")
+
+    # 和 data-collection 一樣寫入：新增、更新 members / title、刪除
+    write_rng = random.Random(1)
+    with engine.begin() as conn:
+        for offset in range(1, args.writes + 1):
+            conn.execute(insert(Anime).values(
+                id=max_id + offset, mal_id=10_000_000 + offset, title=_title(write_rng),
+                members=write_rng.randint(0, 5_000_000), image_url=f"https://example.com/{offset}.jpg"
+            ))
+        for anime_id in write_rng.sample(range(1, max_id + 1), args.writes):
+            conn.execute(update(Anime).where(Anime.id == anime_id).values(members=write_rng.randint(0, 5_000_000)))
+        for anime_id in write_rng.sample(range(1, max_id + 1), args.writes // 3):
+            conn.execute(update(Anime).where(Anime.id == anime_id).values(title=_title(write_rng)))
+        conn.execute(delete(Anime).where(Anime.id.in_(write_rng.sample(range(1, max_id + 1), args.writes // 3))))
+
+    started = time.perf_counter()
+    index.refresh(db)
+    patched = time.perf_counter() - started
+
+    started = time.perf_counter()
+    fresh = TitlePrefixes().build(db)
+    rebuilt = time.perf_counter() - started
+    same = index_state(index.value) == index_state(fresh)
+    print(f"\n✏️  {args.writes} inserts + {args.writes} members updates + {args.writes // 3} renames "
+          f"+ {args.writes // 3} deletes: patched in {patched * 1000:.0f} ms (full rebuild {rebuilt * 1000:.0f} ms), "
+          f"{'identical to' if same else '❌ differs from'} a fresh build")
+
+    # 太多動漫改了 (update_anime_stats 一次更新所有 members)：request 不等重建，背景建好再換上
+    with engine.begin() as conn:
+        conn.execute(update(Anime).values(members=Anime.members + 1))
+    old = index.value
+    started = time.perf_counter()
+    suggest_titles(prefix=prefixes[0], limit=SUGGEST_TOP, db=db)
+    waited = time.perf_counter() - started
+    while index.value is old and time.perf_counter() - started < 120:
+        time.sleep(0.05)
+    swapped = time.perf_counter() - started
+    swapped_same = index_state(index.value) == index_state(TitlePrefixes().build(db))
+    print(f"✏️  members + 1 for every anime: the request took {waited * 1000:.1f} ms, the background rebuild "
+          f"was swapped in after {swapped:.1f} s, {'identical to' if swapped_same else '❌ differs from'} a fresh build")
+
+    db.close()
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+    if wrong or not same or not swapped_same:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Check endpoint results in cases that are easy to break without noticing.
+
+Builds a synthetic database and calls the endpoints through TestClient; every
+check prints ✅ / ❌ and the script fails if any of them does.
+
+Usage (from backend/, needs `pip install httpx` for TestClient):
+    python scripts/check_endpoint_results.py
+"""
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "scripts"))
+
+# 必須在 import models 之前設定，engine 會在 import 時建立
+DB_PATH = os.path.join(tempfile.mkdtemp(), "anime_check.db")
+os.environ["ANIME_DB_PATH"] = DB_PATH
+
+from synthetic_db import build_synthetic_db  # noqa: E402
+
+build_synthetic_db(DB_PATH, rows=3000)
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+from main import app  # noqa: E402
+from models.database import engine  # noqa: E402
+from services import build_franchises  # noqa: E402
+
+
+def check_anime_list_order(client):
+    """/api/anime pages are the same rows whichever fields are asked for"""
+    pages = {
+        fields: [item["id"] for item in client.get(f"/api/anime?limit=20&offset=37&fields={fields}").json()["data"]]
+        for fields in ("id", "id,title", "id,score", "id,type,year", "id,members")
+    }
+    expected = list(range(38, 58))
+    wrong = [fields for fields, ids in pages.items() if ids != expected]
+    return not wrong, f"/api/anime?offset=37 returns ids 38-57 for every fields= ({', '.join(wrong) or 'all match'})"
+
+
+def check_franchise_without_relations(client):
+    """Only anime linked by a franchise relation get a franchise; the rest fall back to Jikan"""
+    with engine.begin() as conn:
+        mal_ids = dict(conn.execute(text("SELECT id, mal_id FROM anime WHERE id IN (1, 2, 3)")).all())
+        conn.execute(text("DELETE FROM anime_relations"))
+        conn.execute(text(
+            "INSERT INTO anime_relations (anime_mal_id, related_mal_id, relation, related_title) "
+            "VALUES (:a, :b, 'Sequel', NULL), (:b, :a, 'Prequel', NULL), (:c, :a, 'Character', NULL)"
+        ), {"a": mal_ids[1], "b": mal_ids[2], "c": mal_ids[3]})
+    build_franchises(engine)
+
+    linked = client.get("/api/anime/1/franchise").json()
+    # 3 只有 Character 關係，4 完全沒有 relations
+    unlinked = [client.get(f"/api/anime/{anime_id}/franchise").json() for anime_id in (3, 4)]
+    ok = (
+        linked["franchise_id"] is not None and [item["id"] for item in linked["data"]] in ([1, 2], [2, 1])
+        and all(franchise["franchise_id"] is None and franchise["data"] == [] for franchise in unlinked)
+    )
+    return ok, "/api/anime/{id}/franchise is null for anime without franchise relations"
+
+
+def check_exclude_genres_after_write(client):
+    """A row written before the facet bitmaps are rebuilt is still filtered by genres / exclude_genres"""
+    url = "/api/search?genres=Action&exclude_genres=Comedy&sort_by=members&limit=2"
+    # 先建好 bitmaps，再寫入
+    before = client.get(url).json()["total"]
+    with engine.begin() as conn:
+        for mal_id, genre in ((9_000_001, "Action"), (9_000_002, "Comedy")):
+            anime_id = conn.execute(text(
+                "INSERT INTO anime (mal_id, title, type, score, members, year) "
+                "VALUES (:mal_id, :title, 'TV', 8.0, :members, 2024)"
+            ), {"mal_id": mal_id, "title": f"Check {genre}", "members": 90_000_000 + mal_id}).lastrowid
+            conn.execute(text(
+                "INSERT INTO anime_genres (anime_id, genre_id) SELECT :id, id FROM genres WHERE name IN ('Action', :genre)"
+            ), {"id": anime_id, "genre": genre})
+
+    page = client.get(url).json()
+    ok = page["data"][0]["title"] == "Check Action" and page["data"][1]["title"] != "Check Comedy" and page["total"] == before + 1
+    return ok, "/api/search?genres=Action&exclude_genres=Comedy includes a new Action anime and leaves out a new Comedy one"
+
+
+CHECKS = [
+    check_anime_list_order,
+    check_franchise_without_relations,
+    check_exclude_genres_after_write,
+]
+
+
+def main():
+    failed = False
+    with TestClient(app) as client:
+        for check in CHECKS:
+            ok, message = check(client)
+            failed = failed or not ok
+            print(f"{'✅' if ok else '❌'} {message}")
+
+    if failed:
+        sys.exit(1)
+    print("\n✅ All endpoint results are as expected")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Check that list endpoints run a fixed number of SQL statements per page.
+
+Builds a synthetic database, calls every list endpoint with a small and a large
+page, and fails if a page issues more statements than its budget or if the
+statement count grows with the page size (N+1 lazy loads).
+
+Usage (from backend/, needs `pip install httpx` for TestClient):
+    python scripts/check_query_counts.py
+"""
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "scripts"))
+
+# 必須在 import models 之前設定，engine 會在 import 時建立
+DB_PATH = os.path.join(tempfile.mkdtemp(), "anime_check.db")
+os.environ["ANIME_DB_PATH"] = DB_PATH
+
+from synthetic_db import build_synthetic_db  # noqa: E402
+
+build_synthetic_db(DB_PATH, rows=3000)
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from main import app  # noqa: E402
+from models.database import async_engine, read_engine  # noqa: E402
+from services import refresh_ranked_lists, response_cache  # noqa: E402
+
+# endpoint -> 最多可以執行幾個 SQL statement
+# (Discover 分類在 ranked_lists 還沒建立時多一次 ranked_list_meta 查詢)
+QUERY_BUDGETS = {
+    "/api/search": 4,
+    "/api/search?genres=Action,Comedy": 4,
+    "/api/search?q=ka": 4,
+    "/api/search?genres=Action&include_total=false": 4,
+    "/api/recommendations/popular": 5,
+    "/api/recommendations/top-rated": 5,
+    "/api/recommendations/hidden-gems": 5,
+    "/api/recommendations/latest": 5,
+    "/api/recommendations/trending": 5,
+    "/api/recommendations/genre/Action": 5,
+    "/api/recommendations/studio/{studio}": 5,
+}
+
+
+ENGINES = [read_engine, async_engine.sync_engine]
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+
+def count_queries(client, url):
+    # response cache 命中時根本不會查 SQLite，這裡要量的是 endpoint 本身
+    response_cache.clear()
+    counter = QueryCounter()
+    # sync endpoints 用 read_engine，async endpoints 用 async_engine
+    for target in ENGINES:
+        event.listen(target, "before_cursor_execute", counter)
+    try:
+        response = client.get(url)
+    finally:
+        for target in ENGINES:
+            event.remove(target, "before_cursor_execute", counter)
+    assert response.status_code == 200, f"{url}: HTTP {response.status_code}"
+    return counter.count, response.json()
+
+
+def main():
+    with TestClient(app) as client:
+        run_checks(client)
+
+        # Discover 分類改讀預先計算的 ranked_lists 之後再檢查一次
+        print("\n--- after refresh_ranked_lists() ---\n")
+        refresh_ranked_lists()
+        run_checks(client)
+
+
+def run_checks(client):
+    studio = client.get("/api/recommendations/studios/list?limit=1").json()["data"][0]["name"]
+
+    failed = False
+    for endpoint, budget in QUERY_BUDGETS.items():
+        endpoint = endpoint.format(studio=studio)
+        separator = "&" if "?" in endpoint else "?"
+
+        # 先暖身一次，totals 之類的快取命中後才是一般情況
+        client.get(f"{endpoint}{separator}limit=5")
+        small, _ = count_queries(client, f"{endpoint}{separator}limit=5")
+        large, body = count_queries(client, f"{endpoint}{separator}limit=100")
+
+        ok = small == large and large <= budget
+        failed = failed or not ok
+        status = "✅" if ok else "❌"
+        print(f"{status} {endpoint:45s} limit=5: {small} queries | "
+              f"limit=100: {large} queries ({len(body['data'])} rows, budget {budget})")
+
+    if failed:
+        sys.exit(1)
+    print("\n✅ All list endpoints run a fixed number of queries per page")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Check that every search / recommendation query is served by an index.
+
+Builds a synthetic database, applies migrations, records the SQL each endpoint
+runs and feeds it to `EXPLAIN QUERY PLAN`. Fails if any plan contains a full
+table SCAN (a `SCAN <table>` step without `USING ... INDEX`).
+
+Usage (from backend/, needs `pip install httpx` for TestClient):
+    python scripts/check_query_plans.py
+"""
+import os
+import re
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "scripts"))
+
+# 必須在 import models 之前設定，engine 會在 import 時建立
+DB_PATH = os.path.join(tempfile.mkdtemp(), "anime_check.db")
+os.environ["ANIME_DB_PATH"] = DB_PATH
+os.environ["ANIME_SEMANTIC_INDEX_DIR"] = os.path.join(os.path.dirname(DB_PATH), "semantic_index")
+
+from synthetic_db import build_synthetic_db  # noqa: E402
+
+build_synthetic_db(DB_PATH, rows=5000)
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from main import app  # noqa: E402
+from models.database import async_engine, engine, read_engine  # noqa: E402
+from services import build_semantic_index, facet_index, fuzzy_title_index, refresh_ranked_lists, response_cache  # noqa: E402
+
+ENDPOINTS = [
+    "/api/search",
+    "/api/search?sort_by=members",
+    "/api/search?sort_by=year&order=asc",
+    "/api/search?sort_by=title&order=asc",
+    "/api/search?genres=Action,Comedy",
+    "/api/search?types=TV,Movie",
+    "/api/search?years=2020,2021",
+    "/api/search?min_score=7&max_score=8",
+    "/api/search?q=ka",
+    "/api/search?q=ka&genres=Action&sort_by=score",
+    "/api/search?q=gime+zute+rujto&fuzzy=true",
+    "/api/search?q=gime+zute+rujto&fuzzy=true&types=TV&sort_by=score",
+    "/api/recommendations/popular",
+    "/api/recommendations/top-rated",
+    "/api/recommendations/hidden-gems",
+    "/api/recommendations/latest",
+    "/api/recommendations/trending",
+    "/api/recommendations/genre/Action",
+    "/api/recommendations/studio/{studio}",
+    "/api/recommendations/genres/list",
+    "/api/recommendations/studios/list",
+    "/api/genres",
+    "/api/anime/1/franchise",
+    "/api/anime/1/similar",
+    "/api/anime/1/similar?by=story",
+    "/api/search/suggest?prefix=ma",
+    "/api/search/semantic?text=magic+school+friend",
+]
+
+# 只檢查實體 table (含 alias 如 anime_genres_1)；SCAN 子查詢的暫存結果 (anon_1) 不算
+TABLES = {
+    "anime", "genres", "studios", "anime_genres", "anime_studios",
+    "ranked_lists", "ranked_list_meta", "franchise_members", "similar_anime",
+    "synopsis_similar",
+}
+# 第二頁改用 cursor (keyset) 再檢查一次
+CURSOR_ENDPOINTS = [
+    "/api/search",
+    "/api/search?q=zute&fuzzy=true",
+    "/api/search?sort_by=title&order=asc",
+    "/api/recommendations/popular",
+    "/api/recommendations/top-rated",
+    "/api/recommendations/hidden-gems",
+    "/api/recommendations/latest",
+    "/api/recommendations/trending",
+    "/api/recommendations/genre/Action",
+]
+
+ENGINES = [read_engine, async_engine.sync_engine]
+
+FULL_SCAN = re.compile(r"^SCAN (\w+?)(?:_\d+)?$")
+
+
+def is_full_scan(step):
+    match = FULL_SCAN.match(step.strip())
+    return bool(match) and match.group(1) in TABLES
+
+
+def capture_statements(client, url):
+    # response cache 命中時根本不會查 SQLite，這裡要量的是 endpoint 本身
+    response_cache.clear()
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    # sync endpoints 用 read_engine，async endpoints 用 async_engine
+    for target in ENGINES:
+        event.listen(target, "before_cursor_execute", record)
+    try:
+        response = client.get(url)
+    finally:
+        for target in ENGINES:
+            event.remove(target, "before_cursor_execute", record)
+    assert response.status_code == 200, f"{url}: HTTP {response.status_code}"
+    return statements
+
+
+def explain(statement, parameters):
+    raw = engine.raw_connection()
+    try:
+        rows = raw.cursor().execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    finally:
+        raw.close()
+    return [row[3] for row in rows]
+
+
+def main():
+    build_semantic_index(engine, workers=1)
+    with TestClient(app) as client:
+        # 記憶體 index 的建立 (整個 table 讀一次，之後在背景重建) 不是 endpoint 的查詢，先建好
+        facet_index.build_now()
+        fuzzy_title_index.build_now()
+        run_checks(client)
+
+        # Discover 分類改讀預先計算的 ranked_lists 之後再檢查一次
+        print("\n--- after refresh_ranked_lists() ---\n")
+        refresh_ranked_lists()
+        run_checks(client)
+
+
+def run_checks(client):
+    studio = client.get("/api/recommendations/studios/list?limit=1").json()["data"][0]["name"]
+
+    endpoints = [endpoint.format(studio=studio) for endpoint in ENDPOINTS]
+    for endpoint in CURSOR_ENDPOINTS:
+        separator = "&" if "?" in endpoint else "?"
+        next_cursor = client.get(f"{endpoint}{separator}limit=1").json()["next_cursor"]
+        endpoints.append(f"{endpoint}{separator}cursor={next_cursor}")
+
+    failed = False
+    for endpoint in endpoints:
+        print(f"\n{endpoint}")
+
+        for statement, parameters in capture_statements(client, endpoint):
+            plan = explain(statement, parameters)
+            scans = [step for step in plan if is_full_scan(step)]
+            failed = failed or bool(scans)
+
+            status = "❌" if scans else "✅"
+            print(f"  {status} {' '.join(statement.split())[:90]}")
+            for step in plan:
+                print(f"       {step}")
+
+    if failed:
+        print("\n❌ Some queries fall back to a full table scan")
+        sys.exit(1)
+    print("\n✅ No endpoint query falls back to a full table scan")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Build a synthetic anime.db for checks and benchmarks.
+
+Usage (from backend/):
+    python scripts/synthetic_db.py /tmp/anime_bench.db --rows 100000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from sqlalchemy import create_engine  # noqa: E402
+from models.database import Base  # noqa: E402
+
+GENRES = [
+    "Action", "Adventure", "Avant Garde", "Award Winning", "Boys Love", "Comedy",
+    "Drama", "Fantasy", "Girls Love", "Gourmet", "Horror", "Mystery", "Romance",
+    "Sci-Fi", "Slice of Life", "Sports", "Supernatural", "Suspense", "Ecchi",
+]
+TYPES = ["TV", "Movie", "OVA", "ONA", "Special", "TV Special"]
+SEASONS = ["winter", "spring", "summer", "fall"]
+DEMOGRAPHICS = ["Shounen", "Seinen", "Shoujo", "Josei", "Kids", None]
+SYLLABLES = [
+    "ka", "ki", "ku", "ke", "ko", "sa", "shi", "su", "se", "so", "ta", "chi", "tsu",
+    "te", "to", "na", "ni", "nu", "ne", "no", "ha", "hi", "fu", "he", "ho", "ma", "mi",
+    "mu", "me", "mo", "ya", "yu", "yo", "ra", "ri", "ru", "re", "ro", "wa", "n", "ga",
+    "gi", "gu", "ge", "go", "za", "ji", "zu", "ze", "zo", "da", "de", "do", "ba", "bi",
+]
+WORDS = [
+    "boy", "girl", "school", "world", "magic", "sword", "demon", "king", "queen", "war",
+    "love", "friend", "dream", "city", "island", "space", "robot", "pilot", "ghost",
+    "detective", "murder", "secret", "family", "team", "match", "tournament", "idol",
+    "music", "band", "village", "forest", "dragon", "hero", "villain", "journey",
+    "summer", "winter", "memory", "time", "travel", "future", "past", "academy",
+    "club", "cooking", "restaurant", "samurai", "ninja", "empire", "rebellion",
+    "reincarnated", "another", "guild", "adventurer", "slime", "vampire", "curse",
+    "spirit", "shrine", "festival", "baseball", "volleyball", "soccer", "rival",
+]
+
+
+def _title(rng):
+    words = []
+    for _ in range(rng.randint(1, 4)):
+        words.append("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize())
+    if rng.random() < 0.2:
+        words.append(rng.choice(["2nd Season", "Movie", "Final Season", "Part 2", "OVA"]))
+    return " ".join(words)
+
+
+def _vocabulary(size=4000, seed=7):
+    """Themed words followed by pseudo-words, in rough Zipf frequency order"""
+    rng = random.Random(seed)
+    words = list(WORDS)
+    seen = set(words)
+    while len(words) < size:
+        word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+VOCABULARY = _vocabulary()
+# Zipf 分佈：第 k 個字出現的機率約為 1/k
+VOCABULARY_WEIGHTS = []
+_total = 0.0
+for _rank in range(1, len(VOCABULARY) + 1):
+    _total += 1.0 / _rank
+    VOCABULARY_WEIGHTS.append(_total)
+
+
+def _synopsis(rng):
+    if rng.random() < 0.05:
+        return None
+    words = rng.choices(VOCABULARY, cum_weights=VOCABULARY_WEIGHTS, k=rng.randint(30, 90))
+    return " ".join(words).capitalize() + "."
+
+
+def build_synthetic_db(path, rows=16000, studios=600, seed=42):
+    """Create a fresh database at `path` with `rows` randomly generated anime"""
+    if os.path.exists(path):
+        os.remove(path)
+
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+
+    conn.executemany(
+        "INSERT INTO genres (id, mal_id, name) VALUES (?, ?, ?)",
+        [(i, i, name) for i, name in enumerate(GENRES, 1)],
+    )
+    conn.executemany(
+        "INSERT INTO studios (id, mal_id, name) VALUES (?, ?, ?)",
+        [(i, 1000 + i, f"Studio {_title(rng)}") for i in range(1, studios + 1)],
+    )
+
+    current_year = datetime.now().year
+    batch, genre_links, studio_links = [], [], []
+
+    def flush():
+        conn.executemany(
+            "INSERT INTO anime (id, mal_id, title, title_english, type, episodes, score, rank, "
+            "popularity, members, favorites, year, season, image_url, synopsis, aired_from, "
+            "aired_to, demographic) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            batch,
+        )
+        conn.executemany("INSERT INTO anime_genres (anime_id, genre_id) VALUES (?, ?)", genre_links)
+        conn.executemany("INSERT INTO anime_studios (anime_id, studio_id) VALUES (?, ?)", studio_links)
+        batch.clear()
+        genre_links.clear()
+        studio_links.clear()
+
+    for anime_id in range(1, rows + 1):
+        year = rng.randint(2005, current_year + 1)
+        aired_from = datetime(year, rng.randint(1, 12), rng.randint(1, 28))
+        members = int(rng.paretovariate(1.1) * 800)
+        score = round(min(9.3, max(2.0, rng.gauss(6.6, 0.9))), 2) if rng.random() > 0.08 else None
+        title = _title(rng)
+        batch.append((
+            anime_id,
+            anime_id * 3,
+            title,
+            title if rng.random() < 0.6 else _title(rng),
+            rng.choice(TYPES),
+            rng.randint(1, 26),
+            score,
+            None,
+            None,
+            members,
+            int(members * rng.random() * 0.03),
+            year,
+            rng.choice(SEASONS),
+            f"https://cdn.myanimelist.net/images/anime/{anime_id}.jpg",
+            _synopsis(rng),
+            aired_from.strftime("%Y-%m-%d %H:%M:%S.%f"),
+            (aired_from + timedelta(days=rng.randint(0, 180))).strftime("%Y-%m-%d %H:%M:%S.%f"),
+            rng.choice(DEMOGRAPHICS),
+        ))
+        for genre_id in rng.sample(range(1, len(GENRES) + 1), rng.randint(0, 4)):
+            genre_links.append((anime_id, genre_id))
+        for studio_id in rng.sample(range(1, studios + 1), rng.randint(0, 2)):
+            studio_links.append((anime_id, studio_id))
+
+        if len(batch) >= 10000:
+            flush()
+
+    flush()
+    conn.commit()
+    conn.close()
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a synthetic anime database")
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=16000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    build_synthetic_db(args.path, rows=args.rows, seed=args.seed)
+    print(f"✅ Synthetic database created: {args.path} ({args.rows:,} anime)")
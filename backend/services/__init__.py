@@ -0,0 +1,161 @@
+from .serializers import (
+    SEARCH_FIELDS,            # /api/search 的欄位
+    RECOMMENDATION_FIELDS,    # /api/recommendations/* 的欄位
+    DETAIL_FIELDS,            # 單部動漫的完整欄位
+    RELATION_FIELDS,          # /api/anime/mal 的欄位
+    ANIME_LIST_FIELDS,        # /api/anime 的欄位
+    RELATIONS,                # 批次讀取的關聯 (genres / studios)
+    FieldSelection,
+    select_fields,            # fields= 參數 → 要讀的欄位 / 關聯
+    anime_columns,            # 只讀需要的 anime 欄位 (row，不建立 ORM 物件)
+    load_genres_and_studios,  # 批次讀取 genres / studios
+    serialize_anime_list      # 列表頁面的共用 serializer
+)
+from .text_search import (
+    build_match_expression,   # 使用者輸入 → FTS5 MATCH 語法
+    text_search_subquery      # FTS5 + bm25 排名
+)
+from .pagination import (
+    SortKey,                  # 排序鍵 (column, descending, nullable)
+    paginate,                 # offset / cursor (keyset) 分頁
+    encode_cursor,
+    decode_cursor
+)
+from .data_version import (
+    get_data_version,         # 資料版本 (data-collection 寫入後會變)
+    VersionedBuild,           # 記憶體 index，資料變了在背景重建
+    build_off_loop            # 第一次建立 index 放到 threadpool
+)
+from .totals import (
+    filter_key,               # 正規化的篩選條件 key
+    cached_total,             # 依篩選條件快取的總筆數
+    totals_cache
+)
+from .response_cache import (
+    ResponseCache,            # response 快取 (可替換 backend)
+    MemoryCacheBackend,       # 記憶體 LRU backend
+    ResponseCacheMiddleware,  # ETag / 304 / Cache-Control
+    response_cache
+)
+from .compression import (
+    CompressionMiddleware,    # 依 Accept-Encoding 壓縮 (gzip / brotli)
+    choose_encoding           # 選 client 要的 encoding
+)
+from .ranked_lists import (
+    refresh_ranked_lists,     # 重建 Discover 排行 (data-collection 之後執行)
+    discover_page,            # Discover 分類的一頁 (預先計算 / 即時查詢)
+    discover_years,           # latest / trending 的年份
+    FAVORITES_RATIO           # hidden-gems 的 favorites / members
+)
+from .franchises import (
+    build_franchises,         # relations → franchise (union-find)，fetch_and_save 之後執行
+    load_franchise            # 同一個 franchise 的作品 (依播出順序)
+)
+from .similar import (
+    build_similar_anime,      # genre / studio / ... 向量 → similar_anime，fetch_and_save 之後執行
+    load_similar,             # 一部動漫的相似作品 (依相似度)
+    SIMILAR_K
+)
+from .story_similar import (
+    build_synopsis_similar,   # synopsis 的 TF-IDF → synopsis_similar，fetch_and_save 之後執行
+    synopsis_similar          # 「劇情相似」的預先計算結果 (和 similar_anime 同樣的欄位)
+)
+from .semantic_index import (
+    SemanticIndex,            # /api/search/semantic 的 IVF index (memory-mapped，CURRENT 變了才重新載入)
+    build_semantic_index,     # synopsis 向量 → IVF index，fetch_and_save 之後執行
+    add_to_semantic_index,    # fetch_and_save.save_anime 新增的動漫 (append 到 delta)
+    DEFAULT_NPROBE,           # 預設掃描幾個 IVF lists
+    semantic_index
+)
+from .facets import (
+    FacetIndex,               # /api/search/facets 的 bitmaps (資料版本變了才重建)
+    SCORE_BUCKETS,            # score 區間
+    TagFilter,                # genres / studios 的 any / all / exclude 條件
+    tag_sql_condition,        # 同樣的條件在 SQL 裡算 (bitmaps 還沒重建時)
+    facet_index
+)
+from .columnar import (
+    ColumnarSearch,           # /api/search 的 NumPy 引擎 (ANIME_SEARCH_ENGINE=columnar)
+    columnar_search,
+    fetch_page                # 依 ids 讀一頁的顯示欄位
+)
+from .title_suggest import (
+    TitleSuggestIndex,        # /api/search/suggest 的 prefix index (資料版本變了只 patch 改到的動漫)
+    SUGGEST_TOP,              # 最多幾個建議
+    normalize_title,          # title → prefix 比對用的 key
+    title_suggest_index
+)
+from .fuzzy_titles import (
+    FuzzyTitleIndex,          # /api/search?fuzzy=true 的 trigram index (資料版本變了才重建)
+    fuzzy_search_subquery,    # fuzzy 結果 → (anime_id, rank)，和 text_search_subquery 一樣用
+    fuzzy_title_index
+)
+from .random_pool import (
+    RandomPickPool,           # /api/anime/random 的 id pool
+    random_pick_pool
+)
+
+__all__ = [
+    "SEARCH_FIELDS",
+    "RECOMMENDATION_FIELDS",
+    "DETAIL_FIELDS",
+    "RELATION_FIELDS",
+    "ANIME_LIST_FIELDS",
+    "RELATIONS",
+    "FieldSelection",
+    "select_fields",
+    "anime_columns",
+    "load_genres_and_studios",
+    "serialize_anime_list",
+    "build_match_expression",
+    "text_search_subquery",
+    "SortKey",
+    "paginate",
+    "encode_cursor",
+    "decode_cursor",
+    "get_data_version",
+    "VersionedBuild",
+    "build_off_loop",
+    "filter_key",
+    "cached_total",
+    "totals_cache",
+    "ResponseCache",
+    "MemoryCacheBackend",
+    "ResponseCacheMiddleware",
+    "response_cache",
+    "CompressionMiddleware",
+    "choose_encoding",
+    "refresh_ranked_lists",
+    "discover_page",
+    "discover_years",
+    "FAVORITES_RATIO",
+    "build_franchises",
+    "load_franchise",
+    "build_similar_anime",
+    "load_similar",
+    "SIMILAR_K",
+    "build_synopsis_similar",
+    "synopsis_similar",
+    "SemanticIndex",
+    "build_semantic_index",
+    "add_to_semantic_index",
+    "DEFAULT_NPROBE",
+    "semantic_index",
+    "FacetIndex",
+    "SCORE_BUCKETS",
+    "TagFilter",
+    "tag_sql_condition",
+    "facet_index",
+    "ColumnarSearch",
+    "columnar_search",
+    "fetch_page",
+    "TitleSuggestIndex",
+    "SUGGEST_TOP",
+    "normalize_title",
+    "title_suggest_index",
+    "FuzzyTitleIndex",
+    "fuzzy_search_subquery",
+    "fuzzy_title_index",
+    "RandomPickPool",
+    "random_pick_pool"
+]
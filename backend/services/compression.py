@@ -0,0 +1,148 @@
+"""
+Negotiated gzip / brotli response compression.
+
+Search and recommendation pages carry full synopses (often 100-300 KB of JSON
+per page), which gzip shrinks 3-4x. The encoding is picked from Accept-Encoding
+(brotli first when the optional `brotli` package is installed, else gzip);
+bodies under COMPRESS_MIN_SIZE bytes or of non-text types are sent as they are.
+
+CompressionMiddleware compresses every other response once per request. The
+response cache (services/response_cache.py) keeps each compressed variant next
+to the cached body, so hot pages are compressed once per TTL, not per request;
+the middleware leaves responses that already have a Content-Encoding alone.
+"""
+import gzip
+import os
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # brotli 是選用的，沒有安裝時只提供 gzip
+    brotli = None
+
+# 小於這個大小的 body 不壓縮 (省下的 bytes 不值得花的 CPU)
+COMPRESS_MIN_SIZE = int(os.environ.get("ANIME_COMPRESS_MIN_SIZE", 1024))
+# gzip 1-9；9 只比 6 小不到 1%，卻慢一半
+GZIP_LEVEL = int(os.environ.get("ANIME_GZIP_LEVEL", 6))
+# brotli 0-11；超過 6 之後每一級都慢很多
+BROTLI_QUALITY = int(os.environ.get("ANIME_BROTLI_QUALITY", 5))
+
+# 依偏好排序：q 值一樣時選前面的
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript")
+
+
+def parse_accept_encoding(header):
+    """{coding: q} from an Accept-Encoding header (a coding without q= has q=1)"""
+    weights = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding] = q
+    return weights
+
+
+def choose_encoding(accept_encoding):
+    """The supported coding the client prefers, or None for identity"""
+    weights = parse_accept_encoding(accept_encoding)
+    best, best_q = None, 0.0
+    for coding in ENCODINGS:
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def is_compressible(content_type, size):
+    return size >= COMPRESS_MIN_SIZE and (content_type or "").startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    # mtime=0：同一個 body 每次壓出來的 bytes 都一樣
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def add_vary(headers):
+    """Add Accept-Encoding to the Vary header (MutableHeaders), keeping what is there"""
+    vary = headers.get("vary")
+    if not vary:
+        headers["vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        headers["vary"] = f"{vary}, Accept-Encoding"
+
+
+def encoded_etag(etag, encoding):
+    """Each content coding is a different representation, so it needs its own strong ETag"""
+    if etag.endswith('"'):
+        return f'{etag[:-1]}-{encoding}"'
+    return etag
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware that compresses response bodies with the coding chosen from
+    Accept-Encoding. Responses that are already encoded (e.g. served by the
+    response cache) or streamed in several chunks pass through unchanged.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        start = None
+        passthrough = False
+
+        async def compressing_send(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                # 等看到 body 才決定要不要壓縮
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start["headers"])
+            if (
+                message.get("more_body", False)
+                or "content-encoding" in headers
+                or not is_compressible(headers.get("content-type"), len(body))
+            ):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            # 夠大的 JSON：不論這次有沒有壓縮，內容都會依 Accept-Encoding 不同
+            add_vary(headers)
+            if encoding is not None:
+                body = compress(body, encoding)
+                headers["content-encoding"] = encoding
+                headers["content-length"] = str(len(body))
+                if "etag" in headers:
+                    headers["etag"] = encoded_etag(headers["etag"], encoding)
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, compressing_send)
+
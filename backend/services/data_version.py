@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from models.database import SessionLocal
+
+# 資料變了之後最快隔多久重建一次：update_anime_stats 每部動漫 commit 一次，一連串寫入只重建一次
+REBUILD_INTERVAL = float(os.environ.get("ANIME_INDEX_REBUILD_SECONDS", 5))
+
+
+def get_data_version(db):
+    """
+    Current data version of anime.db.
+
+    The counter lives in the data_version table (models/migrations.py) and is
+    bumped by triggers on every insert / update / delete of anime, genres,
+    studios and their association tables, so caches can compare it to know
+    when the data-collection scripts have written.
+    """
+    return db.execute(text("SELECT version FROM data_version WHERE id = 1")).scalar()
+
+
+class VersionedBuild:
+    """
+    An in-memory index built from the whole table (bitmaps, arrays, postings)
+    and swapped as a whole when the data version changes.
+
+    Only the first build runs in the caller (see build_off_loop). After that a
+    request that sees a newer data version keeps getting the current build and
+    starts a rebuild on a background thread with its own session, at most once
+    every REBUILD_INTERVAL seconds; requests never wait for a rebuild.
+    """
+
+    def __init__(self, interval=None):
+        self.interval = REBUILD_INTERVAL if interval is None else interval
+        self.value = None
+        self.version = None     # 目前這份 build 的 data version
+        self._built_at = float("-inf")
+        self._rebuilding = False
+        self._lock = threading.Lock()
+        # 同一時間只建一份
+        self._build_lock = threading.Lock()
+
+    def build(self, db):
+        raise NotImplementedError
+
+    @property
+    def ready(self):
+        return self.value is not None
+
+    def get(self, db):
+        """The current build; starts a background rebuild when the data has changed since"""
+        value = self.value
+        if value is None:
+            return self.build_now()
+        if get_data_version(db) != self.version:
+            self._schedule()
+        return value
+
+    def current(self, db):
+        """The build if it has the current data, else None (and starts a background rebuild)"""
+        value = self.value
+        if value is None:
+            return None
+        if get_data_version(db) != self.version:
+            self._schedule()
+            return None
+        return value
+
+    def build_now(self):
+        """Build in this thread unless there already is a build (first use, warm-up)"""
+        with self._build_lock:
+            if self.value is None:
+                self._rebuild()
+            return self.value
+
+    def _rebuild(self):
+        db = SessionLocal()
+        try:
+            # 建之前讀 version：建的時候又有寫入的話，下一個 request 會再排一次重建
+            version = get_data_version(db)
+            value = self.build(db)
+        finally:
+            db.close()
+        with self._lock:
+            self.value, self.version = value, version
+            self._built_at = time.monotonic()
+
+    def _schedule(self):
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild_later, daemon=True).start()
+
+    def _rebuild_later(self):
+        try:
+            time.sleep(max(0.0, self._built_at + self.interval - time.monotonic()))
+            with self._build_lock:
+                self._rebuild()
+        finally:
+            with self._lock:
+                self._rebuilding = False
+
+    def clear(self):
+        with self._build_lock, self._lock:
+            self.value = None
+            self.version = None
+            self._built_at = float("-inf")
+
+
+async def build_off_loop(*indexes):
+    """
+    First build of the given VersionedBuilds in the threadpool: a build takes
+    hundreds of ms, and inside run_sync it would hold up the event loop
+    """
+    for index in indexes:
+        if not index.ready:
+            await run_in_threadpool(index.build_now)
@@ -0,0 +1,344 @@
+"""
+Facet counts for /api/search/facets from per-value bitmaps.
+
+Every anime gets a dense position (0..n-1 in id order). For each genre, type,
+year and score bucket the index keeps a bitmap: a Python int whose bit p is set
+when the anime at position p has that value. The count for one option is then
+`(matches & bitmap).bit_count()`, so all options of all facets come out of one
+pass over the bitmaps instead of a COUNT query per option.
+
+The same per-genre / per-studio bitmaps answer /api/search's genre_mode=all
+and exclude_genres= (AND / OR / NOT are just &, | and & ~ on the bitmaps),
+which in SQL would need one self-join or a GROUP BY ... HAVING per genre.
+
+The bitmaps are rebuilt in the background when the data version changes
+(services/data_version.VersionedBuild). Until then /api/search filters genres
+and studios in SQL (tag_sql_condition), so rows written since the last build
+are not let through exclude_genres; the facet counts keep the previous build.
+"""
+import json
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, defaultdict, namedtuple
+
+from sqlalchemy import and_, func, select
+
+from models import Anime, Genre, Studio, anime_genres, anime_studios
+
+from .data_version import VersionedBuild
+from .fuzzy_titles import fuzzy_title_index
+from .text_search import build_match_expression, text_search_subquery
+
+# score 區間：min <= score < max (None = 沒有上 / 下限)
+ScoreBucket = namedtuple("ScoreBucket", ["label", "min", "max"])
+
+SCORE_BUCKETS = [
+    ScoreBucket("9+", 9.0, None),
+    ScoreBucket("8-9", 8.0, 9.0),
+    ScoreBucket("7-8", 7.0, 8.0),
+    ScoreBucket("6-7", 6.0, 7.0),
+    ScoreBucket("5-6", 5.0, 6.0),
+    ScoreBucket("<5", None, 5.0),
+]
+
+# 和 /api/genres 一樣不列出來 (但仍然可以當篩選條件)
+HIDDEN_GENRES = {"Hentai"}
+
+# genres / studios 的篩選條件：include 用 mode 合併 (any = OR, all = AND)，再去掉 exclude
+TagFilter = namedtuple("TagFilter", ["include", "mode", "exclude"], defaults=[(), "any", ()])
+
+# 每個 byte 值裡被設定的 bit 位置 (bitmap → positions 用)
+BYTE_BITS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+
+
+def ids_subquery(anime_ids):
+    """SELECT over a JSON array of ids (one bound parameter however many ids there are)"""
+    values = func.json_each(json.dumps(anime_ids)).table_valued("value")
+    return select(values.c.value)
+
+
+def tag_sql_condition(genres=TagFilter(), studios=TagFilter()):
+    """The same condition as FacetBitmaps.id_condition in SQL (for when the bitmaps are out of date)"""
+    conditions = []
+    for association, tag_id, tag, tag_filter in (
+        (anime_genres, anime_genres.c.genre_id, Genre, genres),
+        (anime_studios, anime_studios.c.studio_id, Studio, studios),
+    ):
+        def tagged(names):
+            return select(association.c.anime_id).join(tag, tag.id == tag_id).where(tag.name.in_(names))
+
+        if tag_filter.include and tag_filter.mode == "all":
+            # AND：每個 tag 一個 IN 子查詢
+            conditions.extend(Anime.id.in_(tagged([name])) for name in tag_filter.include)
+        elif tag_filter.include:
+            conditions.append(Anime.id.in_(tagged(tag_filter.include)))
+        if tag_filter.exclude:
+            conditions.append(Anime.id.notin_(tagged(tag_filter.exclude)))
+    return and_(*conditions) if conditions else None
+
+
+def bitmap(positions, size):
+    """Bitmap (int) with the given positions set"""
+    bits = bytearray((size + 7) // 8)
+    for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(bits, "little")
+
+
+class FacetBitmaps:
+    """One immutable build of the bitmaps (swapped as a whole when the data changes)"""
+
+    def __init__(self, ids, types, years, genres, studios, scores, score_positions, max_ranges=256):
+        self.ids = ids
+        self.size = len(ids)
+        self.positions = {anime_id: position for position, anime_id in enumerate(ids)}
+        self.all = (1 << self.size) - 1
+        self.types = types
+        self.years = years
+        self.genres = genres
+        self.studios = studios
+        # score 由小到大排序，區間查詢用 bisect 找出範圍
+        self.scores = scores
+        self.score_positions = score_positions
+        # 最近用過的 min_score / max_score 區間
+        self._ranges = OrderedDict()
+        self._ranges_lock = threading.Lock()
+        self._max_ranges = max_ranges
+        self.score_buckets = {
+            bucket.label: self.score_range(bucket.min, bucket.max, inclusive_max=False)
+            for bucket in SCORE_BUCKETS
+        }
+
+    def score_range(self, min_score=None, max_score=None, inclusive_max=True):
+        """Anime with min_score <= score <= max_score (< when not inclusive_max); unscored never match"""
+        key = (min_score, max_score, inclusive_max)
+        with self._ranges_lock:
+            if key in self._ranges:
+                self._ranges.move_to_end(key)
+                return self._ranges[key]
+
+        start = 0 if min_score is None else bisect_left(self.scores, min_score)
+        if max_score is None:
+            end = len(self.scores)
+        elif inclusive_max:
+            end = bisect_right(self.scores, max_score)
+        else:
+            end = bisect_left(self.scores, max_score)
+        result = bitmap(self.score_positions[start:end], self.size)
+
+        with self._ranges_lock:
+            self._ranges[key] = result
+            if len(self._ranges) > self._max_ranges:
+                self._ranges.popitem(last=False)
+        return result
+
+    def id_bitmap(self, anime_ids):
+        """Bitmap of the given anime ids (ids not in the index are ignored)"""
+        positions = self.positions
+        return bitmap((positions[anime_id] for anime_id in anime_ids if anime_id in positions), self.size)
+
+    def anime_ids(self, bits):
+        """Anime ids of the positions set in `bits`, in id order"""
+        ids = self.ids
+        data = bits.to_bytes((self.size + 7) // 8, "little")
+        return [
+            ids[(index << 3) + bit]
+            for index, byte in enumerate(data) if byte
+            for bit in BYTE_BITS[byte]
+        ]
+
+    @staticmethod
+    def any_of(bitmaps, values):
+        """Union of the bitmaps of `values` (unknown values match nothing)"""
+        result = 0
+        for value in values:
+            result |= bitmaps.get(value, 0)
+        return result
+
+    def all_of(self, bitmaps, values):
+        """Intersection of the bitmaps of `values` (an unknown value matches nothing)"""
+        result = self.all
+        for value in values:
+            result &= bitmaps.get(value, 0)
+        return result
+
+    def id_condition(self, genres=TagFilter(), studios=TagFilter()):
+        """WHERE condition on Anime.id for the genre / studio TagFilters (None without conditions)"""
+        bits = None
+        for tag_bitmaps, tag_filter in ((self.genres, genres), (self.studios, studios)):
+            tag_bits = self.tags(tag_bitmaps, tag_filter)
+            if tag_bits is not None:
+                bits = tag_bits if bits is None else bits & tag_bits
+        if bits is None:
+            return None
+
+        # 符合的比不符合的多時 (例如只有 exclude) 改用 NOT IN：id 清單比較短，
+        # SQLite 照排序的 index 掃描，很快就湊滿一頁
+        if bits.bit_count() * 2 > self.size:
+            return Anime.id.notin_(ids_subquery(self.anime_ids(self.all & ~bits)))
+        return Anime.id.in_(ids_subquery(self.anime_ids(bits)))
+
+    def tags(self, bitmaps, tag_filter):
+        """Bitmap of a TagFilter on `bitmaps` (genres or studios), or None without conditions"""
+        include, mode, exclude = tag_filter
+        if not include and not exclude:
+            return None
+        if not include:
+            result = self.all
+        elif mode == "all":
+            result = self.all_of(bitmaps, include)
+        else:
+            result = self.any_of(bitmaps, include)
+        return result & ~self.any_of(bitmaps, exclude)
+
+
+def build_facet_bitmaps(db):
+    """Read the facet columns once and build every bitmap"""
+    ids = array("q")
+    types = defaultdict(list)
+    years = defaultdict(list)
+    scored = []
+
+    rows = db.execute(select(Anime.id, Anime.type, Anime.year, Anime.score).order_by(Anime.id))
+    for position, (anime_id, anime_type, year, score) in enumerate(rows):
+        ids.append(anime_id)
+        if anime_type is not None:
+            types[anime_type].append(position)
+        if year is not None:
+            years[year].append(position)
+        if score is not None:
+            scored.append((score, position))
+
+    positions = {anime_id: position for position, anime_id in enumerate(ids)}
+
+    def members(association, tag_id, tag):
+        result = defaultdict(list)
+        for anime_id, name in db.execute(
+            select(association.c.anime_id, tag.name).join(tag, tag.id == tag_id)
+        ):
+            if anime_id in positions:
+                result[name].append(positions[anime_id])
+        return result
+
+    genres = members(anime_genres, anime_genres.c.genre_id, Genre)
+    studios = members(anime_studios, anime_studios.c.studio_id, Studio)
+
+    scored.sort()
+    size = len(ids)
+    return FacetBitmaps(
+        ids,
+        {value: bitmap(members, size) for value, members in types.items()},
+        {value: bitmap(members, size) for value, members in years.items()},
+        {value: bitmap(members, size) for value, members in genres.items()},
+        {value: bitmap(members, size) for value, members in studios.items()},
+        array("d", (score for score, _ in scored)),
+        array("q", (position for _, position in scored)),
+    )
+
+
+class FacetIndex(VersionedBuild):
+    """Bitmaps for /api/search/facets, rebuilt in the background when the data version changes"""
+
+    def build(self, db):
+        return build_facet_bitmaps(db)
+
+    def get_bitmaps(self, db):
+        return self.get(db)
+
+    def _filter_bitmaps(self, db, q, genres, types, years, min_score, max_score, studios, fuzzy=False):
+        """The bitmaps, the q matches (base) and one bitmap per filter"""
+        bitmaps = self.get_bitmaps(db)
+
+        base = bitmaps.all
+        if q and fuzzy:
+            # 和 /api/search?fuzzy=true 相同：trigram index + edit distance
+            base &= bitmaps.id_bitmap(anime_id for anime_id, _ in fuzzy_title_index.search(db, q))
+        elif q:
+            # 和 /api/search 相同：FTS5，沒有可搜尋的字時退回 title 比對
+            match_expression = build_match_expression(q)
+            if match_expression:
+                matching = select(text_search_subquery(match_expression).c.anime_id)
+            else:
+                matching = select(Anime.id).where(Anime.title.ilike(f"%{q}%"))
+            base &= bitmaps.id_bitmap(anime_id for anime_id, in db.execute(matching))
+
+        filters = {}
+        if genres.include:
+            filters["genres"] = bitmaps.tags(bitmaps.genres, genres._replace(exclude=()))
+        if genres.exclude:
+            filters["exclude_genres"] = bitmaps.tags(bitmaps.genres, TagFilter(exclude=genres.exclude))
+        if studios.include or studios.exclude:
+            filters["studios"] = bitmaps.tags(bitmaps.studios, studios)
+        if types:
+            filters["types"] = bitmaps.any_of(bitmaps.types, types)
+        if years:
+            filters["years"] = bitmaps.any_of(bitmaps.years, years)
+        if min_score is not None or max_score is not None:
+            filters["score"] = bitmaps.score_range(min_score, max_score)
+        return bitmaps, base, filters
+
+    def match_count(self, db, q=None, genres=TagFilter(), types=(), years=(), min_score=None, max_score=None,
+                    studios=TagFilter(), fuzzy=False):
+        """Number of /api/search results for the filters (without a COUNT query)"""
+        _, result, filters = self._filter_bitmaps(
+            db, q, genres, types, years, min_score, max_score, studios, fuzzy
+        )
+        for value in filters.values():
+            result &= value
+        return result.bit_count()
+
+    def facet_counts(self, db, q=None, genres=TagFilter(), types=(), years=(), min_score=None, max_score=None,
+                     studios=TagFilter(), fuzzy=False):
+        """
+        Matches per genre / type / year / score bucket for the given filters.
+
+        Each facet is counted with every filter except its own (so selecting
+        "Action" still shows how many results "Comedy" would add); `total` uses
+        all filters, the same as /api/search. With genre_mode=all another genre
+        narrows the results instead, so genres are counted with every filter.
+        """
+        bitmaps, base, filters = self._filter_bitmaps(
+            db, q, genres, types, years, min_score, max_score, studios, fuzzy
+        )
+
+        def matches(without=None):
+            result = base
+            for name, value in filters.items():
+                if name != without:
+                    result &= value
+            return result
+
+        in_genres, in_types, in_years, in_score = (
+            matches() if genres.mode == "all" else matches("genres"),
+            matches("types"), matches("years"), matches("score")
+        )
+
+        return matches().bit_count(), {
+            "genres": [
+                {"value": name, "count": (in_genres & members).bit_count()}
+                for name, members in sorted(bitmaps.genres.items())
+                if name not in HIDDEN_GENRES
+            ],
+            "types": sorted(
+                ({"value": name, "count": (in_types & members).bit_count()}
+                 for name, members in bitmaps.types.items()),
+                key=lambda facet: (-facet["count"], facet["value"])
+            ),
+            "years": [
+                {"value": year, "count": (in_years & members).bit_count()}
+                for year, members in sorted(bitmaps.years.items(), reverse=True)
+            ],
+            "score": [
+                {
+                    "value": bucket.label,
+                    "min": bucket.min,
+                    "max": bucket.max,
+                    "count": (in_score & bitmaps.score_buckets[bucket.label]).bit_count(),
+                }
+                for bucket in SCORE_BUCKETS
+            ],
+        }
+
+
+facet_index = FacetIndex()
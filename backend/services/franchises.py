@@ -0,0 +1,145 @@
+"""
+Franchise graph built from anime_relations.
+
+`build_franchises()` runs after fetch_and_save.py has ingested relations. It
+groups every anime connected by a franchise relation (sequel, prequel, side
+story, ...) into one component with union-find. Each component with at least
+two members is written to `franchise_members` in chronological order
+(aired_from), so /api/anime/{id}/franchise is a single indexed read; anime
+without one get franchise_id null and the frontend asks Jikan instead.
+
+Usage (from backend/):
+    python -m services.franchises
+"""
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import column, select, table
+
+from models import Anime, run_migrations
+from models.database import engine
+
+anime_relations = table(
+    "anime_relations",
+    column("anime_mal_id"), column("related_mal_id"), column("relation"), column("related_title"),
+)
+franchise_members = table(
+    "franchise_members",
+    column("franchise_id"), column("position"), column("mal_id"), column("anime_id"), column("title"),
+)
+
+# "Character" / "Other" 只是角色客串之類的關係，算進去的話不相干的系列會被併成一大團
+FRANCHISE_RELATIONS = {
+    "Sequel", "Prequel", "Side Story", "Parent Story", "Spin-off", "Summary",
+    "Alternative Version", "Alternative Setting", "Full Story",
+}
+
+
+class UnionFind:
+    """Disjoint sets over arbitrary hashable ids (union by size, path halving)"""
+
+    def __init__(self):
+        self.parent = {}
+        self.size = {}
+
+    def find(self, node):
+        parent = self.parent.setdefault(node, node)
+        if parent == node:
+            self.size.setdefault(node, 1)
+            return node
+        while self.parent[node] != node:
+            self.parent[node] = self.parent[self.parent[node]]
+            node = self.parent[node]
+        return node
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size.pop(root_b)
+
+
+def _chronological_key(anime, mal_id):
+    aired_from = anime[mal_id][1] if mal_id in anime else None
+    return (aired_from is None, aired_from or datetime.min, mal_id)
+
+
+def build_franchises(bind=engine):
+    """Rebuild franchise_members from anime_relations; returns (franchises, anime in a franchise)"""
+    with bind.begin() as conn:
+        anime = {
+            mal_id: (anime_id, aired_from)
+            for anime_id, mal_id, aired_from in conn.execute(
+                select(Anime.id, Anime.mal_id, Anime.aired_from).where(Anime.mal_id != None)
+            )
+        }
+
+        # 只有被 franchise relation 連起來的動漫才會進 groups：
+        # 沒有 relations (或還沒抓) 的動漫不寫 row，API 回 franchise_id null，前端改問 Jikan
+        groups = UnionFind()
+        titles = {}
+        for mal_id, related_mal_id, relation, related_title in conn.execute(select(anime_relations)):
+            titles.setdefault(related_mal_id, related_title)
+            if relation in FRANCHISE_RELATIONS:
+                groups.union(mal_id, related_mal_id)
+
+        components = defaultdict(list)
+        for mal_id in groups.parent:
+            components[groups.find(mal_id)].append(mal_id)
+
+        rows = []
+        for members in components.values():
+            if len(members) < 2:
+                continue
+            # 播出順序；不在資料庫裡 (沒有 aired_from) 的排在最後
+            members.sort(key=lambda mal_id: _chronological_key(anime, mal_id))
+            franchise_id = min(members)
+            for position, mal_id in enumerate(members, 1):
+                anime_id = anime[mal_id][0] if mal_id in anime else None
+                rows.append({
+                    "franchise_id": franchise_id,
+                    "position": position,
+                    "mal_id": mal_id,
+                    "anime_id": anime_id,
+                    "title": None if anime_id else titles.get(mal_id),
+                })
+
+        # 同一個 transaction 裡整批替換，讀取端不會看到一半的結果
+        conn.execute(franchise_members.delete())
+        if rows:
+            conn.execute(franchise_members.insert(), rows)
+
+    franchises = [members for members in components.values() if len(members) > 1]
+    return len(franchises), sum(len(members) for members in franchises)
+
+
+def load_franchise(db, anime_id):
+    """
+    Members of `anime_id`'s franchise in chronological order, as
+    (franchise_id, position, mal_id, title, Anime or None) rows; empty if it has no
+    franchise row.
+    """
+    franchise_id = select(franchise_members.c.franchise_id).where(
+        franchise_members.c.anime_id == anime_id
+    ).scalar_subquery()
+
+    return db.query(
+        franchise_members.c.franchise_id,
+        franchise_members.c.position,
+        franchise_members.c.mal_id,
+        franchise_members.c.title,
+        Anime,
+    ).outerjoin(
+        Anime, Anime.id == franchise_members.c.anime_id
+    ).filter(
+        franchise_members.c.franchise_id == franchise_id
+    ).order_by(franchise_members.c.position).all()
+
+
+if __name__ == "__main__":
+    run_migrations()
+    franchises, members = build_franchises()
+    print(f"✅ {franchises:,} franchises ({members:,} anime)")
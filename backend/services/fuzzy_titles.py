@@ -0,0 +1,259 @@
+"""
+Typo-tolerant title matching for /api/search?fuzzy=true.
+
+Every normalised title / title_english (services/title_suggest.normalize_title)
+is split into padded word trigrams ("  k", " ky", "kyo", ..., "in "), and the
+index keeps, for each trigram, the sorted positions of the titles containing it
+(one CSR posting array). Titles are numbered by members, most popular first, so
+every posting list is in popularity order.
+
+A query looks up its own trigrams, rarest first, and counts how many each title
+shares, reading at most POSTING_BUDGET postings. A very common trigram ("  s",
+"no ") is cut short, and because the lists are in popularity order only the
+least popular titles fall off, so latency stays bounded however short or common
+the query is. The CANDIDATES titles sharing the most trigrams are then scored
+with the edit distance of the query to their closest substring (Myers'
+bit-parallel algorithm, one NumPy pass for all candidates), and those within
+len(query) // 4 edits are returned, closest first.
+
+Rebuilt in the background when the data version changes.
+"""
+import json
+
+import numpy as np
+from sqlalchemy import func, select
+
+from models import Anime
+
+from .data_version import VersionedBuild
+from .title_suggest import normalize_title
+
+# 一次查詢最多讀幾個 postings (常見的 trigram 只讀最熱門的那一段)
+POSTING_BUDGET = 100_000
+# 共同 trigram 最多的前幾個 titles 才算 edit distance
+CANDIDATES = 500
+# bit-parallel edit distance 一個 uint64 放得下的長度 (更長的 query 只看前面)
+MAX_PATTERN = 64
+# 一次處理幾個 titles 的 trigrams (限制建立時的記憶體)
+BUILD_CHUNK = 200_000
+
+SPACE = ord(" ")
+
+
+def padded(key):
+    """Every word as "  word " (so the first letters and the last one get their own trigrams)"""
+    return "  " + key.replace(" ", "   ") + " "
+
+
+def trigram_codes(text):
+    """
+    The code of each trigram of `text` (three code points packed in an int64),
+    one per position; trigrams ending in two spaces span two words and are -1.
+    """
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+    if len(codes) < 3:
+        return np.empty(0, dtype=np.int64)
+    first, second, third = codes[:-2], codes[1:-1], codes[2:]
+    trigrams = (first << 42) | (second << 21) | third
+    trigrams[(second == SPACE) & (third == SPACE)] = -1
+    return trigrams
+
+
+def sorted_unique(values):
+    """np.unique by sorting (for big int arrays much faster than NumPy 2's hash-based unique)"""
+    values = np.sort(values)
+    keep = np.ones(len(values), dtype=bool)
+    keep[1:] = values[1:] != values[:-1]
+    return values[keep]
+
+
+def substring_distances(pattern, texts):
+    """
+    Edit distance from `pattern` to the closest substring of each text (Myers 1999,
+    the search variant: a match may start anywhere). All texts advance together,
+    one NumPy step per character.
+    """
+    pattern = pattern[:MAX_PATTERN]
+    length = len(pattern)
+    width = max(map(len, texts))
+    # 一列是所有 texts 的同一個位置 (每一步讀的是連續的記憶體)
+    characters = np.frombuffer(
+        "".join(text.ljust(width, "\0") for text in texts).encode("utf-32-le"), dtype=np.uint32
+    ).reshape(len(texts), width).T
+
+    # 每個字元在 pattern 裡出現的位置 (bit i = pattern[i])
+    masks = {}
+    for position, character in enumerate(pattern):
+        masks[ord(character)] = masks.get(ord(character), 0) | 1 << position
+    pattern_codes = np.array(sorted(masks), dtype=np.uint32)
+    pattern_masks = np.array([masks[code] for code in sorted(masks)], dtype=np.uint64)
+    slots = np.minimum(np.searchsorted(pattern_codes, characters), len(pattern_codes) - 1)
+    equal = np.ascontiguousarray(np.where(pattern_codes[slots] == characters, pattern_masks[slots], np.uint64(0)))
+
+    full = np.uint64((1 << length) - 1)
+    high = np.uint64(1 << (length - 1))
+    one = np.uint64(1)
+    positive = np.full(len(texts), full, dtype=np.uint64)
+    negative = np.zeros(len(texts), dtype=np.uint64)
+    score = np.full(len(texts), length, dtype=np.int64)
+    best = score.copy()
+    # 比較短的 text 結束之後 (補的 \0) 不再更新 best
+    ends = np.bincount([len(text) for text in texts], minlength=width + 1)
+    active = np.ones(len(texts), dtype=bool)
+    lengths = np.array([len(text) for text in texts])
+
+    for column in range(width):
+        if ends[column]:
+            active = lengths > column
+        eq = equal[column]
+        xv = eq | negative
+        xh = (((eq & positive) + positive) ^ positive) | eq
+        ph = negative | ~(xh | positive)
+        mh = positive & xh
+        score += (ph & high) != 0
+        score -= (mh & high) != 0
+        ph <<= one
+        mh <<= one
+        positive = (mh | ~(xv | ph)) & full
+        negative = ph & xv
+        np.minimum(best, score, out=best, where=active)
+    return best
+
+
+def fuzzy_search_subquery(matches):
+    """
+    The FuzzyTrigrams.search matches as (anime_id, rank) rows, so /api/search can
+    join and sort them like text_search_subquery (lower rank is closer)
+    """
+    values = func.json_each(json.dumps([anime_id for anime_id, _ in matches])).table_valued("key", "value")
+    return select(values.c.value.label("anime_id"), values.c.key.label("rank")).subquery("fuzzy_search")
+
+
+class FuzzyTrigrams:
+    """One immutable build of the trigram postings (swapped as a whole when the data changes)"""
+
+    def __init__(self, keys, key_ids, trigrams, offsets, postings):
+        self.keys = keys            # normalized titles，members 多的在前
+        self.key_ids = key_ids      # 每個 key 的 anime id
+        self.trigrams = trigrams    # 排好的 trigram codes
+        self.offsets = offsets      # trigram i 的 postings 是 postings[offsets[i]:offsets[i + 1]]
+        self.postings = postings    # key 位置 (由小到大 = 由熱門到冷門)
+
+    def search(self, q):
+        """[(anime_id, rank)] of the titles within len(q) // 4 edits of q, best first"""
+        key = normalize_title(q)
+        if not key:
+            return []
+
+        codes = trigram_codes(padded(key))
+        codes = sorted_unique(codes[codes >= 0])
+        slots = np.searchsorted(self.trigrams, codes)
+        found = slots < len(self.trigrams)
+        found[found] = self.trigrams[slots[found]] == codes[found]
+        slots = slots[found]
+        if not len(slots):
+            return []
+
+        # 最少見的 trigram 先讀，讀滿 POSTING_BUDGET 就停
+        starts, ends = self.offsets[slots], self.offsets[slots + 1]
+        budget = POSTING_BUDGET
+        chunks = []
+        for slot in np.argsort(ends - starts, kind="stable"):
+            take = min(int(ends[slot] - starts[slot]), budget)
+            chunks.append(self.postings[starts[slot]:starts[slot] + take])
+            budget -= take
+            if budget <= 0:
+                break
+        hits = np.sort(np.concatenate(chunks))
+        starts = np.flatnonzero(np.concatenate(([True], hits[1:] != hits[:-1])))
+        positions, shared = hits[starts], np.diff(np.append(starts, len(hits)))
+
+        # 共同 trigram 多的優先，一樣多時熱門的優先 (位置小)
+        if len(positions) > CANDIDATES:
+            positions = positions[np.lexsort((positions, -shared))[:CANDIDATES]]
+        distances = substring_distances(key, [self.keys[position] for position in positions])
+
+        max_distance = min(len(key), MAX_PATTERN) // 4
+        matched = distances <= max_distance
+        positions, distances = positions[matched], distances[matched]
+        order = np.lexsort((positions, distances))
+
+        # 一部動漫兩個 title 都符合時只留比較好的那個
+        results, seen = [], set()
+        for position in positions[order].tolist():
+            anime_id = self.key_ids[position]
+            if anime_id not in seen:
+                seen.add(anime_id)
+                results.append((anime_id, len(results)))
+        return results
+
+
+def build_fuzzy_trigrams(db):
+    """Read every title once and build the trigram postings"""
+    rows = db.execute(
+        select(Anime.id, Anime.title, Anime.title_english)
+        .order_by(Anime.members.desc().nulls_last(), Anime.id)
+    )
+    keys, key_ids = [], []
+    for anime_id, title, title_english in rows:
+        key = normalize_title(title)
+        if key:
+            keys.append(key)
+            key_ids.append(anime_id)
+        if title_english and title_english != title:
+            english = normalize_title(title_english)
+            if english and english != key:
+                keys.append(english)
+                key_ids.append(anime_id)
+
+    # 每一段 titles：(trigram, key) 配對依 trigram、key 位置排好，同一個 key 重複的 trigram 只留一個
+    chunks = []
+    for start in range(0, len(keys), BUILD_CHUNK):
+        chunk = [padded(key) for key in keys[start:start + BUILD_CHUNK]]
+        lengths = np.array([len(text) for text in chunk])
+        codes = trigram_codes("".join(chunk))
+        owners = np.repeat(np.arange(len(chunk), dtype=np.int64), lengths)[:len(codes)]
+        # 跨到下一個 title 的 trigrams (每個 title 的最後兩個位置) 不算
+        valid = (np.arange(len(codes)) < np.cumsum(lengths)[owners] - 2) & (codes >= 0)
+        codes = codes[valid]
+        # trigram 種類不多：先取 unique，再 searchsorted 編號 (比 return_inverse 快很多)
+        vocabulary = sorted_unique(codes)
+        pairs = sorted_unique(np.searchsorted(vocabulary, codes) * len(chunk) + owners[valid])
+        chunks.append((vocabulary, pairs // len(chunk), (pairs % len(chunk) + start).astype(np.int32)))
+
+    # 所有段落共用的 trigram 編號，再依段落順序填進每個 trigram 的 postings (熱門的在前)
+    trigrams = sorted_unique(np.concatenate([vocabulary for vocabulary, _, _ in chunks])) if chunks \
+        else np.empty(0, dtype=np.int64)
+    counts = np.zeros(len(trigrams), dtype=np.int64)
+    for index, (vocabulary, local, owners) in enumerate(chunks):
+        ids = np.searchsorted(trigrams, vocabulary)[local]
+        chunks[index] = (ids, owners)
+        counts += np.bincount(ids, minlength=len(trigrams))
+    offsets = np.zeros(len(trigrams) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    postings = np.empty(offsets[-1], dtype=np.int32)
+    filled = offsets[:-1].copy()
+    for ids, owners in chunks:
+        chunk_counts = np.bincount(ids, minlength=len(trigrams))
+        # ids 已排好：每個 pair 在自己 trigram 那一段裡的序號
+        first = np.cumsum(chunk_counts) - chunk_counts
+        postings[filled[ids] + np.arange(len(ids)) - first[ids]] = owners
+        filled += chunk_counts
+    return FuzzyTrigrams(keys, key_ids, trigrams, offsets, postings)
+
+
+class FuzzyTitleIndex(VersionedBuild):
+    """Trigram postings for /api/search?fuzzy=true, rebuilt in the background when the data version changes"""
+
+    def build(self, db):
+        return build_fuzzy_trigrams(db)
+
+    def get_trigrams(self, db):
+        return self.get(db)
+
+    def search(self, db, q):
+        return self.get_trigrams(db).search(q)
+
+
+fuzzy_title_index = FuzzyTitleIndex()
@@ -0,0 +1,119 @@
+import base64
+import json
+from collections import namedtuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, false, or_, tuple_
+
+# 排序鍵：nullable=True 的欄位在 keyset 條件裡會處理 NULL（SQLite 把 NULL 視為最小值）
+SortKey = namedtuple("SortKey", ["column", "descending", "nullable"], defaults=[True, False])
+
+
+def encode_cursor(key, values):
+    """Opaque cursor for the last row of a page: its sort values plus the sort signature"""
+    raw = json.dumps({"k": key, "v": list(values)}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, key, size):
+    """Return the sort values stored in `cursor`, or raise 400 if it doesn't fit this listing"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        values = payload["v"]
+        valid = payload["k"] == key and isinstance(values, list) and len(values) == size
+    except (ValueError, TypeError, KeyError):
+        valid = False
+
+    if not valid:
+        raise HTTPException(status_code=400, detail="Invalid cursor for this listing")
+    return values
+
+
+def _after(sort_keys, values):
+    """Rows strictly after `values` (expanded form, handles NULLs)"""
+    key, value = sort_keys[0], values[0]
+    column = key.column
+    tail = _after(sort_keys[1:], values[1:]) if len(sort_keys) > 1 else None
+
+    if value is None:
+        # 目前在 NULL 區段：desc 時 NULL 在最後，asc 時 NULL 在最前
+        if key.descending:
+            return and_(column.is_(None), tail) if tail is not None else false()
+        beyond = column.isnot(None)
+        return or_(beyond, and_(column.is_(None), tail)) if tail is not None else beyond
+
+    beyond = column < value if key.descending else column > value
+    if key.nullable and key.descending:
+        beyond = or_(beyond, column.is_(None))
+    if tail is None:
+        return beyond
+    return or_(beyond, and_(column == value, tail))
+
+
+def _row_value_condition(sort_keys, values):
+    """(a, b, id) < (?, ?, ?) — SQLite can seek straight to the cursor position in an index"""
+    columns = tuple_(*[key.column for key in sort_keys])
+    if sort_keys[0].descending:
+        return columns < tuple_(*values)
+    return columns > tuple_(*values)
+
+
+def _splits_at_nulls(sort_keys, values):
+    """Descending on a nullable first key: the page may run on into the NULL rows at the end"""
+    first = sort_keys[0]
+    return (
+        first.nullable and first.descending and values[0] is not None
+        and len({key.descending for key in sort_keys}) == 1
+        and not any(key.nullable for key in sort_keys[1:])
+    )
+
+
+def keyset_condition(sort_keys, values):
+    """WHERE clause that selects the rows after the cursor position"""
+    directions = {key.descending for key in sort_keys}
+    # asc 時 NULL 排在最前面，cursor 不是 NULL 的話它們一定在 cursor 之前
+    nulls_ahead = any(key.nullable and key.descending for key in sort_keys)
+
+    if len(directions) == 1 and not nulls_ahead and None not in values:
+        return _row_value_condition(sort_keys, values)
+
+    return _after(sort_keys, values)
+
+
+def paginate(query, sort_keys, limit, offset=0, cursor=None, cursor_key=""):
+    """
+    Order `query` by `sort_keys` and fetch one page.
+
+    With a cursor the page starts right after the cursor row (keyset pagination,
+    offset is ignored); otherwise offset/limit is used. Returns (rows, next_cursor),
+    next_cursor is None on the last page.
+    """
+    query = query.order_by(*[
+        key.column.desc() if key.descending else key.column.asc()
+        for key in sort_keys
+    ]).add_columns(*[key.column for key in sort_keys])
+
+    # 多抓一筆判斷是否還有下一頁
+    if not cursor:
+        rows = query.offset(offset or None).limit(limit + 1).all()
+    else:
+        values = decode_cursor(cursor, cursor_key, len(sort_keys))
+        if _splits_at_nulls(sort_keys, values):
+            # 先讀 cursor 之後的非 NULL 區段，不夠再從最後的 NULL 區段補；兩段都能走 index
+            rows = query.filter(_row_value_condition(sort_keys, values)).limit(limit + 1).all()
+            if len(rows) <= limit:
+                rows += query.filter(
+                    sort_keys[0].column.is_(None)
+                ).limit(limit + 1 - len(rows)).all()
+        else:
+            rows = query.filter(keyset_condition(sort_keys, values)).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        # limit <= 0 時 page 是空的，沒有可以接續的 row
+        if rows:
+            next_cursor = encode_cursor(cursor_key, rows[-1][1:])
+
+    return [row[0] for row in rows], next_cursor
@@ -0,0 +1,49 @@
+import random
+import threading
+from array import array
+
+from models import Anime
+
+from .data_version import get_data_version
+
+
+class RandomPickPool:
+    """
+    Ids eligible for /api/anime/random, kept in a compact array.
+
+    The pool is rebuilt only when the data version changes, so a pick costs
+    one version lookup plus O(1) indexing instead of reading every qualifying id.
+    """
+
+    def __init__(self):
+        self._ids = array("q")
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get_ids(self, db):
+        version = get_data_version(db)
+
+        with self._lock:
+            if version != self._version:
+                rows = db.query(Anime.id).filter(
+                    Anime.score >= 7.0,
+                    Anime.members >= 50000,
+                    Anime.image_url != None
+                ).order_by(Anime.id)
+                self._ids = array("q", (anime_id for anime_id, in rows))
+                self._version = version
+            return self._ids
+
+    def sample(self, db, count=1):
+        """Up to `count` distinct random ids"""
+        ids = self.get_ids(db)
+        positions = random.sample(range(len(ids)), min(count, len(ids)))
+        return [ids[position] for position in positions]
+
+    def clear(self):
+        with self._lock:
+            self._ids = array("q")
+            self._version = None
+
+
+random_pick_pool = RandomPickPool()
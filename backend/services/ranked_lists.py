@@ -0,0 +1,198 @@
+"""
+Precomputed rankings for the Discover categories (popular, top-rated, hidden-gems,
+latest, trending).
+
+`refresh_ranked_lists()` runs after the data-collection scripts finish and writes
+each category's order into `ranked_lists(category, generation, rank, anime_id)`.
+A category page is then an index range read on (category, generation, rank)
+instead of a filter + sort over the whole anime table.
+
+Swap: a refresh writes a new generation and repoints `ranked_list_meta` in the
+same transaction, so readers see either the old list or the new one, never a
+half-built one. The previous generation is kept for requests that read the meta
+row just before the swap.
+
+Usage (from backend/):
+    python -m services.ranked_lists
+"""
+import json
+from collections import namedtuple
+from datetime import date, datetime
+
+from fastapi import HTTPException
+from sqlalchemy import Float, cast, column, delete, func, insert, literal, select, table
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import Anime, run_migrations
+from models.database import engine
+
+from .data_version import get_data_version
+from .pagination import SortKey, decode_cursor, encode_cursor, paginate
+from .serializers import RECOMMENDATION_FIELDS, anime_columns
+from .totals import cached_total, filter_key
+
+ranked_lists = table(
+    "ranked_lists",
+    column("category"), column("generation"), column("rank"), column("anime_id"),
+)
+ranked_list_meta = table(
+    "ranked_list_meta",
+    column("category"), column("generation"), column("total"), column("params"),
+    column("data_version"), column("built_at"),
+)
+
+# filters / sort_keys 定義排行；params 是會隨時間變的條件（年份），和預先計算時不同就不用舊的排行
+RankedCategory = namedtuple("RankedCategory", ["filters", "sort_keys", "params"])
+RankedPage = namedtuple("RankedPage", ["rows", "next_cursor", "total"])
+
+# hidden-gems 的排序：favorites / members，由 ix_anime_hidden_gems_ratio (partial index) 排好
+# 用 op("/") 而不是 "/"，SQLAlchemy 的除法會多加 "+ 0.0"，就和 index 的 expression 對不上
+FAVORITES_RATIO = cast(Anime.favorites, Float).op("/", return_type=Float)(Anime.members)
+
+
+def discover_years(today=None):
+    """Years covered by the latest / trending categories"""
+    current_year = (today or date.today()).year
+    return [current_year, current_year - 1]
+
+
+def discover_categories(today=None):
+    """Filters and sort order of each Discover category"""
+    years = discover_years(today)
+    return {
+        "popular": RankedCategory(
+            [Anime.members != None, Anime.score != None, Anime.score >= 6.0],
+            [SortKey(Anime.members), SortKey(Anime.id)],
+            {},
+        ),
+        "top-rated": RankedCategory(
+            [Anime.score >= 8.0, Anime.members >= 50000],
+            [SortKey(Anime.score), SortKey(Anime.members), SortKey(Anime.id)],
+            {},
+        ),
+        "hidden-gems": RankedCategory(
+            [Anime.score >= 7.5, Anime.members >= 10000, Anime.members <= 100000,
+             Anime.favorites != None],
+            [SortKey(FAVORITES_RATIO), SortKey(Anime.id)],
+            {},
+        ),
+        "latest": RankedCategory(
+            [Anime.year.in_(years), Anime.score >= 6.5],
+            [SortKey(Anime.year), SortKey(Anime.members), SortKey(Anime.id)],
+            {"years": years},
+        ),
+        "trending": RankedCategory(
+            [Anime.year.in_(years), Anime.score >= 7.0, Anime.members >= 50000],
+            [SortKey(Anime.members), SortKey(Anime.id)],
+            {"years": years},
+        ),
+    }
+
+
+def _order_by(sort_keys):
+    return [key.column.desc() if key.descending else key.column.asc() for key in sort_keys]
+
+
+def refresh_ranked_lists(bind=engine, today=None):
+    """Rebuild every category and swap the new lists in atomically; returns {category: total}"""
+    categories = discover_categories(today)
+    totals = {}
+
+    with bind.begin() as conn:
+        generation = conn.execute(
+            select(func.coalesce(func.max(ranked_lists.c.generation), 0) + 1)
+        ).scalar()
+        data_version = get_data_version(conn)
+        built_at = datetime.now().isoformat(timespec="seconds")
+
+        for name, category in categories.items():
+            ranking = select(
+                literal(name),
+                literal(generation),
+                func.row_number().over(order_by=_order_by(category.sort_keys)),
+                Anime.id,
+            ).where(*category.filters)
+            totals[name] = conn.execute(
+                insert(ranked_lists).from_select(
+                    ["category", "generation", "rank", "anime_id"], ranking
+                )
+            ).rowcount
+
+            # swap：meta 指到新的 generation
+            values = {
+                "generation": generation,
+                "total": totals[name],
+                "params": json.dumps(category.params, sort_keys=True),
+                "data_version": data_version,
+                "built_at": built_at,
+            }
+            conn.execute(
+                sqlite_insert(ranked_list_meta)
+                .values(category=name, **values)
+                .on_conflict_do_update(index_elements=["category"], set_=values)
+            )
+
+        # 保留上一個 generation 給 swap 前已讀到 meta 的 request
+        conn.execute(delete(ranked_lists).where(ranked_lists.c.generation < generation - 1))
+
+    return totals
+
+
+def ranked_page(db, name, category, limit, offset=0, cursor=None, columns=RECOMMENDATION_FIELDS):
+    """
+    One page of a precomputed ranking, or None when the list hasn't been built,
+    was built for different params (e.g. last year's "latest"), or the cursor
+    came from the live query. Rows are anime_columns(columns) rows.
+    """
+    meta = db.execute(
+        select(ranked_list_meta.c.generation, ranked_list_meta.c.total, ranked_list_meta.c.params)
+        .where(ranked_list_meta.c.category == name)
+    ).first()
+    if meta is None or json.loads(meta.params) != category.params:
+        return None
+
+    cursor_key = f"{name}:ranked"
+    start = offset
+    if cursor:
+        try:
+            start = decode_cursor(cursor, cursor_key, 1)[0]
+        except HTTPException:
+            return None
+        if not isinstance(start, int):
+            raise HTTPException(status_code=400, detail="Invalid cursor for this listing")
+
+    # rank 從 1 開始：offset n 就是 rank > n；多抓一筆判斷是否還有下一頁
+    rows = db.query(anime_columns(columns), ranked_lists.c.rank).join(
+        ranked_lists, ranked_lists.c.anime_id == Anime.id
+    ).filter(
+        ranked_lists.c.category == name,
+        ranked_lists.c.generation == meta.generation,
+        ranked_lists.c.rank > start,
+    ).order_by(ranked_lists.c.rank).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(cursor_key, [rows[-1][1]])
+
+    return RankedPage([row[0] for row in rows], next_cursor, meta.total)
+
+
+def discover_page(db, name, limit, offset=0, cursor=None, include_total=True, columns=RECOMMENDATION_FIELDS):
+    """Page of a Discover category: precomputed ranking if available, live query otherwise"""
+    category = discover_categories()[name]
+
+    page = ranked_page(db, name, category, limit, offset, cursor, columns)
+    if page is not None:
+        return page._replace(total=page.total if include_total else None)
+
+    query = db.query(anime_columns(columns)).filter(*category.filters)
+    total = cached_total(db, filter_key(name, **category.params), query) if include_total else None
+    rows, next_cursor = paginate(query, category.sort_keys, limit, offset, cursor, cursor_key=name)
+    return RankedPage(rows, next_cursor, total)
+
+
+if __name__ == "__main__":
+    run_migrations()
+    for name, total in refresh_ranked_lists().items():
+        print(f"✅ {name}: {total:,} anime ranked")
@@ -0,0 +1,203 @@
+import hashlib
+import time
+from collections import OrderedDict, namedtuple
+from urllib.parse import parse_qsl, urlencode
+
+from starlette.datastructures import Headers
+
+from .compression import choose_encoding, compress, encoded_etag, is_compressible
+
+# 快取的 response：body 是已經序列化好的 bytes；encoded 是第一次被要求時壓好的版本 (encoding → bytes)
+CacheEntry = namedtuple("CacheEntry", ["body", "content_type", "etag", "expires_at", "encoded"])
+
+
+class MemoryCacheBackend:
+    """Bounded in-process LRU; entries past their TTL are dropped on read"""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ResponseCache:
+    """Response cache with hit / miss / 304 / compression counters; the storage backend is pluggable"""
+
+    def __init__(self, backend=None):
+        self.backend = backend or MemoryCacheBackend()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.compressions = 0
+
+    def get(self, key):
+        entry = self.backend.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def set(self, key, entry):
+        self.backend.set(key, entry)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        return {
+            "entries": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "compressions": self.compressions,
+            "evictions": getattr(self.backend, "evictions", 0),
+        }
+
+
+def cache_key(path, query_string):
+    """Path plus query params sorted by name, with empty values dropped"""
+    params = sorted(
+        (name, value)
+        for name, value in parse_qsl(query_string.decode("latin-1"), keep_blank_values=True)
+        if value != ""
+    )
+    return f"{path}?{urlencode(params)}"
+
+
+def make_etag(body):
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match check; W/ prefixes are ignored (weak comparison, RFC 9110)"""
+    if if_none_match is None:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(
+        (tag[2:] if tag.startswith("W/") else tag) == etag for tag in candidates
+    )
+
+
+class ResponseCacheMiddleware:
+    """
+    ASGI middleware that serves GET responses of the configured routes from a cache.
+
+    routes maps a path to its TTL in seconds. Successful responses are stored as
+    bytes with a strong ETag; a matching If-None-Match gets a 304 and a cache hit
+    never reaches the endpoint (or SQLite). The gzip / brotli variant a client
+    negotiates is compressed on first use and kept on the entry.
+    """
+
+    def __init__(self, app, cache, routes):
+        self.app = app
+        self.cache = cache
+        self.routes = routes
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path")
+        if scope["type"] != "http" or scope["method"] != "GET" or path not in self.routes:
+            await self.app(scope, receive, send)
+            return
+
+        key = cache_key(path, scope.get("query_string", b""))
+        entry = self.cache.get(key)
+        cache_status = "HIT"
+
+        if entry is None:
+            cache_status = "MISS"
+            start, body = await self._call_endpoint(scope, receive)
+
+            if start["status"] != 200:
+                await send(start)
+                await send({"type": "http.response.body", "body": body})
+                return
+
+            content_type = Headers(raw=start["headers"]).get("content-type", "application/json")
+            entry = CacheEntry(
+                body=body,
+                content_type=content_type,
+                etag=make_etag(body),
+                expires_at=time.monotonic() + self.routes[path],
+                encoded={},
+            )
+            self.cache.set(key, entry)
+
+        await self._send_entry(entry, Headers(scope=scope), cache_status, send)
+
+    async def _call_endpoint(self, scope, receive):
+        start = None
+        chunks = []
+
+        async def capture(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        return start, b"".join(chunks)
+
+    def _encoded_body(self, entry, encoding):
+        """The entry's body in `encoding`, compressed once and then reused until the entry expires"""
+        body = entry.encoded.get(encoding)
+        if body is None:
+            body = entry.encoded[encoding] = compress(entry.body, encoding)
+            self.cache.compressions += 1
+        return body
+
+    async def _send_entry(self, entry, request_headers, cache_status, send):
+        max_age = max(0, int(entry.expires_at - time.monotonic()))
+        compressible = is_compressible(entry.content_type, len(entry.body))
+        encoding = choose_encoding(request_headers.get("accept-encoding")) if compressible else None
+        etag = encoded_etag(entry.etag, encoding) if encoding else entry.etag
+        headers = [
+            (b"etag", etag.encode()),
+            (b"cache-control", f"public, max-age={max_age}".encode()),
+            (b"x-cache", cache_status.encode()),
+        ]
+        if compressible:
+            headers.append((b"vary", b"Accept-Encoding"))
+
+        if etag_matches(request_headers.get("if-none-match"), etag):
+            self.cache.not_modified += 1
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        body = entry.body
+        if encoding is not None:
+            body = self._encoded_body(entry, encoding)
+            headers.append((b"content-encoding", encoding.encode()))
+        headers += [
+            (b"content-type", entry.content_type.encode()),
+            (b"content-length", str(len(body)).encode()),
+        ]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+response_cache = ResponseCache()
@@ -0,0 +1,358 @@
+"""
+Free-text "describe what you want" search over synopses (/api/search/semantic).
+
+Queries and synopses go through the same hashed vectorizer as synopsis_similar
+(services/story_similar.py: word unigrams + bigrams hashed into 2**20
+features, sublinear tf * IDF). The sparse vector is then folded into
+DIMENSIONS dense dimensions with a signed hash (a count sketch: dot products
+are kept in expectation) and L2-normalized, so a dot product is the cosine.
+
+The vectors live in an IVF (inverted file) index: k-means centroids trained on
+a sample, and every vector stored next to the others of its nearest centroid
+in flat binary files that are memory-mapped. A query is compared with the
+centroids, then only the `nprobe` closest lists are read and scanned, never
+the whole collection.
+
+`build_semantic_index()` runs offline (after fetch_and_save.py) with the same
+process pool passes as synopsis_similar and switches the CURRENT pointer to
+the new build in one rename. fetch_and_save.save_anime() appends new anime to
+the build's delta files (embedded with the build's IDF, assigned to their
+nearest centroid) without rebuilding; the next build folds them in.
+
+Files (SEMANTIC_INDEX_DIR, default semantic_index/ next to the database):
+    CURRENT                        name of the active build directory
+    <build>/meta.json              dimensions, lists, anime
+    <build>/idf.f32                IDF of every hashed feature (frozen at build time)
+    <build>/centroids.f32          lists x DIMENSIONS
+    <build>/offsets.i64            where each list starts in vectors / ids
+    <build>/vectors.f32, ids.i64   the vectors grouped by list, and their anime ids
+    <build>/delta.f32, delta_lists.i32, delta_ids.i64   anime appended after the build
+
+Usage (from backend/):
+    python -m services.semantic_index [--workers N]
+"""
+import json
+import math
+import os
+import shutil
+import threading
+import time
+from multiprocessing import get_context
+
+import numpy as np
+
+from models.database import engine
+
+from .story_similar import (
+    FEATURES, _map, _synopses, document_frequencies, hashed_terms, id_ranges, inverse_document_frequency,
+)
+
+# dense 向量的維度 (1M 部動漫 × 256 × float32 = 1 GB，放在磁碟上 memory-map)
+DIMENSIONS = 256
+
+# IVF lists 數量 ≈ sqrt(動漫數)；預設掃描最近的幾個 lists
+DEFAULT_NPROBE = 16
+
+# k-means：每個 list 取樣幾個向量、跑幾輪
+KMEANS_SAMPLE = 64
+KMEANS_ITERATIONS = 10
+
+# 一次和 centroids 比對 / 寫入的向量數
+ASSIGN_ROWS = 65536
+
+SEMANTIC_INDEX_DIR = os.environ.get("ANIME_SEMANTIC_INDEX_DIR")
+
+# count sketch：每個 hashed feature 對應到的維度和正負號 (固定的 seed，build / query 一致)
+_sketch = np.random.default_rng(20240601)
+FEATURE_DIMENSIONS = _sketch.integers(0, DIMENSIONS, FEATURES, dtype=np.int64)
+FEATURE_SIGNS = _sketch.choice(np.array([-1.0, 1.0], dtype=np.float32), FEATURES)
+del _sketch
+
+
+def index_directory(bind=engine):
+    """Where the index of `bind`'s database lives"""
+    return SEMANTIC_INDEX_DIR or os.path.join(
+        os.path.dirname(os.path.abspath(bind.url.database)), "semantic_index"
+    )
+
+
+def embed_counts(documents, idf):
+    """L2-normalized DIMENSIONS vectors of hashed_terms() dicts (all-zero rows stay zero)"""
+    rows, features, tf = [], [], []
+    for row, counts in enumerate(documents):
+        rows.extend([row] * len(counts))
+        features.extend(counts.keys())
+        tf.extend(counts.values())
+
+    features = np.array(features, dtype=np.int64)
+    weights = (1 + np.log(np.array(tf, dtype=np.float32))) * idf[features] * FEATURE_SIGNS[features]
+    vectors = np.bincount(
+        np.array(rows, dtype=np.int64) * DIMENSIONS + FEATURE_DIMENSIONS[features],
+        weights=weights, minlength=len(documents) * DIMENSIONS
+    ).astype(np.float32).reshape(len(documents), DIMENSIONS)
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _embed(task):
+    """Worker: (anime ids, vectors) of one id range"""
+    url, directory, first_id, last_id = task
+    idf = np.fromfile(os.path.join(directory, "idf.f32"), dtype=np.float32)
+    ids, documents = [], []
+    for anime_id, synopsis in _synopses(url, first_id, last_id):
+        counts = hashed_terms(synopsis)
+        if counts:
+            ids.append(anime_id)
+            documents.append(counts)
+    return np.array(ids, dtype=np.int64), embed_counts(documents, idf)
+
+
+def nearest_lists(vectors, centroids):
+    """Index of the closest centroid of every vector"""
+    return np.concatenate([
+        np.argmax(vectors[start:start + ASSIGN_ROWS] @ centroids.T, axis=1)
+        for start in range(0, len(vectors), ASSIGN_ROWS)
+    ]) if len(vectors) else np.zeros(0, dtype=np.int64)
+
+
+def train_centroids(vectors, lists, seed=0):
+    """Spherical k-means on a sample of `vectors` (lists x DIMENSIONS)"""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), lists * KMEANS_SAMPLE)
+    sample = np.asarray(vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))])
+    centroids = sample[rng.choice(sample_size, lists, replace=False)].copy()
+
+    for _ in range(KMEANS_ITERATIONS):
+        assigned = nearest_lists(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assigned, sample)
+        # 空的 list 換成隨機一個樣本
+        empty = np.bincount(assigned, minlength=lists) == 0
+        sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = sums / norms
+    return centroids.astype(np.float32)
+
+
+def build_semantic_index(bind=engine, directory=None, workers=None):
+    """Rebuild the IVF index from every synopsis; returns (anime, lists)"""
+    directory = directory or index_directory(bind)
+    workers = workers or os.cpu_count() or 1
+    url = bind.url.render_as_string(hide_password=False)
+    ranges = id_ranges(bind)
+
+    os.makedirs(directory, exist_ok=True)
+    build = f"build-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+    path = os.path.join(directory, build)
+    os.makedirs(path)
+
+    pool = get_context().Pool(workers) if workers > 1 else None
+    try:
+        documents, document_frequency = document_frequencies(pool, url, ranges)
+        inverse_document_frequency(document_frequency, documents).tofile(os.path.join(path, "idf.f32"))
+
+        # 依 id 順序先寫到暫存檔，k-means / 分組時再 memory-map 讀回來
+        anime = 0
+        tasks = [(url, path, first_id, last_id) for first_id, last_id in ranges]
+        with open(os.path.join(path, "unsorted.f32"), "wb") as vectors_file, \
+                open(os.path.join(path, "unsorted.i64"), "wb") as ids_file:
+            for ids, vectors in _map(pool, _embed, tasks):
+                vectors_file.write(vectors.tobytes())
+                ids_file.write(ids.tobytes())
+                anime += len(ids)
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    lists = max(1, round(math.sqrt(anime)))
+    if anime:
+        unsorted = np.memmap(os.path.join(path, "unsorted.f32"), dtype=np.float32, mode="r",
+                             shape=(anime, DIMENSIONS))
+        unsorted_ids = np.fromfile(os.path.join(path, "unsorted.i64"), dtype=np.int64)
+        centroids = train_centroids(unsorted, lists)
+        assigned = nearest_lists(unsorted, centroids)
+    else:
+        unsorted, unsorted_ids = np.zeros((0, DIMENSIONS), dtype=np.float32), np.zeros(0, dtype=np.int64)
+        centroids = np.zeros((lists, DIMENSIONS), dtype=np.float32)
+        assigned = np.zeros(0, dtype=np.int64)
+
+    # 同一個 list 的向量放在一起 (list 內依 id)
+    order = np.argsort(assigned, kind="stable")
+    offsets = np.zeros(lists + 1, dtype=np.int64)
+    np.cumsum(np.bincount(assigned, minlength=lists), out=offsets[1:])
+    with open(os.path.join(path, "vectors.f32"), "wb") as vectors_file:
+        for start in range(0, anime, ASSIGN_ROWS):
+            vectors_file.write(np.ascontiguousarray(unsorted[order[start:start + ASSIGN_ROWS]]).tobytes())
+    unsorted_ids[order].tofile(os.path.join(path, "ids.i64"))
+    centroids.tofile(os.path.join(path, "centroids.f32"))
+    offsets.tofile(os.path.join(path, "offsets.i64"))
+    for name, dtype in (("delta.f32", np.float32), ("delta_lists.i32", np.int32), ("delta_ids.i64", np.int64)):
+        np.zeros(0, dtype=dtype).tofile(os.path.join(path, name))
+    with open(os.path.join(path, "meta.json"), "w") as meta_file:
+        json.dump({"dimensions": DIMENSIONS, "lists": lists, "anime": anime}, meta_file)
+
+    del unsorted
+    for name in ("unsorted.f32", "unsorted.i64"):
+        os.remove(os.path.join(path, name))
+
+    # CURRENT 換成新的 build (rename 是 atomic 的)，再刪掉舊的
+    current = os.path.join(directory, "CURRENT")
+    with open(current + ".tmp", "w") as current_file:
+        current_file.write(build)
+    os.replace(current + ".tmp", current)
+    for name in os.listdir(directory):
+        if name.startswith("build-") and name != build:
+            # Windows 上還在被 API 讀取 (memory-mapped) 的檔案刪不掉，下次再刪
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+    return anime, lists
+
+
+class SemanticIndexBuild:
+    """One build of the index, memory-mapped read-only"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as meta_file:
+            meta = json.load(meta_file)
+        self.lists = meta["lists"]
+        self.anime = meta["anime"]
+        self.idf = self._map("idf.f32", np.float32)
+        self.centroids = np.fromfile(os.path.join(path, "centroids.f32"), dtype=np.float32).reshape(
+            self.lists, DIMENSIONS
+        )
+        self.offsets = np.fromfile(os.path.join(path, "offsets.i64"), dtype=np.int64)
+        self.vectors = self._map("vectors.f32", np.float32, (self.anime, DIMENSIONS))
+        self.ids = self._map("ids.i64", np.int64)
+
+    def _map(self, name, dtype, shape=None):
+        file_path = os.path.join(self.path, name)
+        if not os.path.getsize(file_path):
+            return np.zeros(shape or 0, dtype=dtype)
+        return np.memmap(file_path, dtype=dtype, mode="r", shape=shape)
+
+    def embed(self, text):
+        """Query vector of `text` (None when it has no words)"""
+        counts = hashed_terms(text)
+        if not counts:
+            return None
+        return embed_counts([counts], self.idf)[0]
+
+    def delta(self):
+        """(vectors, lists, ids) appended since the build (complete entries only)"""
+        count = os.path.getsize(os.path.join(self.path, "delta_ids.i64")) // 8
+        if not count:
+            return np.zeros((0, DIMENSIONS), dtype=np.float32), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int64)
+        return (
+            np.fromfile(os.path.join(self.path, "delta.f32"), dtype=np.float32,
+                        count=count * DIMENSIONS).reshape(count, DIMENSIONS),
+            np.fromfile(os.path.join(self.path, "delta_lists.i32"), dtype=np.int32, count=count),
+            np.fromfile(os.path.join(self.path, "delta_ids.i64"), dtype=np.int64, count=count),
+        )
+
+    def search(self, text, limit, nprobe=DEFAULT_NPROBE):
+        """[(anime id, cosine)] of the best matches in the `nprobe` closest lists"""
+        query = self.embed(text)
+        if query is None:
+            return []
+
+        probed = np.argsort(-(self.centroids @ query), kind="stable")[:nprobe]
+        slices = [slice(self.offsets[index], self.offsets[index + 1]) for index in np.sort(probed)]
+        ids = np.concatenate([self.ids[part] for part in slices] + [np.zeros(0, dtype=np.int64)])
+        scores = np.concatenate(
+            [self.vectors[part] @ query for part in slices] + [np.zeros(0, dtype=np.float32)]
+        )
+
+        # build 之後才加入的動漫 (delta 不大，依 list 過濾後直接比對)
+        delta_vectors, delta_lists, delta_ids = self.delta()
+        if len(delta_ids):
+            in_probed = np.isin(delta_lists, probed)
+            ids = np.concatenate([ids, delta_ids[in_probed]])
+            scores = np.concatenate([scores, delta_vectors[in_probed] @ query])
+
+        if len(ids) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            ids, scores = ids[top], scores[top]
+        order = np.lexsort((ids, -scores))
+        return [(int(anime_id), float(score)) for anime_id, score in zip(ids[order], scores[order])]
+
+
+def add_to_semantic_index(anime_id, synopsis, bind=engine, directory=None):
+    """
+    Append one new anime to the current build's delta (fetch_and_save.save_anime).
+
+    Uses the build's IDF and centroids; no-op (False) when there is no index
+    yet or the synopsis has no words. Vectors / lists are written before the
+    id, so readers never see an id without its vector.
+    """
+    directory = directory or index_directory(bind)
+    try:
+        with open(os.path.join(directory, "CURRENT")) as current_file:
+            build = SemanticIndexBuild(os.path.join(directory, current_file.read().strip()))
+    except FileNotFoundError:
+        return False
+
+    vector = build.embed(synopsis or "")
+    if vector is None:
+        return False
+    index = int(np.argmax(build.centroids @ vector))
+    for name, value in (
+        ("delta.f32", vector.astype(np.float32)),
+        ("delta_lists.i32", np.array([index], dtype=np.int32)),
+        ("delta_ids.i64", np.array([anime_id], dtype=np.int64)),
+    ):
+        with open(os.path.join(build.path, name), "ab") as delta_file:
+            delta_file.write(value.tobytes())
+    return True
+
+
+class SemanticIndex:
+    """The current build for /api/search/semantic (reloaded when CURRENT changes)"""
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._build = None
+        self._lock = threading.Lock()
+
+    def get_build(self):
+        """The current build, or None when the index has not been built"""
+        directory = self.directory or index_directory()
+        try:
+            with open(os.path.join(directory, "CURRENT")) as current_file:
+                path = os.path.join(directory, current_file.read().strip())
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            if self._build is None or self._build.path != path:
+                self._build = SemanticIndexBuild(path)
+            return self._build
+
+    def clear(self):
+        with self._lock:
+            self._build = None
+
+    def search(self, text, limit, nprobe=DEFAULT_NPROBE):
+        """Best matches as [(anime id, cosine)], or None without an index"""
+        build = self.get_build()
+        if build is None:
+            return None
+        return build.search(text, limit, nprobe)
+
+
+semantic_index = SemanticIndex()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rebuild the semantic search index")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    anime, lists = build_semantic_index(workers=args.workers)
+    print(f"✅ Semantic index: {anime:,} anime in {lists:,} lists ({index_directory()})")
@@ -0,0 +1,131 @@
+from collections import namedtuple
+
+from fastapi import HTTPException
+from sqlalchemy import literal, select, union_all
+from sqlalchemy.orm import Bundle, Session
+from models import Anime, Genre, Studio, anime_genres, anime_studios
+
+# 列表頁面回傳的欄位（順序就是 JSON 的順序）
+SEARCH_FIELDS = (
+    "id", "mal_id", "title", "title_english", "type", "episodes", "score",
+    "year", "season", "members", "image_url", "synopsis",
+)
+
+RECOMMENDATION_FIELDS = (
+    "id", "mal_id", "title", "title_english", "type", "episodes", "score",
+    "year", "season", "members", "favorites", "image_url", "synopsis",
+)
+
+# /api/anime 的欄位
+ANIME_LIST_FIELDS = (
+    "id", "mal_id", "title", "title_english", "type", "episodes", "score",
+    "year", "image_url",
+)
+
+# 每部動漫另外批次讀取的關聯
+RELATIONS = ("genres", "studios")
+
+# fields= 選出的欄位：columns 是 anime 的欄位，relations 是要批次讀取的關聯，
+# extras 是 endpoint 自己算的欄位 (例如 hidden-gems 的 favorites_ratio)
+FieldSelection = namedtuple("FieldSelection", ["columns", "relations", "extras"])
+
+# 單部動漫的完整欄位 (和 /api/anime/{id} 相同，/api/anime/random 用)
+DETAIL_FIELDS = (
+    "id", "mal_id", "title", "title_english", "type", "episodes", "score",
+    "rank", "popularity", "members", "favorites", "year", "season", "image_url",
+    "synopsis", "aired_from", "aired_to", "demographic",
+)
+
+# /api/anime/mal 的欄位 (RelatedWorks 卡片)
+RELATION_FIELDS = (
+    "id", "mal_id", "title", "title_english", "type", "score", "year", "image_url",
+)
+
+
+def select_fields(requested, columns=RECOMMENDATION_FIELDS, relations=RELATIONS, extras=()):
+    """
+    Parse a `fields=` parameter ("title,score,image_url") into a FieldSelection.
+
+    Any list column, relation or one of the endpoint's `extras` can be asked for;
+    `id` is always included. Without the parameter the endpoint's defaults are
+    returned unchanged.
+    """
+    if requested is None:
+        return FieldSelection(columns, relations, extras)
+
+    names = {name.strip() for name in requested.split(",") if name.strip()}
+    unknown = names - set(RECOMMENDATION_FIELDS) - set(RELATIONS) - set(extras)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    # 順序固定用 RECOMMENDATION_FIELDS 的順序，和不指定 fields 時的 JSON 一致
+    return FieldSelection(
+        tuple(field for field in RECOMMENDATION_FIELDS if field == "id" or field in names),
+        tuple(relation for relation in RELATIONS if relation in names),
+        tuple(extra for extra in extras if extra in names),
+    )
+
+
+def anime_columns(columns):
+    """
+    Select only `columns` of anime as plain rows (`row.title` works like on the model).
+
+    List pages are read-only, so they skip ORM instances (identity map, attribute
+    instrumentation, lazy-load state); synopsis etc. are not read unless asked for.
+    """
+    return Bundle("anime", *[getattr(Anime, column) for column in columns], single_entity=True)
+
+
+def load_genres_and_studios(db: Session, anime_ids, relations=RELATIONS):
+    """Fetch genres and studios for a page of anime in one UNION ALL query"""
+    genres_by_anime = {anime_id: [] for anime_id in anime_ids}
+    studios_by_anime = {anime_id: [] for anime_id in anime_ids}
+
+    if not anime_ids:
+        return genres_by_anime, studios_by_anime
+
+    selects = []
+    if "genres" in relations:
+        selects.append(select(
+            anime_genres.c.anime_id, literal("genres"), Genre.id, Genre.name
+        ).join(
+            Genre, Genre.id == anime_genres.c.genre_id
+        ).where(
+            anime_genres.c.anime_id.in_(anime_ids)
+        ))
+    if "studios" in relations:
+        selects.append(select(
+            anime_studios.c.anime_id, literal("studios"), Studio.id, Studio.name
+        ).join(
+            Studio, Studio.id == anime_studios.c.studio_id
+        ).where(
+            anime_studios.c.anime_id.in_(anime_ids)
+        ))
+
+    if not selects:
+        return genres_by_anime, studios_by_anime
+
+    by_relation = {"genres": genres_by_anime, "studios": studios_by_anime}
+    statement = selects[0] if len(selects) == 1 else union_all(*selects)
+    for anime_id, relation, ref_id, ref_name in db.execute(statement):
+        by_relation[relation][anime_id].append({"id": ref_id, "name": ref_name})
+
+    return genres_by_anime, studios_by_anime
+
+
+def serialize_anime_list(db: Session, animes, fields=RECOMMENDATION_FIELDS, relations=RELATIONS):
+    """Serialize a page of anime (models or anime_columns rows) with genres and studios"""
+    genres_by_anime, studios_by_anime = load_genres_and_studios(
+        db, [anime.id for anime in animes], relations
+    )
+
+    results = []
+    for anime in animes:
+        item = {field: getattr(anime, field) for field in fields}
+        if "genres" in relations:
+            item["genres"] = genres_by_anime[anime.id]
+        if "studios" in relations:
+            item["studios"] = studios_by_anime[anime.id]
+        results.append(item)
+
+    return results
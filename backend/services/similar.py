@@ -0,0 +1,274 @@
+"""
+Precomputed "more like this" neighbours from genre / studio / demographic / type / era vectors.
+
+`build_similar_anime()` runs offline (after fetch_and_save.py). Every anime
+becomes a feature vector: one feature per genre, studio, demographic, type
+and era (5-year bucket), each weighted by its group weight times IDF, then
+L2-normalized so a dot product is the cosine similarity.
+
+The low-cardinality groups (genres, demographic, type, era) form a small dense
+block that is multiplied batch by batch with BLAS; studios are a sparse block
+(each anime has one or two) whose products are gathered from per-studio
+posting lists. Each batch of rows gets its top-K neighbours (ties broken by
+id) and everything is written to `similar_anime` in one transaction, so
+/api/anime/{id}/similar is a single indexed read.
+
+Usage (from backend/):
+    python -m services.similar
+"""
+import math
+from collections import defaultdict
+
+import numpy as np
+from sqlalchemy import column, select, table
+
+from models import Anime, Genre, Studio, anime_genres, anime_studios, run_migrations
+from models.database import engine
+
+from .serializers import anime_columns
+
+similar_anime = table(
+    "similar_anime",
+    column("anime_id"), column("rank"), column("neighbor_id"), column("score"),
+)
+
+# 每部動漫保留幾個相似作品
+SIMILAR_K = 20
+
+# 每一組 feature 的權重 (再乘上 IDF：越少見的 genre / studio 越有代表性)
+FEATURE_WEIGHTS = {
+    "genre": 1.0,
+    "studio": 1.0,
+    "demographic": 0.5,
+    "type": 0.5,
+    "era": 0.5,
+}
+
+# 年代：以 5 年為一個區間
+ERA_YEARS = 5
+
+# 一個 batch 的相似度矩陣最多幾格 (float32，64 MB)
+BLOCK_CELLS = 16 * 1024 * 1024
+
+
+def _feature_rows(bind):
+    """(anime ids, {group: [(position, value), ...]}) read from the database"""
+    with bind.connect() as conn:
+        ids = []
+        features = defaultdict(list)
+        for position, (anime_id, anime_type, year, demographic) in enumerate(conn.execute(
+            select(Anime.id, Anime.type, Anime.year, Anime.demographic).order_by(Anime.id)
+        )):
+            ids.append(anime_id)
+            if anime_type is not None:
+                features["type"].append((position, anime_type))
+            if year is not None:
+                features["era"].append((position, year // ERA_YEARS))
+            if demographic is not None:
+                features["demographic"].append((position, demographic))
+
+        positions = {anime_id: position for position, anime_id in enumerate(ids)}
+        for group, association, tag_id, tag in (
+            ("genre", anime_genres, anime_genres.c.genre_id, Genre),
+            ("studio", anime_studios, anime_studios.c.studio_id, Studio),
+        ):
+            for anime_id, name in conn.execute(
+                select(association.c.anime_id, tag.name).join(tag, tag.id == tag_id)
+            ):
+                if anime_id in positions:
+                    features[group].append((positions[anime_id], name))
+
+    return np.array(ids, dtype=np.int64), features
+
+
+def _weighted(entries, size, group):
+    """Column index and IDF weight for each (position, value) entry of one group"""
+    columns = {}
+    document_frequency = defaultdict(int)
+    for _, value in entries:
+        document_frequency[value] += 1
+        columns.setdefault(value, len(columns))
+
+    weight = FEATURE_WEIGHTS[group]
+    idf = {
+        value: weight * (math.log((1 + size) / (1 + count)) + 1)
+        for value, count in document_frequency.items()
+    }
+    positions = np.fromiter((position for position, _ in entries), dtype=np.int64, count=len(entries))
+    indices = np.fromiter((columns[value] for _, value in entries), dtype=np.int64, count=len(entries))
+    values = np.fromiter((idf[value] for _, value in entries), dtype=np.float32, count=len(entries))
+    return positions, indices, values, len(columns)
+
+
+def encode_features(ids, features):
+    """
+    Row-normalized feature matrices: (dense, studio postings, studio rows).
+
+    dense is N x (genres + demographics + types + eras). The studio block is
+    kept twice: as posting lists per studio (indptr, positions, values) and
+    per anime (indptr, studios, values).
+    """
+    size = len(ids)
+    squared_norms = np.zeros(size, dtype=np.float64)
+
+    offset = 0
+    dense_entries = []
+    for group in ("genre", "demographic", "type", "era"):
+        positions, indices, values, width = _weighted(features[group], size, group)
+        dense_entries.append((positions, indices + offset, values))
+        offset += width
+        np.add.at(squared_norms, positions, values.astype(np.float64) ** 2)
+
+    studio_positions, studio_indices, studio_values, studios = _weighted(features["studio"], size, "studio")
+    np.add.at(squared_norms, studio_positions, studio_values.astype(np.float64) ** 2)
+
+    norms = np.sqrt(squared_norms)
+    norms[norms == 0] = 1.0
+
+    dense = np.zeros((size, offset), dtype=np.float32)
+    for positions, indices, values in dense_entries:
+        dense[positions, indices] = values / norms[positions]
+
+    # studio block：依 studio 排序成 posting lists
+    order = np.lexsort((studio_positions, studio_indices))
+    indptr = np.zeros(studios + 1, dtype=np.int64)
+    np.cumsum(np.bincount(studio_indices, minlength=studios), out=indptr[1:])
+    postings = studio_positions[order]
+    posting_values = (studio_values / norms[studio_positions]).astype(np.float32)[order]
+
+    # 每部動漫的 studios (CSR，batch 的 rows 用來找要加哪幾條 posting list)
+    row_order = np.lexsort((studio_indices, studio_positions))
+    row_indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(studio_positions, minlength=size), out=row_indptr[1:])
+    row_studios = studio_indices[row_order]
+    row_values = (studio_values / norms[studio_positions]).astype(np.float32)[row_order]
+
+    return dense, (indptr, postings, posting_values), (row_indptr, row_studios, row_values)
+
+
+def _ragged(starts, lengths):
+    """Concatenated ranges [start, start + length) as one index array"""
+    total = int(lengths.sum())
+    if not total:
+        return np.zeros(0, dtype=np.int64)
+    shifts = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return shifts + np.arange(total, dtype=np.int64)
+
+
+def top_neighbors(scores, k):
+    """
+    Top-k (score desc, position asc) of each row of a batch, excluding zeros.
+
+    Returns (batch row, neighbour position, score, rank) arrays.
+    """
+    width = scores.shape[1]
+    if width > k:
+        # 第 k 大的值；>= 它的都是候選 (同分的全部留下，再依 position 決定)
+        kth = np.partition(scores, width - k, axis=1)[:, width - k]
+        candidates = (scores >= kth[:, None]) & (scores > 0)
+    else:
+        candidates = scores > 0
+
+    batch_rows, positions = np.nonzero(candidates)
+    return rank_candidates(batch_rows, positions, scores[batch_rows, positions], k)
+
+
+def rank_candidates(batch_rows, positions, values, k):
+    """
+    Top-k (score desc, position asc) of each batch row from (row, position, score) candidates.
+
+    Returns (batch row, neighbour position, score, rank) arrays.
+    """
+    order = np.lexsort((positions, -values, batch_rows))
+    batch_rows, positions, values = batch_rows[order], positions[order], values[order]
+
+    # 每個 row 內的名次
+    rank = np.arange(len(batch_rows)) - np.searchsorted(batch_rows, batch_rows, side="left")
+    keep = rank < k
+    return batch_rows[keep], positions[keep], values[keep], rank[keep] + 1
+
+
+def similar_rows(ids, dense, studio_postings, studio_rows, k=SIMILAR_K, batch_size=None):
+    """Yield (anime ids, neighbour ids, scores, ranks) arrays batch by batch"""
+    size = len(ids)
+    indptr, postings, posting_values = studio_postings
+    row_indptr, row_studios, row_values = studio_rows
+    batch_size = batch_size or max(1, min(4096, BLOCK_CELLS // max(size, 1)))
+
+    for start in range(0, size, batch_size):
+        stop = min(start + batch_size, size)
+        batch = np.arange(start, stop)
+
+        # dense block：一般的矩陣乘法
+        scores = dense[start:stop] @ dense.T
+
+        # studio block：batch 裡每個 (row, studio) 加上那個 studio 的 posting list
+        first, last = row_indptr[start], row_indptr[stop]
+        if last > first:
+            entry_rows = np.repeat(np.arange(stop - start), np.diff(row_indptr[start:stop + 1]))
+            studios = row_studios[first:last]
+            weights = row_values[first:last]
+            lengths = indptr[studios + 1] - indptr[studios]
+            hits = _ragged(indptr[studios], lengths)
+            np.add.at(
+                scores,
+                (np.repeat(entry_rows, lengths), postings[hits]),
+                np.repeat(weights, lengths) * posting_values[hits]
+            )
+
+        # 自己不算
+        scores[np.arange(stop - start), batch] = 0
+
+        batch_rows, positions, values, ranks = top_neighbors(scores, k)
+        yield ids[batch[batch_rows]], ids[positions], values, ranks
+
+
+def neighbor_dicts(anime_ids, neighbor_ids, scores, ranks):
+    """One batch of similar_rows() as similar_anime rows"""
+    return [
+        {"anime_id": anime_id, "rank": rank, "neighbor_id": neighbor_id, "score": round(score, 4)}
+        for anime_id, rank, neighbor_id, score in zip(
+            anime_ids.tolist(), ranks.tolist(), neighbor_ids.tolist(), scores.tolist()
+        )
+    ]
+
+
+def build_similar_anime(bind=engine, k=SIMILAR_K):
+    """Rebuild similar_anime from the feature vectors; returns (anime, neighbour rows)"""
+    ids, features = _feature_rows(bind)
+    dense, studio_postings, studio_rows = encode_features(ids, features)
+
+    # 同一個 transaction 裡整批替換，讀取端不會看到一半的結果；
+    # 每個 batch 算完就寫入，不用把全部的 rows 留在記憶體裡
+    total = 0
+    with bind.begin() as conn:
+        conn.execute(similar_anime.delete())
+        for batch in similar_rows(ids, dense, studio_postings, studio_rows, k):
+            rows = neighbor_dicts(*batch)
+            if rows:
+                conn.execute(similar_anime.insert(), rows)
+                total += len(rows)
+
+    return len(ids), total
+
+
+def load_similar(db, anime_id, columns, limit=SIMILAR_K, neighbors=None):
+    """
+    `anime_id`'s neighbours as (anime_columns row, score), most similar first.
+
+    `neighbors` is another table with the same columns as similar_anime
+    (synopsis_similar); None reads similar_anime.
+    """
+    if neighbors is None:
+        neighbors = similar_anime
+    return db.query(anime_columns(columns), neighbors.c.score).select_from(neighbors).join(
+        Anime, Anime.id == neighbors.c.neighbor_id
+    ).filter(
+        neighbors.c.anime_id == anime_id
+    ).order_by(neighbors.c.rank).limit(limit).all()
+
+
+if __name__ == "__main__":
+    run_migrations()
+    anime, neighbors = build_similar_anime()
+    print(f"✅ {neighbors:,} similar anime rows ({anime:,} anime)")
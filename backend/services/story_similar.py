@@ -0,0 +1,330 @@
+"""
+Precomputed "similar by story" neighbours from TF-IDF vectors of the synopses.
+
+`build_synopsis_similar()` runs offline (after fetch_and_save.py) in three
+passes, each split into id ranges / row blocks across a process pool:
+
+1. document frequency of every hashed word unigram and bigram
+2. TF-IDF vectors (sublinear tf, L2-normalized); each anime keeps only its
+   DOC_TERMS heaviest terms
+3. top-K neighbours of a block of rows, accumulated from per-term posting
+   lists that keep the MAX_POSTINGS heaviest anime of each term
+
+Terms are hashed into 2**HASH_BITS features, so there is no vocabulary to
+build or store. The pruned vectors and posting lists are saved as .npy files
+that the workers memory-map, and blocks are cut so one block never gathers
+more than BLOCK_HITS candidate scores; memory stays flat however many anime
+there are. Scores are the cosine over the kept terms (the heaviest terms
+dominate the dot product; dropping the rest keeps the build linear).
+
+Usage (from backend/):
+    python -m services.story_similar [--workers N]
+"""
+import os
+import tempfile
+import zlib
+from itertools import chain
+from multiprocessing import get_context
+
+import numpy as np
+from sqlalchemy import column, create_engine, select, table
+
+from models import Anime, run_migrations
+from models.database import engine
+
+from .similar import SIMILAR_K, _ragged, neighbor_dicts, rank_candidates
+from .text_search import TOKEN_PATTERN
+
+synopsis_similar = table(
+    "synopsis_similar",
+    column("anime_id"), column("rank"), column("neighbor_id"), column("score"),
+)
+
+# hashed features：2**20 個 (不需要建立 / 儲存字典)
+HASH_BITS = 20
+FEATURES = 1 << HASH_BITS
+
+# 每部動漫只保留最重的幾個 terms
+DOC_TERMS = 64
+
+# 出現在超過一半 synopsis 裡的 term 幾乎沒有區別力 (the / of / ...)，不拿來找候選
+MAX_DF = 0.5
+
+# 每個 term 的 posting list 只保留最重的幾部
+MAX_POSTINGS = 256
+
+# pass 1 / 2：每個 task 讀幾部動漫
+CHUNK_ROWS = 20000
+
+# pass 3：一個 block 最多累加幾筆 (row, neighbour) 分數
+BLOCK_HITS = 4 * 1024 * 1024
+
+# 累加分數時每筆 weight 乘積量化成幾個 bits (誤差 < 1e-6)
+WEIGHT_BITS = 20
+WEIGHT_MASK = (1 << WEIGHT_BITS) - 1
+
+# pass 3 workers 讀的陣列 (目錄裡的 .npy)
+ARRAY_NAMES = ("indptr", "terms", "weights", "posting_indptr", "postings", "posting_weights")
+
+
+def hashed_terms(text):
+    """{feature: count} of the word unigrams and bigrams of `text`"""
+    words = TOKEN_PATTERN.findall(text.lower())
+    counts = {}
+    for term in chain(words, map(" ".join, zip(words, words[1:]))):
+        feature = zlib.crc32(term.encode()) & (FEATURES - 1)
+        counts[feature] = counts.get(feature, 0) + 1
+    return counts
+
+
+def inverse_document_frequency(document_frequency, documents):
+    """Smoothed IDF of every feature (as in scikit-learn's TfidfTransformer)"""
+    return (np.log((1 + documents) / (1 + document_frequency.astype(np.float64))) + 1).astype(np.float32)
+
+
+# ---- workers (每個 process 各自連線 / 讀取 memory-mapped 陣列) ----
+
+_engines = {}
+_arrays = {}
+
+
+def _synopses(url, first_id, last_id):
+    if url not in _engines:
+        _engines[url] = create_engine(url)
+    with _engines[url].connect() as conn:
+        return conn.execute(
+            select(Anime.id, Anime.synopsis).where(
+                Anime.id.between(first_id, last_id), Anime.synopsis.isnot(None)
+            ).order_by(Anime.id)
+        ).all()
+
+
+def _load_arrays(directory):
+    if directory not in _arrays:
+        _arrays.clear()
+        _arrays[directory] = [
+            np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in ARRAY_NAMES
+        ]
+    return _arrays[directory]
+
+
+def _document_frequency(task):
+    """Pass 1: (documents, df of every feature) of one id range"""
+    url, first_id, last_id = task
+    features = [hashed_terms(synopsis) for _, synopsis in _synopses(url, first_id, last_id)]
+    features = [counts for counts in features if counts]
+    return len(features), np.bincount(
+        np.fromiter(chain.from_iterable(features), dtype=np.int64), minlength=FEATURES
+    ).astype(np.int32)
+
+
+def _top_terms(task):
+    """Pass 2: (anime ids, terms per anime, terms, weights) of one id range, DOC_TERMS per anime"""
+    url, directory, first_id, last_id = task
+    idf = np.load(os.path.join(directory, "idf.npy"), mmap_mode="r")
+    searchable = np.load(os.path.join(directory, "searchable.npy"), mmap_mode="r")
+
+    ids, rows, features, tf = [], [], [], []
+    for anime_id, synopsis in _synopses(url, first_id, last_id):
+        counts = hashed_terms(synopsis)
+        if counts:
+            rows.extend([len(ids)] * len(counts))
+            ids.append(anime_id)
+            features.extend(counts.keys())
+            tf.extend(counts.values())
+
+    rows = np.array(rows, dtype=np.int64)
+    features = np.array(features, dtype=np.int64)
+    weights = (1 + np.log(np.array(tf, dtype=np.float32))) * idf[features]
+    norms = np.sqrt(np.bincount(rows, weights=weights.astype(np.float64) ** 2, minlength=len(ids)))
+    weights /= norms[rows]
+
+    # 只留下可以找候選的 terms，每部動漫取最重的 DOC_TERMS 個
+    keep = searchable[features]
+    rows, features, weights = rows[keep], features[keep], weights[keep]
+    order = np.lexsort((features, -weights, rows))
+    rows, features, weights = rows[order], features[order], weights[order]
+    keep = np.arange(len(rows)) - np.searchsorted(rows, rows, side="left") < DOC_TERMS
+    rows, features, weights = rows[keep], features[keep], weights[keep]
+
+    return (
+        np.array(ids, dtype=np.int64),
+        np.bincount(rows, minlength=len(ids)).astype(np.int64),
+        features.astype(np.int32),
+        weights.astype(np.float32),
+    )
+
+
+def _block_neighbors(task):
+    """Pass 3: top-k (row, neighbour position, score, rank) of rows [start, stop)"""
+    directory, start, stop, k = task
+    indptr, terms, weights, posting_indptr, postings, posting_weights = _load_arrays(directory)
+
+    first, last = indptr[start], indptr[stop]
+    block_terms = np.asarray(terms[first:last], dtype=np.int64)
+    entry_rows = np.repeat(np.arange(stop - start), np.diff(indptr[start:stop + 1]))
+    lengths = posting_indptr[block_terms + 1] - posting_indptr[block_terms]
+    hits = _ragged(posting_indptr[block_terms], lengths)
+
+    # 同一組 (row, neighbour) 的分數加總：量化的分數放在 key 的低位，
+    # 只要排序一個 int64 陣列 (比 argsort / np.unique 快很多)
+    size = len(indptr) - 1
+    contributions = np.repeat(weights[first:last], lengths) * posting_weights[hits]
+    keys = (np.repeat(entry_rows, lengths) * size + postings[hits]) << WEIGHT_BITS
+    keys |= np.rint(contributions * WEIGHT_MASK).astype(np.int64)
+    keys.sort()
+    pairs = keys >> WEIGHT_BITS
+    starts = np.flatnonzero(np.concatenate(([True], pairs[1:] != pairs[:-1])))
+    totals = np.add.reduceat(keys & WEIGHT_MASK, starts)
+    batch_rows, positions = np.divmod(pairs[starts], size)
+
+    # 自己不算
+    other = positions != batch_rows + start
+    batch_rows, positions, totals = batch_rows[other], positions[other], totals[other]
+
+    # 依 (row, 分數 desc, position asc) 排序：一樣包成一個 int64 來排
+    max_total = DOC_TERMS * WEIGHT_MASK
+    position_bits = size.bit_length()
+    row_shift = max_total.bit_length() + position_bits
+    if row_shift + (stop - start).bit_length() > 62:
+        batch_rows, positions, values, ranks = rank_candidates(batch_rows, positions, totals, k)
+    else:
+        ranked = batch_rows << row_shift | (max_total - totals) << position_bits | positions
+        ranked.sort()
+        batch_rows = ranked >> row_shift
+        rank = np.arange(len(ranked)) - np.searchsorted(batch_rows, np.arange(stop - start))[batch_rows]
+        keep = rank < k
+        ranked, batch_rows, ranks = ranked[keep], batch_rows[keep], rank[keep] + 1
+        positions = ranked & ((1 << position_bits) - 1)
+        values = max_total - ((ranked >> position_bits) & ((1 << max_total.bit_length()) - 1))
+
+    return batch_rows + start, positions, (values / WEIGHT_MASK).astype(np.float32), ranks
+
+
+def _map(pool, function, tasks):
+    return pool.imap(function, tasks) if pool else map(function, tasks)
+
+
+# ---- build ----
+
+def id_ranges(bind, chunk_rows=CHUNK_ROWS):
+    """(first id, last id) of consecutive chunks of anime"""
+    with bind.connect() as conn:
+        ids = conn.execute(select(Anime.id).order_by(Anime.id)).scalars().all()
+    return [(ids[start], ids[min(start + chunk_rows, len(ids)) - 1]) for start in range(0, len(ids), chunk_rows)]
+
+
+def document_frequencies(pool, url, ranges):
+    """Pass 1: (documents, df) over all synopses"""
+    documents = 0
+    document_frequency = np.zeros(FEATURES, dtype=np.int64)
+    for chunk_documents, chunk_frequency in _map(
+        pool, _document_frequency, [(url, first_id, last_id) for first_id, last_id in ranges]
+    ):
+        documents += chunk_documents
+        document_frequency += chunk_frequency
+    return documents, document_frequency
+
+
+def pruned_vectors(pool, url, directory, ranges, documents, document_frequency):
+    """Pass 2: anime ids and the pruned CSR vectors (indptr, terms, weights)"""
+    np.save(os.path.join(directory, "idf.npy"), inverse_document_frequency(document_frequency, documents))
+    # 只出現一次的 term 找不到別的動漫；太常見的 term 沒有區別力
+    np.save(
+        os.path.join(directory, "searchable.npy"),
+        (document_frequency >= 2) & (document_frequency <= max(2, MAX_DF * documents))
+    )
+
+    chunks = list(_map(
+        pool, _top_terms, [(url, directory, first_id, last_id) for first_id, last_id in ranges]
+    ))
+    ids = np.concatenate([chunk[0] for chunk in chunks])
+    indptr = np.zeros(len(ids) + 1, dtype=np.int64)
+    np.cumsum(np.concatenate([chunk[1] for chunk in chunks]), out=indptr[1:])
+    terms = np.concatenate([chunk[2] for chunk in chunks])
+    weights = np.concatenate([chunk[3] for chunk in chunks])
+    return ids, indptr, terms, weights
+
+
+def save_postings(directory, indptr, terms, weights):
+    """Posting lists (heaviest MAX_POSTINGS anime per term) next to the vectors; returns the row blocks"""
+    rows = np.repeat(np.arange(len(indptr) - 1, dtype=np.int32), np.diff(indptr))
+    # lexsort 是 stable 的：同樣 weight 的依 row (id) 順序
+    order = np.lexsort((-weights, terms))
+    posting_terms = terms[order]
+    keep = np.arange(len(order)) - np.searchsorted(posting_terms, posting_terms, side="left") < MAX_POSTINGS
+    order = order[keep]
+
+    posting_indptr = np.zeros(FEATURES + 1, dtype=np.int64)
+    np.cumsum(np.bincount(terms[order], minlength=FEATURES), out=posting_indptr[1:])
+    for name, values in zip(ARRAY_NAMES, (indptr, terms, weights, posting_indptr, rows[order], weights[order])):
+        np.save(os.path.join(directory, f"{name}.npy"), values)
+
+    # 每個 row 會累加幾筆分數 → 切成不超過 BLOCK_HITS 的 blocks
+    row_hits = np.bincount(rows, weights=np.diff(posting_indptr)[terms], minlength=len(indptr) - 1)
+    cumulative = np.zeros(len(indptr), dtype=np.int64)
+    np.cumsum(row_hits.astype(np.int64), out=cumulative[1:])
+    blocks = []
+    start = 0
+    while start < len(indptr) - 1:
+        stop = int(np.searchsorted(cumulative, cumulative[start] + BLOCK_HITS, side="right")) - 1
+        stop = min(max(stop, start + 1), len(indptr) - 1)
+        blocks.append((start, stop))
+        start = stop
+    return blocks
+
+
+def synopsis_neighbors(pool, directory, blocks, k=SIMILAR_K):
+    """Pass 3: yield (row positions, neighbour positions, scores, ranks) block by block"""
+    return _map(pool, _block_neighbors, [(directory, start, stop, k) for start, stop in blocks])
+
+
+def build_synopsis_similar(bind=engine, k=SIMILAR_K, workers=None):
+    """Rebuild synopsis_similar from the synopses; returns (anime, neighbour rows)"""
+    workers = workers or os.cpu_count() or 1
+    url = bind.url.render_as_string(hide_password=False)
+    ranges = id_ranges(bind)
+    if not ranges:
+        with bind.begin() as conn:
+            conn.execute(synopsis_similar.delete())
+        return 0, 0
+
+    with tempfile.TemporaryDirectory(prefix="synopsis_similar_") as directory:
+        pool = get_context().Pool(workers) if workers > 1 else None
+        try:
+            documents, document_frequency = document_frequencies(pool, url, ranges)
+            ids, indptr, terms, weights = pruned_vectors(
+                pool, url, directory, ranges, documents, document_frequency
+            )
+            blocks = save_postings(directory, indptr, terms, weights)
+            del document_frequency, indptr, terms, weights
+
+            # 同一個 transaction 裡整批替換；每個 block 算完就寫入
+            total = 0
+            with bind.begin() as conn:
+                conn.execute(synopsis_similar.delete())
+                for rows, positions, scores, ranks in synopsis_neighbors(pool, directory, blocks, k):
+                    batch = neighbor_dicts(ids[rows], ids[positions], scores, ranks)
+                    if batch:
+                        conn.execute(synopsis_similar.insert(), batch)
+                        total += len(batch)
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+            # Windows 上 memory-mapped 的檔案要先關掉才能刪除
+            _arrays.clear()
+
+    return len(ids), total
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rebuild synopsis_similar")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    run_migrations()
+    anime, neighbors = build_synopsis_similar(workers=args.workers)
+    print(f"✅ {neighbors:,} synopsis neighbour rows ({anime:,} anime)")
@@ -0,0 +1,29 @@
+import re
+
+from sqlalchemy import column, func, literal_column, select, table
+
+# FTS5 virtual table (由 models/migrations.py 建立，不放在 Base.metadata 裡，
+# 否則 create_all 會把它建成一般的 table)
+anime_fts = table("anime_fts", column("rowid"))
+
+# bm25 欄位權重：title, title_english, synopsis
+BM25_WEIGHTS = (10.0, 5.0, 1.0)
+
+# 與 FTS5 unicode61 tokenizer 一致：底線也是分隔符號
+TOKEN_PATTERN = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def build_match_expression(q):
+    """Turn user input into an FTS5 query where every word must match as a prefix"""
+    tokens = TOKEN_PATTERN.findall(q.lower())
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def text_search_subquery(match_expression):
+    """Matching anime ids with their bm25 rank (lower is more relevant)"""
+    return select(
+        anime_fts.c.rowid.label("anime_id"),
+        func.bm25(literal_column("anime_fts"), *BM25_WEIGHTS).label("rank")
+    ).where(
+        literal_column("anime_fts").op("MATCH")(match_expression)
+    ).subquery("text_search")
@@ -0,0 +1,252 @@
+"""
+Typeahead suggestions for /api/search/suggest from an in-memory prefix index.
+
+Every anime contributes its normalised title and title_english as keys of one
+sorted list; the anime whose titles start with a prefix are then the slice
+between two bisects. Ranking a slice by members is cheap while it is short, so
+only "heavy" prefixes (more than HEAVY_RANGE keys, e.g. "a" or "the") keep a
+precomputed top SUGGEST_TOP. A heavy prefix's top list is merged from its
+children's (one character longer), so building all of them is one pass over the
+keys instead of one pass per prefix.
+
+When the data version changes, the anime written since the last build are read
+from title_suggest_changes (filled by triggers, see models/migrations.py) and
+only their keys and the top lists of their prefixes are patched. Large batches
+(e.g. update_anime_stats touching every members count) are rebuilt from scratch
+on a background thread (services/data_version.VersionedBuild); requests keep
+getting the previous index until the new one is swapped in.
+"""
+import heapq
+import re
+import unicodedata
+from bisect import bisect_left
+
+from sqlalchemy import select, text
+
+from models import Anime
+
+from .data_version import VersionedBuild, get_data_version
+
+# 一個 prefix 最多回傳幾個建議
+SUGGEST_TOP = 10
+# 超過這麼多個 keys 的 prefix 預先算好 top list，其他的查詢時直接掃
+HEAVY_RANGE = 256
+# 一次改動超過這麼多部動漫就在背景整個重建
+INCREMENTAL_LIMIT = 5000
+
+# 比所有字元都大：prefix + END 是 prefix 範圍的上界
+END = "\U0010ffff"
+
+NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_title(value):
+    """Lower-case, accent-free, single-spaced title (punctuation becomes a space)"""
+    if not value:
+        return ""
+    if value.isascii():
+        # 大部分 titles 都是 ASCII：結果和下面一樣，快一倍
+        return NON_ALNUM.sub(" ", value.lower()).strip()
+    decomposed = unicodedata.normalize("NFKD", value.casefold())
+    characters = [
+        character if character.isalnum() else " "
+        for character in decomposed
+        if not unicodedata.combining(character)
+    ]
+    return " ".join("".join(characters).split())
+
+
+class TitlePrefixes:
+    """Sorted title keys plus top lists for heavy prefixes (one build of the index)"""
+
+    def __init__(self):
+        self._keys = []       # 排好的 normalized titles
+        self._key_ids = []    # 和 _keys 對應的 anime id
+        self._anime = {}      # id → (members, title, image_url, keys)
+        self._top = {}        # heavy prefix → 依 members 排好的 ids
+
+    def _rank(self, anime_id):
+        # members 多的在前，一樣多時 id 小的在前
+        return self._anime[anime_id][0], -anime_id
+
+    def _scan(self, lo, hi):
+        """Top ids of a short key range (an anime can match with both of its titles)"""
+        return heapq.nlargest(SUGGEST_TOP, set(self._key_ids[lo:hi]), key=self._rank)
+
+    def _range_top(self, prefix, lo, hi):
+        """
+        Top ids of the keys starting with `prefix` (keys[lo:hi]). Heavy ranges are
+        merged from their children, whose top lists must already be up to date.
+        """
+        if hi - lo <= HEAVY_RANGE:
+            self._top.pop(prefix, None)
+            return self._scan(lo, hi)
+
+        depth = len(prefix)
+        candidates = set()
+        position = lo
+        # 剛好等於 prefix 的 keys 排在最前面
+        while position < hi and len(self._keys[position]) == depth:
+            candidates.add(self._key_ids[position])
+            position += 1
+        while position < hi:
+            child = self._keys[position][:depth + 1]
+            end = bisect_left(self._keys, child + END, position, hi)
+            if end - position > HEAVY_RANGE:
+                candidates.update(self._top[child])
+            else:
+                candidates.update(self._key_ids[position:end])
+            position = end
+
+        top = heapq.nlargest(SUGGEST_TOP, candidates, key=self._rank)
+        if prefix:
+            self._top[prefix] = top
+        return top
+
+    def _build_top(self, prefix, lo, hi):
+        # post-order：先算好 heavy children，再合併成 parent
+        if hi - lo > HEAVY_RANGE:
+            depth = len(prefix)
+            position = lo
+            while position < hi and len(self._keys[position]) == depth:
+                position += 1
+            while position < hi:
+                child = self._keys[position][:depth + 1]
+                end = bisect_left(self._keys, child + END, position, hi)
+                self._build_top(child, position, end)
+                position = end
+        return self._range_top(prefix, lo, hi)
+
+    def build(self, db):
+        entries = []
+        rows = db.execute(select(Anime.id, Anime.title, Anime.title_english, Anime.members, Anime.image_url))
+        for anime_id, title, title_english, members, image_url in rows:
+            keys = tuple({key for key in (normalize_title(title), normalize_title(title_english)) if key})
+            self._anime[anime_id] = (members or 0, title, image_url, keys)
+            entries.extend((key, anime_id) for key in keys)
+        entries.sort()
+        self._keys = [key for key, _ in entries]
+        self._key_ids = [anime_id for _, anime_id in entries]
+        self._build_top("", 0, len(self._keys))
+        return self
+
+    def _position(self, key, anime_id):
+        """Where (key, anime_id) is, or would go, in the (key, id) order of the keys"""
+        position = bisect_left(self._keys, key)
+        while position < len(self._keys) and self._keys[position] == key and self._key_ids[position] < anime_id:
+            position += 1
+        return position
+
+    def _splice(self, removed, added):
+        """
+        Remove and insert (key, id) entries with one copy of the lists: slices are
+        C memcpy, while list.insert / del would shift the whole tail once per entry.
+        """
+        for entries, inserting in ((removed, False), (added, True)):
+            keys, key_ids, start = [], [], 0
+            # 依 (key, id) 排好，位置只會往後
+            for key, anime_id in sorted(entries):
+                position = self._position(key, anime_id)
+                keys += self._keys[start:position]
+                key_ids += self._key_ids[start:position]
+                if inserting:
+                    keys.append(key)
+                    key_ids.append(anime_id)
+                    start = position
+                else:
+                    start = position + 1
+            keys += self._keys[start:]
+            key_ids += self._key_ids[start:]
+            self._keys, self._key_ids = keys, key_ids
+
+    def patch(self, db, anime_ids):
+        """Re-read the given anime and update their keys and every top list they can be in"""
+        rows = {
+            anime_id: row for anime_id, *row in db.execute(
+                select(Anime.id, Anime.title, Anime.title_english, Anime.members, Anime.image_url)
+                .where(Anime.id.in_(anime_ids))
+            )
+        }
+        removed, added = [], []
+        for anime_id in anime_ids:
+            old = self._anime.pop(anime_id, None)
+            if old is not None:
+                removed.extend((key, anime_id) for key in old[3])
+            if anime_id in rows:
+                title, title_english, members, image_url = rows[anime_id]
+                keys = tuple({key for key in (normalize_title(title), normalize_title(title_english)) if key})
+                self._anime[anime_id] = (members or 0, title, image_url, keys)
+                added.extend((key, anime_id) for key in keys)
+        self._splice(removed, added)
+
+        prefixes = {key[:length] for key, _ in removed + added for length in range(1, len(key) + 1)}
+        # 長的 prefix 先算，parent 合併時 children 已經是新的；不是 heavy 的只要拿掉舊的 top list
+        for prefix in sorted(prefixes, key=len, reverse=True):
+            lo = bisect_left(self._keys, prefix)
+            hi = bisect_left(self._keys, prefix + END, lo)
+            if hi - lo > HEAVY_RANGE:
+                self._range_top(prefix, lo, hi)
+            else:
+                self._top.pop(prefix, None)
+
+    def suggest(self, key, limit):
+        """Up to `limit` (id, title, image_url) whose keys start with the normalised `key`"""
+        lo = bisect_left(self._keys, key)
+        hi = bisect_left(self._keys, key + END, lo)
+        if hi - lo > HEAVY_RANGE:
+            top = self._top[key]
+        else:
+            top = self._scan(lo, hi)
+        return [(anime_id, *self._anime[anime_id][1:3]) for anime_id in top[:limit]]
+
+
+class TitleSuggestIndex(VersionedBuild):
+    """
+    The title prefixes, patched in place for small changes and rebuilt in the
+    background for large ones
+    """
+
+    def build(self, db):
+        return TitlePrefixes().build(db)
+
+    def refresh(self, db):
+        """The prefixes, patched up to the current data version unless too much has changed"""
+        if self.value is None:
+            self.build_now()
+        with self._lock:
+            prefixes, since = self.value, self.version
+        version = get_data_version(db)
+        if version == since:
+            return prefixes
+
+        # >=：trigger 記下的可能是 +1 之前或之後的版本，多 patch 一次也沒關係
+        changed = [anime_id for anime_id, in db.execute(
+            text("SELECT anime_id FROM title_suggest_changes WHERE version >= :version LIMIT :limit"),
+            {"version": since, "limit": INCREMENTAL_LIMIT + 1}
+        )]
+        if len(changed) > INCREMENTAL_LIMIT:
+            # 整個重建要好幾秒：交給背景 thread，換上之前繼續用舊的
+            self._schedule()
+            return prefixes
+
+        with self._lock:
+            # 等 lock 的時候別的 request 已經 patch 過，或背景重建已經換上新的：下一個 request 再看
+            if self.value is prefixes and self.version == since:
+                if changed:
+                    prefixes.patch(db, changed)
+                self.version = version
+            return self.value
+
+    def suggest(self, db, prefix, limit=SUGGEST_TOP):
+        """Up to `limit` (id, title, image_url) whose title or English title starts with `prefix`"""
+        prefixes = self.refresh(db)
+        key = normalize_title(prefix)
+        if not key:
+            return []
+
+        # patch 是在原地改 lists / dicts，讀的時候也要拿 lock
+        with self._lock:
+            return prefixes.suggest(key, limit)
+
+
+title_suggest_index = TitleSuggestIndex()
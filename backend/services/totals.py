@@ -0,0 +1,62 @@
+import threading
+from collections import OrderedDict
+
+from .data_version import get_data_version
+
+
+def filter_key(name, **filters):
+    """
+    Normalized cache key for a listing and its filters.
+
+    List values are de-duplicated and sorted so "Action,Comedy" and
+    "Comedy,Action" share one entry; None / empty filters are dropped.
+    """
+    parts = [name]
+    for field in sorted(filters):
+        value = filters[field]
+        if value is None or value == [] or value == "":
+            continue
+        if isinstance(value, (list, tuple, set)):
+            value = tuple(sorted(set(value)))
+        parts.append((field, value))
+    return tuple(parts)
+
+
+class TotalsCache:
+    """LRU of row counts per filter key, valid for one data version"""
+
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_total(self, db, key, count):
+        version = get_data_version(db)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        total = count()
+
+        with self._lock:
+            self._entries[key] = (version, total)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return total
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+totals_cache = TotalsCache()
+
+
+def cached_total(db, key, query):
+    """Row count of `query`, cached per filter key until the data version changes"""
+    return totals_cache.get_total(db, key, query.count)
@@ -1,12 +1,23 @@
 import requests
 import time
-from sqlalchemy import create_engine, and_, or_
+from sqlalchemy import create_engine, and_, or_, text
 from sqlalchemy.orm import sessionmaker
 from database import Anime, Genre, Studio, Base
 from datetime import datetime
+import argparse
+import json
+import os
+import sys
+
+# backend/ 的 models / services：收集完成後重建 Discover 排行
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+from models import run_migrations
+from models.database import apply_sqlite_profile
+from services import refresh_ranked_lists, build_franchises, build_similar_anime, build_synopsis_similar
+from services import build_semantic_index, add_to_semantic_index
 
 # Connect to database
-engine = create_engine('sqlite:///anime.db')
+engine = apply_sqlite_profile(create_engine('sqlite:///anime.db'))
 Session = sessionmaker(bind=engine)
 session = Session()
 
@@ -117,13 +128,21 @@ def save_anime(anime_data):
             anime.studios.append(studio)
         
         session.commit()
-        print(f"✅ Saved: {anime_data['title']}")
-        return True
         
     except Exception as e:
         print(f"❌ Error saving {anime_data.get('title', 'Unknown')}: {str(e)}")
         session.rollback()
         return False
+    
+    print(f"✅ Saved: {anime_data['title']}")
+    
+    # 語意搜尋 index：新的動漫直接 append 到 delta (還沒有 index 時略過)
+    # 已經 commit 了：append 失敗只印出來，下次重建 index 時會補上
+    try:
+        add_to_semantic_index(anime.id, anime.synopsis, engine)
+    except Exception as e:
+        print(f"  ⚠️ 語意搜尋 index 沒有更新: {str(e)}")
+    return True
 
 def clean_unused_studios():
     """清理沒有關聯任何 anime 的 studios"""
@@ -259,8 +278,177 @@ def collect_anime_by_years(start_year, end_year):
     print(f"{'='*60}\n")
 
 
+def fetch_relations(mal_id):
+    """從 Jikan 取得一部動漫的 relations (Jikan 的 data list)，失敗回傳 None"""
+    while True:
+        response = requests.get(f"{BASE_URL}/anime/{mal_id}/relations")
+        
+        if response.status_code == 200:
+            return response.json()['data']
+        
+        elif response.status_code == 429:
+            print("  ⏸️  達到速率限制,等待 60 秒...")
+            time.sleep(60)
+            continue
+        
+        elif response.status_code == 404:
+            return []
+        
+        print(f"  ❌ HTTP 錯誤 {response.status_code}")
+        return None
+
+def save_relations(mal_id, relations_data):
+    """寫入一部動漫的 relations (只保留 anime，manga 等略過)"""
+    rows = []
+    for relation_group in relations_data:
+        for entry in relation_group.get('entry', []):
+            if entry.get('type') != 'anime':
+                continue
+            rows.append({
+                'anime_mal_id': mal_id,
+                'related_mal_id': entry['mal_id'],
+                'relation': relation_group['relation'],
+                'related_title': entry.get('name')
+            })
+    
+    # 重新抓取時整批替換
+    session.execute(
+        text("DELETE FROM anime_relations WHERE anime_mal_id = :mal_id"),
+        {'mal_id': mal_id}
+    )
+    if rows:
+        session.execute(
+            text(
+                "INSERT OR IGNORE INTO anime_relations "
+                "(anime_mal_id, related_mal_id, relation, related_title) "
+                "VALUES (:anime_mal_id, :related_mal_id, :relation, :related_title)"
+            ),
+            rows
+        )
+    session.execute(
+        text("INSERT OR REPLACE INTO relations_fetched (anime_mal_id, fetched_at) VALUES (:mal_id, :fetched_at)"),
+        {'mal_id': mal_id, 'fetched_at': datetime.now().isoformat(timespec='seconds')}
+    )
+    session.commit()
+    return len(rows)
+
+def collect_relations(fixture_path=None, refetch=False):
+    """
+    收集資料庫內所有動漫的 relations，完成後重建 franchise
+    
+    fixture_path: 本機 JSON ({"mal_id": Jikan relations 的 data list})，
+                  指定時不連 Jikan (測試用)
+    refetch: 已經抓過的也重新抓
+    """
+    run_migrations(engine)
+    
+    fixture = None
+    if fixture_path:
+        with open(fixture_path, encoding='utf-8') as f:
+            fixture = {int(mal_id): data for mal_id, data in json.load(f).items()}
+    
+    mal_ids = [mal_id for mal_id, in session.query(Anime.mal_id).order_by(Anime.id).all()]
+    if not refetch:
+        fetched = {
+            mal_id for mal_id, in session.execute(text("SELECT anime_mal_id FROM relations_fetched"))
+        }
+        mal_ids = [mal_id for mal_id in mal_ids if mal_id not in fetched]
+    if fixture is not None:
+        # 只處理 fixture 裡有的動漫：其他的不能記成「已抓過、沒有 relations」，否則之後連 Jikan 時會被跳過
+        mal_ids = [mal_id for mal_id in mal_ids if mal_id in fixture]
+    
+    print(f"\n{'='*60}")
+    print(f"🔗 開始收集 {len(mal_ids)} 部動漫的 relations" + (f" (fixture: {fixture_path})" if fixture else ""))
+    print(f"{'='*60}\n")
+    
+    total_relations = 0
+    total_errors = 0
+    
+    for i, mal_id in enumerate(mal_ids, 1):
+        if fixture is not None:
+            relations_data = fixture[mal_id]
+        else:
+            try:
+                relations_data = fetch_relations(mal_id)
+            except Exception as e:
+                print(f"  ❌ 發生錯誤: {str(e)}")
+                relations_data = None
+            time.sleep(0.35)  # ~3 requests per second
+        
+        if relations_data is None:
+            total_errors += 1
+            continue
+        
+        total_relations += save_relations(mal_id, relations_data)
+        
+        if i % 100 == 0:
+            print(f"  📊 進度: {i}/{len(mal_ids)} | relations: {total_relations}")
+    
+    franchises, members = build_franchises(engine)
+    
+    print(f"\n{'='*60}")
+    print("🎉 Relations 收集完成！")
+    print(f"{'='*60}")
+    print(f"🔗 新增 relations: {total_relations} 筆")
+    print(f"🏯 Franchise: {franchises} 個 ({members} 部動漫)")
+    print(f"❌ 發生錯誤: {total_errors} 次")
+    print(f"{'='*60}\n")
+
+
+def refresh_discover_rankings():
+    """重建 Discover 排行 (ranked_lists)，API 之後直接讀預先排好的列表"""
+    run_migrations(engine)
+    totals = refresh_ranked_lists(engine)
+    
+    print(f"\n{'='*60}")
+    print("🏆 Discover 排行已更新")
+    for category, total in totals.items():
+        print(f"   {category}: {total:,} 部")
+    print(f"{'='*60}")
+
+
+def refresh_similar_anime():
+    """重建「相似作品」(similar_anime)，/api/anime/{id}/similar 直接讀預先算好的結果"""
+    run_migrations(engine)
+    anime, neighbors = build_similar_anime(engine)
+    
+    print(f"\n{'='*60}")
+    print(f"🧭 相似作品已更新: {anime:,} 部動漫 ({neighbors:,} 筆)")
+    print(f"{'='*60}")
+
+
+def refresh_synopsis_similar():
+    """重建「劇情相似」(synopsis_similar)，/api/anime/{id}/similar?by=story 直接讀預先算好的結果"""
+    run_migrations(engine)
+    anime, neighbors = build_synopsis_similar(engine)
+    
+    print(f"\n{'='*60}")
+    print(f"📖 劇情相似已更新: {anime:,} 部動漫 ({neighbors:,} 筆)")
+    print(f"{'='*60}")
+
+
+def refresh_semantic_index():
+    """重建語意搜尋的 IVF index (/api/search/semantic)，把收集時 append 的動漫併進來"""
+    anime, lists = build_semantic_index(engine)
+    
+    print(f"\n{'='*60}")
+    print(f"🔎 語意搜尋 index 已更新: {anime:,} 部動漫 ({lists:,} lists)")
+    print(f"{'='*60}")
+
+
 # 主程式
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="從 Jikan 收集動漫資料")
+    parser.add_argument("--relations-only", action="store_true", help="只收集 relations 並重建 franchise")
+    parser.add_argument("--fixture", help="從本機 JSON 讀取 relations (不連 Jikan)")
+    parser.add_argument("--refetch", action="store_true", help="已經抓過的 relations 也重新抓")
+    args = parser.parse_args()
+    
+    if args.relations_only or args.fixture:
+        collect_relations(fixture_path=args.fixture, refetch=args.refetch)
+        session.close()
+        sys.exit(0)
+    
     print("\n" + "="*60)
     print("🎌 動漫資料收集工具 - 改進版")
     print("="*60)
@@ -271,6 +459,7 @@ if __name__ == "__main__":
     print("   - 自動填補 title_english")
     print("   - 自動從 aired_from 提取 year")
     print("   - 收集後自動清理未使用的 studios")
+    print("   - 收集 relations 並建立 franchise (系列作)")
     print("\n⚠️  這會花費 2-3 小時,請確保:")
     print("   - 網路連線穩定")
     print("   - 電腦不會進入睡眠模式\n")
@@ -278,6 +467,11 @@ if __name__ == "__main__":
     
     # 開始抓取 (你可以修改年份範圍)
     collect_anime_by_years(2005, 2024)
+    collect_relations()
+    refresh_discover_rankings()
+    refresh_similar_anime()
+    refresh_synopsis_similar()
+    refresh_semantic_index()
     
     session.close()
     print("\n✅ 資料庫連接已關閉")
@@ -4,10 +4,19 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from database import Anime
 from datetime import datetime
+import os
+import sys
+
+# backend/ 的 models / services：收集完成後重建 Discover 排行
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+from models import run_migrations
+from models.database import apply_sqlite_profile
+from services import refresh_ranked_lists
 
 # 使用絕對路徑連接資料庫
 DB_PATH = r'C:\Users\sty24\Desktop\AnimeProject\backend\anime.db'
-engine = create_engine(f'sqlite:///{DB_PATH}')
+# WAL + busy_timeout：每部動漫 commit 一次時，API 的讀取不會被 lock 擋住
+engine = apply_sqlite_profile(create_engine(f'sqlite:///{DB_PATH}'))
 Session = sessionmaker(bind=engine)
 session = Session()
 
@@ -172,6 +181,18 @@ def update_recent_anime(years=1):
     print(f"{'='*60}\n")
 
 
+def refresh_discover_rankings():
+    """重建 Discover 排行 (ranked_lists)，API 之後直接讀預先排好的列表"""
+    run_migrations(engine)
+    totals = refresh_ranked_lists(engine)
+    
+    print(f"\n{'='*60}")
+    print("🏆 Discover 排行已更新")
+    for category, total in totals.items():
+        print(f"   {category}: {total:,} 部")
+    print(f"{'='*60}")
+
+
 if __name__ == "__main__":
     print("\n" + "="*60)
     print(f"🔄 動漫統計數據更新工具")
@@ -212,6 +233,9 @@ if __name__ == "__main__":
     else:
         print("❌ 無效的選項")
     
+    if choice in ("1", "2", "3", "4"):
+        refresh_discover_rankings()
+    
     session.close()
     print("\n✅ 資料庫連接已關閉")
     print("="*60 + "\n")
\ No newline at end of file
@@ -5,6 +5,8 @@ function FilterTags({ filters, onRemoveFilter, onClearAll, className = '' }) {
   const {
     searchQuery = '',
     genres = [],
+    genre_mode = 'any',
+    exclude_genres = [],
     types = [],
     years = [],
     min_score = '',
@@ -14,7 +16,7 @@ function FilterTags({ filters, onRemoveFilter, onClearAll, className = '' }) {
   } = filters;
 
   // Check if any filters are active
-  const hasActiveFilters = searchQuery || genres.length > 0 || min_score || 
+  const hasActiveFilters = searchQuery || genres.length > 0 || exclude_genres.length > 0 || min_score || 
                           max_score || years.length > 0 || types.length > 0;
 
   if (!hasActiveFilters) return null;
@@ -40,7 +42,7 @@ function FilterTags({ filters, onRemoveFilter, onClearAll, className = '' }) {
       {genres.length > 0 && (
         <span className="inline-flex items-center gap-1.5 px-3 py-1 bg-white/20 rounded-full text-sm backdrop-blur-sm border border-white/30">
           <span>
-            Genres ({genres.length}): {
+            Genres ({genres.length}{genre_mode === 'all' ? ', all' : ''}): {
               genres.length > 3 
                 ? `${genres.slice(0, 3).join(', ')}...` 
                 : genres.join(', ')
@@ -57,6 +59,20 @@ function FilterTags({ filters, onRemoveFilter, onClearAll, className = '' }) {
         </span>
       )}
       
+      {exclude_genres.length > 0 && (
+        <span className="inline-flex items-center gap-1.5 px-3 py-1 bg-white/20 rounded-full text-sm backdrop-blur-sm border border-white/30">
+          <span>Excluding: {exclude_genres.join(', ')}</span>
+          <button
+            type="button"
+            onClick={() => onRemoveFilter('exclude_genres')}
+            className="hover:text-red-300 font-bold text-base leading-none"
+            title="Remove excluded genres"
+          >
+            ×
+          </button>
+        </span>
+      )}
+      
       {types.length > 0 && (
         <span className="inline-flex items-center gap-1.5 px-3 py-1 bg-white/20 rounded-full text-sm backdrop-blur-sm border border-white/30">
           <span>Types ({types.length}): {types.join(', ')}</span>
@@ -157,6 +173,8 @@ FilterTags.propTypes = {
   filters: PropTypes.shape({
     searchQuery: PropTypes.string,
     genres: PropTypes.arrayOf(PropTypes.string),
+    genre_mode: PropTypes.oneOf(['any', 'all']),
+    exclude_genres: PropTypes.arrayOf(PropTypes.string),
     types: PropTypes.arrayOf(PropTypes.string),
     years: PropTypes.arrayOf(PropTypes.string),
     min_score: PropTypes.string,
@@ -7,7 +7,8 @@ function MultiSelectDropdown({
   selected = [], 
   onChange, 
   placeholder = "Select options",
-  label = "Options"
+  label = "Options",
+  counts = null
 }) {
   const [isOpen, setIsOpen] = useState(false);
   const dropdownRef = useRef(null);
@@ -118,6 +119,12 @@ function MultiSelectDropdown({
                 <span className={`text-sm ${isSelected ? 'font-medium text-blue-800' : 'text-gray-900'}`}>
                   {option.name}
                 </span>
+                {/* 符合目前篩選條件的數量 (/api/search/facets) */}
+                {counts && (
+                  <span className="ml-auto pl-2 text-xs text-gray-500">
+                    {(counts[option.name] ?? 0).toLocaleString()}
+                  </span>
+                )}
               </label>
             );
           })}
@@ -145,6 +152,7 @@ MultiSelectDropdown.propTypes = {
   onChange: PropTypes.func.isRequired,
   placeholder: PropTypes.string,
   label: PropTypes.string,
+  counts: PropTypes.objectOf(PropTypes.number),
 };
 
 export default MultiSelectDropdown;
\ No newline at end of file
@@ -2,13 +2,15 @@
 import { useState, useEffect } from 'react';
 import PropTypes from 'prop-types';
 import AnimeCard from './AnimeCard';
+import { getAnimeByMalIds, getAnimeFranchise } from '../services/api';
 
-function RelatedWorks({ malId }) {
+function RelatedWorks({ animeId, malId }) {
   const [relations, setRelations] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(false);
 
   const relationTypeLabels = {
+    'Franchise': 'Franchise (in release order)',
     'Sequel': 'Sequel',
     'Prequel': 'Prequel',
     'Side Story': 'Side Story',
@@ -26,13 +28,35 @@ function RelatedWorks({ malId }) {
     if (malId) {
       fetchRelations();
     }
-  }, [malId]);
+  }, [animeId, malId]);
 
   const fetchRelations = async () => {
     setLoading(true);
     setError(false);
 
     try {
+      // 先用後端預先建立的 franchise (整個系列依播出順序)；還沒建立時才直接問 Jikan
+      if (animeId) {
+        const franchiseResponse = await getAnimeFranchise(animeId);
+        const franchise = franchiseResponse.data;
+
+        if (franchise.franchise_id !== null) {
+          const entries = franchise.data
+            .filter(anime => !anime.is_current)
+            .map(anime => (anime.in_database ? {
+              ...anime,
+              inDatabase: true,
+            } : {
+              ...anime,
+              inDatabase: false,
+              malUrl: `https://myanimelist.net/anime/${anime.mal_id}`,
+            }));
+
+          setRelations(entries.length > 0 ? [{ relationType: 'Franchise', entries }] : []);
+          return;
+        }
+      }
+
       const jikanResponse = await fetch(`https://api.jikan.moe/v4/anime/${malId}/relations`);
       
       if (!jikanResponse.ok) {
@@ -42,59 +66,52 @@ function RelatedWorks({ malId }) {
       const jikanData = await jikanResponse.json();
       const relationsData = jikanData.data || [];
 
-      const processedRelations = await Promise.all(
-        relationsData.map(async (relationGroup) => {
-          const relationType = relationGroup.relation;
-          const animeEntries = relationGroup.entry.filter(entry => entry.type === 'anime');
-
-          const entriesWithDetails = await Promise.all(
-            animeEntries.map(async (entry) => {
-              try {
-                const response = await fetch(`http://localhost:8000/api/anime/mal/${entry.mal_id}`);
-                
-                if (response.ok) {
-                  const animeData = await response.json();
-                  
-                  if (animeData && animeData.id) {
-                    return {
-                      ...animeData,
-                      inDatabase: true,
-                    };
-                  }
-                }
-
-                return {
-                  id: null,
-                  mal_id: entry.mal_id,
-                  title: entry.name,
-                  title_english: null,
-                  image_url: null,
-                  score: null,
-                  year: null,
-                  type: entry.type,
-                  inDatabase: false,
-                  malUrl: entry.url,
-                };
-              } catch (err) {
-                console.error(`Error fetching anime ${entry.mal_id}:`, err);
-                return {
-                  id: null,
-                  mal_id: entry.mal_id,
-                  title: entry.name,
-                  image_url: null,
-                  inDatabase: false,
-                  malUrl: entry.url,
-                };
-              }
-            })
-          );
+      const relationGroups = relationsData.map((relationGroup) => ({
+        relationType: relationGroup.relation,
+        entries: relationGroup.entry.filter(entry => entry.type === 'anime'),
+      }));
+
+      // 所有 relation 一次查詢，不再每一部各打一次 API
+      const malIds = [...new Set(
+        relationGroups.flatMap(group => group.entries.map(entry => entry.mal_id))
+      )];
+
+      let animeByMalId = {};
+      if (malIds.length > 0) {
+        try {
+          const response = await getAnimeByMalIds(malIds);
+          animeByMalId = response.data.data;
+        } catch (err) {
+          console.error('Error fetching related anime:', err);
+        }
+      }
+
+      const processedRelations = relationGroups.map(({ relationType, entries }) => ({
+        relationType,
+        entries: entries.map((entry) => {
+          const animeData = animeByMalId[entry.mal_id];
+
+          if (animeData) {
+            return {
+              ...animeData,
+              inDatabase: true,
+            };
+          }
 
           return {
-            relationType,
-            entries: entriesWithDetails,
+            id: null,
+            mal_id: entry.mal_id,
+            title: entry.name,
+            title_english: null,
+            image_url: null,
+            score: null,
+            year: null,
+            type: entry.type,
+            inDatabase: false,
+            malUrl: entry.url,
           };
-        })
-      );
+        }),
+      }));
 
       const filteredRelations = processedRelations.filter(group => group.entries.length > 0);
       setRelations(filteredRelations);
@@ -193,6 +210,7 @@ function RelatedWorks({ malId }) {
 }
 
 RelatedWorks.propTypes = {
+  animeId: PropTypes.number,
   malId: PropTypes.number.isRequired,
 };
 
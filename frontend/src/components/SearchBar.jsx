@@ -1,7 +1,7 @@
 // src/components/SearchBar.jsx - 完整多選版本
-import { useState } from 'react';
+import { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
-import { getGenres, getRandomAnime } from '../services/api';
+import { getGenres, getRandomAnime, getSearchFacets, getSuggestions } from '../services/api';
 import MultiSelectDropdown from './MultiSelectDropdown';
 
 function SearchBar() {
@@ -9,12 +9,17 @@ function SearchBar() {
   
   // Search states
   const [searchQuery, setSearchQuery] = useState('');
+  const [describeMode, setDescribeMode] = useState(false); // 用劇情描述搜尋
+  const [suggestions, setSuggestions] = useState([]);       // 輸入時的 title 建議
+  const [showSuggestions, setShowSuggestions] = useState(false);
   
   // Advanced search states
   const [showAdvanced, setShowAdvanced] = useState(false);
   const [genres, setGenres] = useState([]);
   const [filters, setFilters] = useState({
     genres: [],
+    genre_mode: 'any', // any: 符合任一個 genre，all: 全部都要有
+    exclude_genres: [],
     min_score: '',
     max_score: '',
     years: [], // 改成複數
@@ -26,6 +31,9 @@ function SearchBar() {
   // Random anime state
   const [isGettingRandom, setIsGettingRandom] = useState(false);
 
+  // 每個選項的數量 { genres: { Action: 123 }, types: {...}, years: {...} }
+  const [facetCounts, setFacetCounts] = useState(null);
+
   // Type options for MultiSelect
   const typeOptions = [
     { id: 1, name: 'TV' },
@@ -55,9 +63,68 @@ function SearchBar() {
     }
   };
 
+  // 輸入 title 時顯示建議 (停止輸入 150ms 後才查；/api/search/suggest 只讀記憶體裡的 index)
+  useEffect(() => {
+    const prefix = searchQuery.trim();
+    if (describeMode || !prefix) {
+      setSuggestions([]);
+      return;
+    }
+
+    const timer = setTimeout(async () => {
+      try {
+        const response = await getSuggestions(prefix);
+        setSuggestions(response.data.data);
+      } catch (error) {
+        console.error('Error fetching suggestions:', error);
+      }
+    }, 150);
+
+    return () => clearTimeout(timer);
+  }, [searchQuery, describeMode]);
+
+  // 進階搜尋打開時，依目前的條件更新下拉選單的數量 (停止輸入 300ms 後才查)
+  useEffect(() => {
+    if (!showAdvanced) return;
+
+    const timer = setTimeout(async () => {
+      try {
+        const response = await getSearchFacets({
+          ...(searchQuery.trim() && { q: searchQuery.trim() }),
+          ...(filters.genres.length > 0 && { genres: filters.genres.join(',') }),
+          ...(filters.genres.length > 0 && { genre_mode: filters.genre_mode }),
+          ...(filters.exclude_genres.length > 0 && { exclude_genres: filters.exclude_genres.join(',') }),
+          ...(filters.types.length > 0 && { types: filters.types.join(',') }),
+          ...(filters.years.length > 0 && { years: filters.years.join(',') }),
+          ...(filters.min_score && { min_score: filters.min_score }),
+          ...(filters.max_score && { max_score: filters.max_score }),
+        });
+        const toCounts = (facet) =>
+          Object.fromEntries(facet.map(({ value, count }) => [String(value), count]));
+        const { facets } = response.data;
+        setFacetCounts({
+          genres: toCounts(facets.genres),
+          types: toCounts(facets.types),
+          years: toCounts(facets.years),
+        });
+      } catch (error) {
+        console.error('Error fetching facets:', error);
+      }
+    }, 300);
+
+    return () => clearTimeout(timer);
+  }, [showAdvanced, searchQuery, filters.genres, filters.genre_mode, filters.exclude_genres,
+      filters.types, filters.years, filters.min_score, filters.max_score]);
+
   const handleSearch = async (e) => {
     e.preventDefault();
-    if (!searchQuery.trim() && filters.genres.length === 0 && filters.years.length === 0 && filters.types.length === 0) return;
+    setShowSuggestions(false);
+    if (describeMode) {
+      if (searchQuery.trim()) navigate(`/browse?${new URLSearchParams({ describe: searchQuery.trim() })}`);
+      return;
+    }
+    if (!searchQuery.trim() && filters.genres.length === 0 && filters.exclude_genres.length === 0 &&
+        filters.years.length === 0 && filters.types.length === 0) return;
 
     // 建立 URL 查詢參數
     const params = new URLSearchParams();
@@ -67,6 +134,10 @@ function SearchBar() {
     // 處理多個 genres - 用逗號分隔
     if (filters.genres.length > 0) {
       params.append('genres', filters.genres.join(','));
+      if (filters.genre_mode === 'all') params.append('genre_mode', 'all');
+    }
+    if (filters.exclude_genres.length > 0) {
+      params.append('exclude_genres', filters.exclude_genres.join(','));
     }
     
     if (filters.min_score) params.append('min_score', filters.min_score);
@@ -93,6 +164,8 @@ function SearchBar() {
     setSearchQuery('');
     setFilters({
       genres: [],
+      genre_mode: 'any',
+      exclude_genres: [],
       min_score: '',
       max_score: '',
       years: [],
@@ -113,7 +186,7 @@ function SearchBar() {
   const removeFilter = (field) => {
     if (field === 'searchQuery') {
       setSearchQuery('');
-    } else if (field === 'genres' || field === 'types' || field === 'years') {
+    } else if (field === 'genres' || field === 'exclude_genres' || field === 'types' || field === 'years') {
       handleFilterChange(field, []);
     } else {
       handleFilterChange(field, '');
@@ -134,8 +207,8 @@ function SearchBar() {
   };
 
   // Check if any filters are active
-  const hasActiveFilters = searchQuery || filters.genres.length > 0 || filters.min_score || 
-                          filters.max_score || filters.years.length > 0 || filters.types.length > 0;
+  const hasActiveFilters = searchQuery || filters.genres.length > 0 || filters.exclude_genres.length > 0 ||
+                          filters.min_score || filters.max_score || filters.years.length > 0 || filters.types.length > 0;
 
   return (
     <div className="bg-gradient-to-r from-blue-600 to-purple-600 text-white rounded-lg p-6 mb-6">
@@ -147,13 +220,44 @@ function SearchBar() {
         <form onSubmit={handleSearch}>
           {/* Basic Search Bar */}
           <div className="flex gap-2 mb-3">
-            <input
-              type="text"
-              value={searchQuery}
-              onChange={(e) => setSearchQuery(e.target.value)}
-              placeholder="Search anime by title..."
-              className="flex-1 px-4 py-3 rounded-lg text-gray-900 focus:outline-none focus:ring-2 focus:ring-blue-300"
-            />
+            <div className="relative flex-1">
+              <input
+                type="text"
+                value={searchQuery}
+                onChange={(e) => setSearchQuery(e.target.value)}
+                onFocus={() => setShowSuggestions(true)}
+                // 延遲關閉，點建議的 onMouseDown 才來得及觸發
+                onBlur={() => setTimeout(() => setShowSuggestions(false), 100)}
+                placeholder={describeMode ? 'Describe the story you want...' : 'Search anime by title...'}
+                className="w-full px-4 py-3 rounded-lg text-gray-900 focus:outline-none focus:ring-2 focus:ring-blue-300"
+              />
+              {showSuggestions && suggestions.length > 0 && (
+                <ul className="absolute z-20 left-0 right-0 mt-1 bg-white text-gray-900 rounded-lg shadow-lg overflow-hidden">
+                  {suggestions.map(suggestion => (
+                    <li key={suggestion.id}>
+                      <button
+                        type="button"
+                        onMouseDown={() => navigate(`/anime/${suggestion.id}`)}
+                        className="w-full flex items-center gap-3 px-3 py-2 text-left hover:bg-blue-50"
+                      >
+                        {suggestion.image_url && (
+                          <img src={suggestion.image_url} alt="" className="w-8 h-11 object-cover rounded" />
+                        )}
+                        <span className="truncate">{suggestion.title}</span>
+                      </button>
+                    </li>
+                  ))}
+                </ul>
+              )}
+            </div>
+            <label className="flex items-center gap-1.5 text-sm whitespace-nowrap cursor-pointer">
+              <input
+                type="checkbox"
+                checked={describeMode}
+                onChange={(e) => setDescribeMode(e.target.checked)}
+              />
+              Describe
+            </label>
             <button
               type="submit"
               className="px-6 py-3 bg-white text-blue-600 rounded-lg font-semibold hover:bg-blue-50 transition"
@@ -219,7 +323,9 @@ function SearchBar() {
               
               {filters.genres.length > 0 && (
                 <span className="inline-flex items-center gap-1.5 px-3 py-1 bg-white/20 rounded-full text-sm backdrop-blur-sm border border-white/30">
-                  <span>Genres ({filters.genres.length}): {filters.genres.join(', ')}</span>
+                  <span>
+                    Genres ({filters.genres.length}{filters.genre_mode === 'all' ? ', all' : ''}): {filters.genres.join(', ')}
+                  </span>
                   <button
                     type="button"
                     onClick={() => removeFilter('genres')}
@@ -231,6 +337,20 @@ function SearchBar() {
                 </span>
               )}
               
+              {filters.exclude_genres.length > 0 && (
+                <span className="inline-flex items-center gap-1.5 px-3 py-1 bg-white/20 rounded-full text-sm backdrop-blur-sm border border-white/30">
+                  <span>Excluding: {filters.exclude_genres.join(', ')}</span>
+                  <button
+                    type="button"
+                    onClick={() => removeFilter('exclude_genres')}
+                    className="hover:text-red-300 font-bold text-base leading-none"
+                    title="Remove excluded genres"
+                  >
+                    ×
+                  </button>
+                </span>
+              )}
+              
               {filters.types.length > 0 && (
                 <span className="inline-flex items-center gap-1.5 px-3 py-1 bg-white/20 rounded-full text-sm backdrop-blur-sm border border-white/30">
                   <span>Types ({filters.types.length}): {filters.types.join(', ')}</span>
@@ -324,6 +444,39 @@ function SearchBar() {
                     onChange={(selected) => handleFilterChange('genres', selected)}
                     placeholder="Select genres..."
                     label="Genres"
+                    counts={facetCounts?.genres}
+                  />
+                  {/* 多個 genres：符合任一個 (OR) 或全部都要有 (AND) */}
+                  <div className="mt-1 flex gap-4 text-sm">
+                    <label className="inline-flex items-center gap-1.5 cursor-pointer">
+                      <input
+                        type="radio"
+                        name="genre_mode"
+                        checked={filters.genre_mode === 'any'}
+                        onChange={() => handleFilterChange('genre_mode', 'any')}
+                      />
+                      Match any
+                    </label>
+                    <label className="inline-flex items-center gap-1.5 cursor-pointer">
+                      <input
+                        type="radio"
+                        name="genre_mode"
+                        checked={filters.genre_mode === 'all'}
+                        onChange={() => handleFilterChange('genre_mode', 'all')}
+                      />
+                      Match all
+                    </label>
+                  </div>
+                </div>
+
+                {/* Genres to exclude (NOT) */}
+                <div>
+                  <MultiSelectDropdown
+                    options={genres}
+                    selected={filters.exclude_genres}
+                    onChange={(selected) => handleFilterChange('exclude_genres', selected)}
+                    placeholder="Exclude genres..."
+                    label="Exclude Genres"
                   />
                 </div>
 
@@ -335,6 +488,7 @@ function SearchBar() {
                     onChange={(selected) => handleFilterChange('types', selected)}
                     placeholder="Select types..."
                     label="Type"
+                    counts={facetCounts?.types}
                   />
                 </div>
 
@@ -346,6 +500,7 @@ function SearchBar() {
                     onChange={(selected) => handleFilterChange('years', selected)}
                     placeholder="Select years..."
                     label="Year"
+                    counts={facetCounts?.years}
                   />
                 </div>
 
@@ -387,6 +542,7 @@ function SearchBar() {
                     onChange={(e) => handleFilterChange('sort_by', e.target.value)}
                     className="w-full px-3 py-2 rounded-lg text-gray-900 focus:outline-none focus:ring-2 focus:ring-blue-300"
                   >
+                    <option value="relevance">Relevance</option>
                     <option value="score">Score</option>
                     <option value="members">Popularity</option>
                     <option value="year">Year</option>
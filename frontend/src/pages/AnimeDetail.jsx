@@ -205,7 +205,7 @@ function AnimeDetail() {
       </div>
 
       {/* Related Works - NEW! */}
-      {anime.mal_id && <RelatedWorks malId={anime.mal_id} />}
+      {anime.mal_id && <RelatedWorks animeId={anime.id} malId={anime.mal_id} />}
     </div>
   );
 }
@@ -1,7 +1,7 @@
 // src/pages/Browse.jsx - 支援多選版本
 import { useState, useEffect } from 'react';
 import { useSearchParams } from 'react-router-dom';
-import { getAnimeList, searchAnime, getGenres } from '../services/api';
+import { getAnimeList, searchAnime, searchSemantic, getGenres } from '../services/api';
 import AnimeCard from '../components/AnimeCard';
 import FilterTags from '../components/FilterTags';
 
@@ -28,6 +28,7 @@ function Browse() {
   const [limit] = useState(24);
   const [offset, setOffset] = useState(0);
   const [total, setTotal] = useState(0);
+  const [fuzzyResults, setFuzzyResults] = useState(false); // 結果是 fuzzy 找到的 (沒有完全符合的)
 
   // Load genres on mount
   useEffect(() => {
@@ -59,6 +60,7 @@ function Browse() {
     setLoading(true);
     try {
       const response = await getAnimeList(limit, offset);
+      setFuzzyResults(false);
       setAnimeList(response.data.data);
       setTotal(response.data.total);
     } catch (error) {
@@ -72,11 +74,22 @@ function Browse() {
   const performSearch = async () => {
     setLoading(true);
     try {
+      // 描述搜尋：依 synopsis 相似度排序，只有一頁結果
+      if (searchParams.get('describe')) {
+        const response = await searchSemantic(searchParams.get('describe'), limit);
+        setFuzzyResults(false);
+        setAnimeList(response.data.data);
+        setTotal(response.data.data.length);
+        return;
+      }
+
       const params = {
         limit,
         offset,
         ...(searchParams.get('q') && { q: searchParams.get('q') }),
         ...(searchParams.get('genres') && { genres: searchParams.get('genres') }),
+        ...(searchParams.get('genre_mode') && { genre_mode: searchParams.get('genre_mode') }),
+        ...(searchParams.get('exclude_genres') && { exclude_genres: searchParams.get('exclude_genres') }),
         ...(searchParams.get('min_score') && { min_score: parseFloat(searchParams.get('min_score')) }),
         ...(searchParams.get('max_score') && { max_score: parseFloat(searchParams.get('max_score')) }),
         ...(searchParams.get('years') && { years: searchParams.get('years') }),
@@ -85,7 +98,17 @@ function Browse() {
         order: searchParams.get('order') || 'desc'
       };
       
-      const response = await searchAnime(params);
+      let response = await searchAnime(params);
+      // 完全找不到時再用 fuzzy 找一次 (title 拼錯也找得到，預設依接近程度排序)
+      const fuzzy = Boolean(params.q) && response.data.total === 0;
+      if (fuzzy) {
+        response = await searchAnime({
+          ...params,
+          fuzzy: true,
+          sort_by: searchParams.get('sort_by') || 'relevance'
+        });
+      }
+      setFuzzyResults(fuzzy && response.data.total > 0);
       setAnimeList(response.data.data);
       setTotal(response.data.total);
     } catch (error) {
@@ -152,9 +175,10 @@ function Browse() {
         sort_by: 'score',
         order: 'desc'
       }));
-    } else if (field === 'genres' || field === 'types' || field === 'years') {
+    } else if (field === 'genres' || field === 'exclude_genres' || field === 'types' || field === 'years') {
       // Clear array filters
       newParams.delete(field);
+      if (field === 'genres') newParams.delete('genre_mode');
       setFilters(prev => ({
         ...prev,
         [field]: []
@@ -193,6 +217,8 @@ function Browse() {
   const currentFilters = {
     searchQuery: searchParams.get('q') || '',
     genres: searchParams.get('genres')?.split(',').filter(Boolean) || [],
+    genre_mode: searchParams.get('genre_mode') || 'any',
+    exclude_genres: searchParams.get('exclude_genres')?.split(',').filter(Boolean) || [],
     types: searchParams.get('types')?.split(',').filter(Boolean) || [],
     years: searchParams.get('years')?.split(',').filter(Boolean) || [],
     min_score: searchParams.get('min_score') || '',
@@ -218,6 +244,11 @@ function Browse() {
       <div className="mb-4 text-gray-600">
         Showing {offset + 1} - {Math.min(offset + limit, total)} of {total.toLocaleString()} anime
         {isSearchMode && ' (search results)'}
+        {fuzzyResults && (
+          <span className="ml-2 text-amber-600">
+            No exact matches for &quot;{searchParams.get('q')}&quot;, showing similar titles
+          </span>
+        )}
       </div>
 
       {/* Anime Grid */}
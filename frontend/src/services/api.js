@@ -10,6 +10,9 @@ const api = axios.create({
   },
 });
 
+// AnimeCard 用到的欄位：格狀頁面不需要 synopsis / genres / studios
+export const CARD_FIELDS = 'id,mal_id,title,title_english,type,episodes,score,year,image_url';
+
 // ==================== Home 頁面 ====================
 export const getLatestAnime = (limit = 12) => {
   return api.get('/anime/latest', { params: { limit } });
@@ -28,13 +31,41 @@ export const getAnimeByMalId = (malId) => {
   return api.get(`/anime/mal/${malId}`);
 };
 
+// 一次查多個 mal_id (RelatedWorks)；id 很多時改用 POST，避免 URL 太長
+export const getAnimeByMalIds = (malIds) => {
+  if (malIds.length > 100) {
+    return api.post('/anime/mal', { ids: malIds });
+  }
+  return api.get('/anime/mal', { params: { ids: malIds.join(',') } });
+};
+
+// 同一個系列的所有作品 (依播出順序)
+export const getAnimeFranchise = (id) => {
+  return api.get(`/anime/${id}/franchise`);
+};
+
 // ==================== Browse 頁面 ====================
 export const getAnimeList = (limit = 10, offset = 0) => {
   return api.get('/anime', { params: { limit, offset } });
 };
 
 export const searchAnime = (params) => {
-  return api.get('/search', { params });
+  return api.get('/search', { params: { fields: CARD_FIELDS, ...params } });
+};
+
+// 目前篩選條件下，每個 genre / type / year / score 區間各有幾部
+export const getSearchFacets = (params) => {
+  return api.get('/search/facets', { params });
+};
+
+// 輸入框的即時建議 (title 開頭符合，依 members 排序，只有 id / title / image_url)
+export const getSuggestions = (prefix, limit = 8) => {
+  return api.get('/search/suggest', { params: { prefix, limit } });
+};
+
+// 用一段描述找劇情相近的動漫（synopsis 語意搜尋）
+export const searchSemantic = (text, limit = 24) => {
+  return api.get('/search/semantic', { params: { text, limit, fields: CARD_FIELDS } });
 };
 
 export const getGenres = () => {
@@ -43,31 +74,31 @@ export const getGenres = () => {
 
 // ==================== Discover 頁面 ====================
 export const getPopularAnime = (limit = 20, offset = 0) => {
-  return api.get('/recommendations/popular', { params: { limit, offset } });
+  return api.get('/recommendations/popular', { params: { limit, offset, fields: CARD_FIELDS } });
 };
 
 export const getTopRatedAnime = (limit = 20, offset = 0) => {
-  return api.get('/recommendations/top-rated', { params: { limit, offset } });
+  return api.get('/recommendations/top-rated', { params: { limit, offset, fields: CARD_FIELDS } });
 };
 
 export const getHiddenGems = (limit = 20, offset = 0) => {
-  return api.get('/recommendations/hidden-gems', { params: { limit, offset } });
+  return api.get('/recommendations/hidden-gems', { params: { limit, offset, fields: CARD_FIELDS } });
 };
 
 export const getLatestRecommendations = (limit = 20, offset = 0) => {
-  return api.get('/recommendations/latest', { params: { limit, offset } });
+  return api.get('/recommendations/latest', { params: { limit, offset, fields: CARD_FIELDS } });
 };
 
 export const getTrendingAnime = (limit = 20, offset = 0) => {
-  return api.get('/recommendations/trending', { params: { limit, offset } });
+  return api.get('/recommendations/trending', { params: { limit, offset, fields: CARD_FIELDS } });
 };
 
 export const getAnimeByGenre = (genreName, limit = 20, offset = 0) => {
-  return api.get(`/recommendations/genre/${genreName}`, { params: { limit, offset } });
+  return api.get(`/recommendations/genre/${genreName}`, { params: { limit, offset, fields: CARD_FIELDS } });
 };
 
 export const getAnimeByStudio = (studioName, limit = 20, offset = 0) => {
-  return api.get(`/recommendations/studio/${studioName}`, { params: { limit, offset } });
+  return api.get(`/recommendations/studio/${studioName}`, { params: { limit, offset, fields: CARD_FIELDS } });
 };
 
 export const getGenresList = () => {